@@ -0,0 +1,81 @@
+"""
+邮件发送基准测试 - 在本地 SMTP 服务器（aiosmtpd）上验证连接复用和断线重连
+
+用法（在项目根目录执行，需要先 pip install -r requirements-dev.txt）：
+    python benchmarks/bench_email.py --emails 50 --drop-after 20
+"""
+import argparse
+import socket
+import sys
+import time
+from email.mime.text import MIMEText
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils.email_dispatcher import EmailDispatcher  # noqa: E402
+
+
+class Recorder:
+    """记录收到的邮件，收到 drop_after 封后断开一次连接（模拟服务器超时关闭）"""
+
+    def __init__(self, drop_after: int):
+        self.received = []
+        self.drop_after = drop_after
+
+    async def handle_DATA(self, server, session, envelope):
+        self.received.append(envelope.content)
+        if self.drop_after and len(self.received) == self.drop_after:
+            server.loop.call_soon(server.transport.close)
+        return "250 OK"
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="邮件发送线程测试（本地 SMTP 服务器）")
+    arg_parser.add_argument("--emails", type=int, default=50, help="提交的邮件封数")
+    arg_parser.add_argument("--drop-after", type=int, default=20, help="收到多少封后服务器断开一次连接，0 表示不断开")
+    args = arg_parser.parse_args()
+
+    try:
+        from aiosmtpd.controller import Controller
+    except ImportError:
+        print("跳过：未安装 aiosmtpd，请先执行 pip install -r requirements-dev.txt")
+        sys.exit(0)
+
+    # aiosmtpd 启动时会连接自身确认就绪，不支持 port=0，先找一个空闲端口
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    recorder = Recorder(args.drop_after)
+    controller = Controller(recorder, hostname="127.0.0.1", port=port)
+    controller.start()
+
+    dispatcher = EmailDispatcher({
+        "smtp_host": "127.0.0.1", "smtp_port": port,
+        "from_email": "monitor@example.com", "to_emails": ["team@example.com"],
+    }, max_retries=3)
+
+    start = time.perf_counter()
+    for i in range(args.emails):
+        msg = MIMEText(f"<p>CNC machining article {i}</p>", "html", "utf-8")
+        msg["Subject"] = f"竞品动态 {i}"
+        msg["From"] = "monitor@example.com"
+        msg["To"] = "team@example.com"
+        dispatcher.submit(msg)
+    dispatcher.flush()
+    elapsed = time.perf_counter() - start
+    stats = dispatcher.pop_stats()
+    dispatcher.close()
+    controller.stop()
+
+    print(f"邮件 {args.emails} 封 -> 收到 {len(recorder.received)} 封，耗时 {elapsed:.2f}s")
+    print(f"统计: {stats}")
+
+    expected_connections = 1 + (1 if 0 < args.drop_after < args.emails else 0)
+    if len(recorder.received) != args.emails or stats["failed"] or stats["connections"] > expected_connections:
+        print(f"发送不完整或连接未复用: 失败 {stats['failed']} 封, 新建连接 {stats['connections']} 次")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+抓取引擎基准测试 - 在本地桩服务器上对比同步（requests）与 async（aiohttp）抓取
+
+用法（在项目根目录执行）：
+    python benchmarks/bench_fetch.py --pages 200 --latency 0.1
+"""
+import argparse
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config import config  # noqa: E402
+from utils.async_fetcher import AsyncFetcher  # noqa: E402
+from utils.parser import Parser  # noqa: E402
+
+PAGE = ("<html><body>" + "<article><h2>CNC machining article</h2><a href='/blog/x'>x</a></article>" * 50
+        + "</body></html>").encode("utf-8")
+
+
+def make_handler(latency: float):
+    """构造带固定延迟的请求处理器，模拟远端站点响应时间"""
+
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            time.sleep(latency)
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(PAGE)))
+            self.end_headers()
+            self.wfile.write(PAGE)
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubHandler
+
+
+def make_server(handler, backlog: int) -> ThreadingHTTPServer:
+    """桩服务器：监听队列要容纳 async 引擎同时发起的全部连接
+
+    默认的 request_queue_size=5 会在并发连接时溢出，客户端要等 SYN 重传（约 1 秒）才能连上，
+    测到的就是桩服务器的排队时间而不是抓取引擎。
+    """
+
+    class StubServer(ThreadingHTTPServer):
+        request_queue_size = backlog
+        daemon_threads = True
+
+    return StubServer(("127.0.0.1", 0), handler)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="同步 / async 抓取引擎对比")
+    arg_parser.add_argument("--pages", type=int, default=200, help="抓取页面数")
+    arg_parser.add_argument("--latency", type=float, default=0.1, help="桩服务器每个请求的延迟（秒）")
+    args = arg_parser.parse_args()
+
+    server = make_server(make_handler(args.latency), max(args.pages, config.async_connection_limit))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+    urls = [f"{base}/blog/{i}" for i in range(args.pages)]
+
+    parser = Parser()
+
+    start = time.perf_counter()
+    sync_ok = sum(1 for url in urls if parser._fetch_page(url))
+    sync_time = time.perf_counter() - start
+
+    # 桩服务器只有一个域名，基准测试中关闭礼貌延时
+    fetcher = AsyncFetcher(parser, min_delay=0, max_delay=0)
+    start = time.perf_counter()
+    async_ok = sum(1 for html in fetcher.fetch_many(urls).values() if html)
+    async_time = time.perf_counter() - start
+
+    server.shutdown()
+
+    print(f"pages={args.pages} latency={args.latency}s")
+    print(f"sync : {sync_ok}/{args.pages} ok, {sync_time:.2f}s")
+    print(f"async: {async_ok}/{args.pages} ok, {async_time:.2f}s")
+    if async_time > 0:
+        print(f"speedup: {sync_time / async_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
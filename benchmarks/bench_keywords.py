@@ -0,0 +1,107 @@
+"""
+关键词匹配基准测试 - 对比逐个关键词子串查找与编译后的前缀树正则
+
+用法（在项目根目录执行）：
+    python benchmarks/bench_keywords.py --keywords 1000 --titles 10000
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils.keywords import KeywordMatcher  # noqa: E402
+
+PROCESSES = ["CNC", "machining", "milling", "turning", "EDM", "grinding", "drilling", "anodizing",
+             "injection molding", "sheet metal", "laser cutting", "die casting", "3D printing", "prototyping"]
+MATERIALS = ["aluminum", "titanium", "stainless steel", "brass", "copper", "PEEK", "ABS", "nylon",
+             "Inconel", "magnesium", "carbon fiber", "POM", "polycarbonate", "tool steel"]
+WORDS = ["guide", "tips", "cost", "design", "tolerance", "finish", "parts", "vs", "how", "to", "best",
+         "choose", "complete", "introduction", "advantages", "applications", "process", "what", "is", "the"]
+
+
+def make_keywords(count: int, rng: random.Random) -> list:
+    """工艺、材料、工艺+材料组合，不足时补随机的产品型号"""
+    keywords = PROCESSES + MATERIALS + [f"{m} {p}" for p in PROCESSES for m in MATERIALS]
+    while len(keywords) < count:
+        keywords.append(f"{rng.choice(['X', 'Pro', 'Ultra', 'Max'])}{rng.randint(100, 99999)}")
+    return keywords[:count]
+
+
+def make_titles(count: int, keywords: list, rng: random.Random) -> list:
+    """约三分之一的标题包含关键词，其余为普通词拼接"""
+    titles = []
+    for _ in range(count):
+        words = rng.sample(WORDS, rng.randint(4, 9))
+        if rng.random() < 0.35:
+            words.insert(rng.randint(0, len(words)), rng.choice(keywords))
+        titles.append(" ".join(words).capitalize())
+    return titles
+
+
+def legacy_match(title: str, keywords_upper: list) -> list:
+    """原实现：逐个关键词在大写标题中做子串查找"""
+    title_upper = title.upper()
+    return [keyword for keyword in keywords_upper if keyword in title_upper]
+
+
+def legacy_check(title: str, keywords_upper: list) -> bool:
+    """原实现的 check_keywords（找到第一个即返回）"""
+    title_upper = title.upper()
+    return any(keyword in title_upper for keyword in keywords_upper)
+
+
+def timed(func, titles, repeat: int) -> tuple:
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = [func(title) for title in titles]
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="关键词匹配基准测试")
+    arg_parser.add_argument("--keywords", type=int, default=1000, help="关键词数量")
+    arg_parser.add_argument("--titles", type=int, default=10000, help="标题数量")
+    arg_parser.add_argument("--repeat", type=int, default=3, help="重复次数（取最快一次）")
+    arg_parser.add_argument("--seed", type=int, default=42)
+    args = arg_parser.parse_args()
+
+    rng = random.Random(args.seed)
+    keywords = make_keywords(args.keywords, rng)
+    titles = make_titles(args.titles, keywords, rng)
+    keywords_upper = [keyword.upper() for keyword in keywords]
+
+    start = time.perf_counter()
+    matcher = KeywordMatcher(keywords)
+    build_seconds = time.perf_counter() - start
+
+    legacy_check_seconds, legacy_flags = timed(lambda t: legacy_check(t, keywords_upper), titles, args.repeat)
+    legacy_seconds, legacy_results = timed(lambda t: legacy_match(t, keywords_upper), titles, args.repeat)
+    matcher_seconds, matcher_results = timed(matcher.match, titles, args.repeat)
+
+    # 子串匹配模式下两种实现应给出完全相同的关键词集合
+    mismatches = [
+        title for title, old, new in zip(titles, legacy_results, matcher_results)
+        if set(old) != {keyword.upper() for keyword in new}
+    ]
+    flag_mismatches = sum(flag != bool(new) for flag, new in zip(legacy_flags, matcher_results))
+
+    per_title = 1e6 / args.titles
+    print(f"{len(keywords)} 个关键词 x {len(titles)} 个标题，命中 {sum(map(bool, matcher_results))} 个标题")
+    print(f"编译匹配器: {build_seconds * 1000:.1f} ms")
+    print(f"原实现（any，仅判断）:     {legacy_check_seconds:.3f}s  ({legacy_check_seconds * per_title:.1f} µs/标题)")
+    print(f"原实现（列出全部关键词）: {legacy_seconds:.3f}s  ({legacy_seconds * per_title:.1f} µs/标题)")
+    print(f"前缀树正则:               {matcher_seconds:.3f}s  ({matcher_seconds * per_title:.1f} µs/标题)")
+    print(f"加速: 相对列出全部 {legacy_seconds / matcher_seconds:.1f}x，相对仅判断 {legacy_check_seconds / matcher_seconds:.1f}x")
+
+    if mismatches or flag_mismatches:
+        print(f"结果不一致: {len(mismatches)} 个标题, 例如 {mismatches[:3]}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""
+解析基准测试 - 每个站点以完整 DOM 解析和快速解析（SoupStrainer）两种模式运行，测量耗时、内存分配和结果正确性
+
+页面来自 benchmarks/fixtures/<站点>.html。仓库中的页面是按各站点列表页结构生成的合成页面
+（约 60 KB，含导航、页脚和填充的 CSS / JS），不是线上页面的录制；--record 可改为录制线上页面
+（录制后需确认解析结果并用 --update-golden 更新标准文章列表）。
+
+  - 耗时：预热一次后重复 rounds 次，记录最小值和中位数
+  - 内存：tracemalloc 记录一次解析的峰值内存，以及回收垃圾后仍保留的内存
+  - 正确性：与 benchmarks/fixtures/<站点>.golden.json 中的标准文章列表逐条比较，两种模式的结果也必须一致
+结果写入 JSON 文件；指定 --baseline 时与基线比较，峰值内存（以及基线中有的耗时）超出容差视为性能回退。
+benchmarks/baseline.json 只记录与机器无关的峰值内存，由 --write-baseline 生成。
+结果不正确或出现回退时以状态码 1 退出。
+
+用法（在项目根目录执行）：
+    python benchmarks/bench_parse.py                                  # 测量并写入 benchmarks/results/parse.json
+    python benchmarks/bench_parse.py --baseline benchmarks/baseline.json
+    python benchmarks/bench_parse.py --write-baseline benchmarks/baseline.json
+    python benchmarks/bench_parse.py --update-golden                  # 确认解析结果无误后更新标准文章列表
+    python benchmarks/bench_parse.py --record                         # 先从线上录制各站点页面
+"""
+import argparse
+import gc
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import bs4  # noqa: E402
+from lxml import etree  # noqa: E402
+
+from config import TARGETS  # noqa: E402
+from utils.parser import Parser  # noqa: E402
+
+BENCH_DIR = Path(__file__).resolve().parent
+FIXTURES_DIR = BENCH_DIR / "fixtures"
+DEFAULT_OUTPUT = BENCH_DIR / "results" / "parse.json"
+MODES = {"full": False, "fast": True}
+
+
+def record_fixtures(parser: Parser) -> None:
+    """从线上抓取各站点列表页保存为 fixture"""
+    FIXTURES_DIR.mkdir(parents=True, exist_ok=True)
+    for target in TARGETS:
+        html = parser._fetch_page(target["url"], conditional=False)
+        if isinstance(html, str):
+            (FIXTURES_DIR / f"{target['key']}.html").write_text(html, encoding="utf-8")
+            print(f"recorded {target['key']}: {len(html)} bytes")
+        else:
+            print(f"skip {target['key']}: fetch failed")
+
+
+def golden_path(site_key: str) -> Path:
+    return FIXTURES_DIR / f"{site_key}.golden.json"
+
+
+def compare_articles(articles: list, golden: list) -> list:
+    """与标准文章列表比较，返回差异描述（为空表示一致）"""
+    problems = []
+    if len(articles) != len(golden):
+        problems.append(f"文章数 {len(articles)}，应为 {len(golden)}")
+    for index, (actual, expected) in enumerate(zip(articles, golden)):
+        for field in ("title", "url", "date"):
+            if actual.get(field, "") != expected.get(field, ""):
+                problems.append(f"第 {index + 1} 篇 {field}: {actual.get(field)!r}，应为 {expected.get(field)!r}")
+    return problems
+
+
+def measure(parser: Parser, site_key: str, html: str, rounds: int) -> tuple:
+    """返回 (解析结果, 各次耗时毫秒, 峰值内存 KB, 保留内存 KB)
+
+    保留内存在回收循环引用（BeautifulSoup 的节点树）之后统计，只包含解析结果和解析器新增的缓存。
+    """
+    articles = parser.parse(site_key, html)  # 预热（规则编译、正则缓存等）
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        parser.parse(site_key, html)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    gc.collect()
+    tracemalloc.start()
+    result = parser.parse(site_key, html)
+    peak = tracemalloc.get_traced_memory()[1]
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return articles, timings, peak / 1024, retained / 1024
+
+
+def run_site(parsers: dict, site_key: str, html: str, rounds: int) -> list:
+    """测量一个站点在各模式下的结果"""
+    golden_file = golden_path(site_key)
+    golden = json.loads(golden_file.read_text(encoding="utf-8")) if golden_file.exists() else None
+    rule = parsers["full"].rules.get(site_key)
+
+    rows = []
+    for mode, parser in parsers.items():
+        articles, timings, peak_kb, retained_kb = measure(parser, site_key, html, rounds)
+        problems = compare_articles(articles, golden) if golden is not None else ["缺少标准文章列表"]
+        if rows and articles != rows[0]["output"]:
+            problems.append(f"{mode} 与 {rows[0]['mode']} 模式的解析结果不一致")
+        rows.append({
+            "site": site_key,
+            "mode": mode,
+            "parser": (rule.hook if rule else None) or "rules",
+            "fixture_bytes": len(html.encode("utf-8")),
+            "articles": len(articles),
+            "correct": not problems,
+            "problems": problems,
+            "min_ms": round(min(timings), 4),
+            "median_ms": round(statistics.median(timings), 4),
+            "peak_kb": round(peak_kb, 1),
+            "retained_kb": round(retained_kb, 1),
+            "output": articles,
+        })
+    return rows
+
+
+def find_regressions(rows: list, baseline: dict, max_slowdown: float, min_delta_ms: float) -> list:
+    """与基线比较：峰值内存或中位耗时超过基线 (1 + max_slowdown) 倍视为回退
+
+    基线中没有耗时（跨机器不可比）时只比较峰值内存；耗时还要求绝对增量超过 min_delta_ms，
+    避免亚毫秒级解析的计时噪声造成误报。
+    """
+    previous = {(row["site"], row["mode"]): row for row in baseline.get("results", [])}
+    limit = 1 + max_slowdown
+    regressions = []
+    for row in rows:
+        base = previous.get((row["site"], row["mode"]))
+        if not base:
+            continue
+        base_ms = base.get("median_ms")
+        if base_ms is not None and row["median_ms"] > base_ms * limit and row["median_ms"] - base_ms > min_delta_ms:
+            regressions.append(f"{row['site']}/{row['mode']} 耗时 {base_ms:.2f} -> {row['median_ms']:.2f} ms")
+        if row["peak_kb"] > base["peak_kb"] * limit:
+            regressions.append(f"{row['site']}/{row['mode']} 峰值内存 {base['peak_kb']:.0f} -> {row['peak_kb']:.0f} KB")
+    return regressions
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="解析基准测试（完整解析 / 快速解析 + 标准文章列表）")
+    arg_parser.add_argument("--rounds", type=int, default=20, help="每个站点每种模式的解析次数")
+    arg_parser.add_argument("--sites", nargs="*", help="只测量指定站点(key)")
+    arg_parser.add_argument("--record", action="store_true", help="先从线上录制 fixture")
+    arg_parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT, help="结果 JSON 文件")
+    arg_parser.add_argument("--baseline", type=Path, help="用于比较的基线 JSON 文件")
+    arg_parser.add_argument("--write-baseline", type=Path, metavar="PATH", help="把本次的峰值内存写为基线")
+    arg_parser.add_argument("--max-slowdown", type=float, default=0.5, help="允许相对基线变慢 / 变大的比例")
+    arg_parser.add_argument("--min-delta-ms", type=float, default=0.5, help="耗时回退的最小绝对增量（毫秒）")
+    arg_parser.add_argument("--update-golden", action="store_true", help="用完整解析的结果更新标准文章列表")
+    args = arg_parser.parse_args()
+
+    parsers = {mode: Parser(fast_parse=fast) for mode, fast in MODES.items()}
+    if args.record:
+        record_fixtures(parsers["full"])
+
+    targets = [target for target in TARGETS if not args.sites or target["key"] in args.sites]
+    rows, missing = [], []
+    for target in targets:
+        fixture = FIXTURES_DIR / f"{target['key']}.html"
+        if not fixture.exists():
+            missing.append(target["key"])
+            continue
+        html = fixture.read_text(encoding="utf-8")
+        if args.update_golden:
+            articles = parsers["full"].parse(target["key"], html)
+            golden_path(target["key"]).write_text(
+                json.dumps(articles, ensure_ascii=False, indent=2) + "\n", encoding="utf-8"
+            )
+            print(f"已更新 {golden_path(target['key']).name}: {len(articles)} 篇")
+        rows.extend(run_site(parsers, target["key"], html, args.rounds))
+
+    print(f"{'site':<16}{'mode':<6}{'parser':<22}{'min ms':>9}{'med ms':>9}{'peak KB':>9}{'kept KB':>9}{'n':>3}  ok")
+    for row in rows:
+        print(f"{row['site']:<16}{row['mode']:<6}{row['parser']:<22}{row['min_ms']:>9.2f}{row['median_ms']:>9.2f}"
+              f"{row['peak_kb']:>9.0f}{row['retained_kb']:>9.0f}{row['articles']:>3}  {row['correct']}")
+        for problem in row["problems"]:
+            print(f"    {problem}")
+
+    regressions = []
+    if args.baseline:
+        regressions = find_regressions(rows, json.loads(args.baseline.read_text(encoding="utf-8")),
+                                       args.max_slowdown, args.min_delta_ms)
+
+    environment = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "beautifulsoup4": bs4.__version__,
+        "lxml": ".".join(map(str, etree.LXML_VERSION)),
+    }
+    report = {
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "environment": environment,
+        "rounds": args.rounds,
+        "missing_fixtures": missing,
+        "regressions": regressions,
+        "results": rows,
+    }
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(report, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    print(f"结果已写入 {args.output}")
+
+    if args.write_baseline:
+        baseline = {
+            "generated_at": report["generated_at"],
+            "environment": environment,
+            "results": [{"site": row["site"], "mode": row["mode"], "peak_kb": row["peak_kb"]} for row in rows],
+        }
+        args.write_baseline.write_text(json.dumps(baseline, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+        print(f"基线已写入 {args.write_baseline}")
+
+    failed = False
+    if missing:
+        print(f"缺少 fixture: {', '.join(missing)}")
+        failed = True
+    incorrect = sorted({row["site"] for row in rows if not row["correct"]})
+    if incorrect:
+        print(f"解析结果不正确: {', '.join(incorrect)}")
+        failed = True
+    if regressions:
+        print("性能回退:")
+        for regression in regressions:
+            print(f"  {regression}")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
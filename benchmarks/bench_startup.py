@@ -0,0 +1,80 @@
+"""
+启动耗时基准测试 - 用 python -X importtime 测量导入 main 的耗时，并检查是否超出预算
+
+导入 main 时不应创建存储、解析器、通知器，也不应加载 telegram / fake_useragent / selenium 等重量级依赖。
+
+用法（在项目根目录执行）：
+    python benchmarks/bench_startup.py --runs 5 --budget-ms 150
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# 导入 main 时不应加载的模块（第一次使用对应功能时才导入）
+DEFERRED_MODULES = ("telegram", "fake_useragent", "selenium", "aiohttp", "smtplib", "sqlite3", "asyncio")
+
+
+def import_profile() -> dict:
+    """运行一次 -X importtime，返回 {模块: (自身耗时 µs, 累计耗时 µs)}"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=PROJECT_ROOT, capture_output=True, text=True, check=True,
+    )
+    profile = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        if self_us.strip().isdigit():
+            profile.setdefault(name.strip(), (int(self_us), int(cumulative_us)))
+    return profile
+
+
+def loaded_deferred_modules() -> list:
+    """导入 main 后已经加载的延迟模块"""
+    code = (
+        "import json, sys, main; "
+        f"print(json.dumps(sorted(m for m in {DEFERRED_MODULES!r} if m in sys.modules)))"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="启动耗时基准测试")
+    arg_parser.add_argument("--runs", type=int, default=5, help="测量次数（取中位数）")
+    arg_parser.add_argument("--budget-ms", type=float, default=150, help="导入 main 的累计耗时预算（毫秒）")
+    arg_parser.add_argument("--top", type=int, default=10, help="列出自身耗时最长的模块数")
+    args = arg_parser.parse_args()
+
+    import_profile()  # 预热：生成 .pyc，避免第一次的编译时间计入
+    profiles = [import_profile() for _ in range(args.runs)]
+    totals = [profile["main"][1] / 1000 for profile in profiles]
+    median_ms = statistics.median(totals)
+
+    slowest = sorted(profiles[-1].items(), key=lambda item: item[1][0], reverse=True)[:args.top]
+    print(f"导入 main: 中位数 {median_ms:.1f} ms（最小 {min(totals):.1f} ms，最大 {max(totals):.1f} ms，预算 {args.budget_ms:.0f} ms）")
+    print("自身耗时最长的模块:")
+    for name, (self_us, cumulative_us) in slowest:
+        print(f"  {self_us / 1000:7.1f} ms  (累计 {cumulative_us / 1000:7.1f} ms)  {name}")
+
+    loaded = loaded_deferred_modules()
+    print(f"已加载的延迟模块: {', '.join(loaded) or '无'}")
+
+    failed = False
+    if median_ms > args.budget_ms:
+        print(f"超出预算: {median_ms:.1f} ms > {args.budget_ms:.0f} ms")
+        failed = True
+    if loaded:
+        print(f"导入 main 时不应加载: {', '.join(loaded)}")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Telegram 发送基准测试 - 在本地模拟 Bot API 上验证消息合并、限速和 429 重试
+
+用法（在项目根目录执行）：
+    python benchmarks/bench_telegram.py --alerts 200 --throttle-every 5
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils.telegram_worker import MESSAGE_LIMIT, TelegramWorker  # noqa: E402
+
+TOKEN = "123456:TEST"
+CHAT_ID = "42"
+
+
+def make_handler(received: list, throttle_every: int, latency: float):
+    """模拟 Bot API：记录收到的消息，每 throttle_every 个请求返回一次 429"""
+
+    class FakeBotApi(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        requests_seen = 0
+        lock = threading.Lock()
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode("utf-8")
+            if "json" in self.headers.get("Content-Type", ""):
+                params = json.loads(body or "{}")
+            else:
+                params = {k: v[0] for k, v in parse_qs(body).items()}
+            method = self.path.rsplit("/", 1)[-1]
+
+            with self.lock:
+                FakeBotApi.requests_seen += 1
+                throttled = throttle_every and FakeBotApi.requests_seen % throttle_every == 0
+
+            time.sleep(latency)
+            if method == "getMe":
+                payload = {"ok": True, "result": {"id": 1, "is_bot": True, "first_name": "fake", "username": "fake_bot"}}
+            elif throttled:
+                payload = {"ok": False, "error_code": 429, "description": "Too Many Requests: retry after 1",
+                           "parameters": {"retry_after": 1}}
+            else:
+                received.append((time.monotonic(), params.get("text", "")))
+                payload = {"ok": True, "result": {
+                    "message_id": len(received), "date": int(time.time()),
+                    "chat": {"id": int(params.get("chat_id", 0)), "type": "private"}, "text": params.get("text", ""),
+                }}
+
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(429 if payload.get("error_code") == 429 else 200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return FakeBotApi
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Telegram 发送线程测试（本地模拟 Bot API）")
+    arg_parser.add_argument("--alerts", type=int, default=200, help="提交的提醒条数")
+    arg_parser.add_argument("--throttle-every", type=int, default=5, help="每隔多少个请求返回一次 429，0 表示不限流")
+    arg_parser.add_argument("--min-interval", type=float, default=0.2, help="同一会话两次发送的最小间隔（秒）")
+    arg_parser.add_argument("--latency", type=float, default=0.02, help="模拟 API 的响应延迟（秒）")
+    args = arg_parser.parse_args()
+
+    received = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(received, args.throttle_every, args.latency))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    worker = TelegramWorker(TOKEN, CHAT_ID, base_url=f"http://127.0.0.1:{server.server_port}/bot",
+                            min_interval=args.min_interval, max_retries=3)
+    alerts = [
+        f"📢 <b>【竞品动态提醒】</b>\n\n<b>标题</b>：CNC machining article {i}\n<b>链接</b>：https://example.com/blog/{i}"
+        for i in range(args.alerts)
+    ]
+
+    start = time.perf_counter()
+    for alert in alerts:
+        worker.submit(alert)
+    worker.flush()
+    elapsed = time.perf_counter() - start
+    stats = worker.pop_stats()
+    worker.close()
+
+    texts = [text for _, text in received]
+    gaps = [b - a for (a, _), (b, _) in zip(received, received[1:])]
+    missing = [alert for alert in alerts if not any(alert in text for text in texts)]
+    print(f"提醒 {args.alerts} 条 -> 消息 {len(texts)} 条，耗时 {elapsed:.2f}s")
+    print(f"最长消息 {max(map(len, texts), default=0)} 字符（上限 {MESSAGE_LIMIT}），"
+          f"最小发送间隔 {min(gaps, default=0):.2f}s")
+    print(f"统计: {stats}")
+
+    if missing or stats["failed"] or any(len(text) > MESSAGE_LIMIT for text in texts):
+        print(f"发送不完整: 缺失 {len(missing)} 条, 失败 {stats['failed']} 条")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
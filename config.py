@@ -1,9 +1,18 @@
 """
 配置模块 - 加载和管理系统配置
+
+config.yaml 在加载时校验并编译为不可变的 ConfigSnapshot；常驻模式下文件修改后整体替换快照（热加载）。
 """
+import logging
 import os
-import yaml
+import threading
+from dataclasses import dataclass, field, fields
+from operator import attrgetter
 from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+import yaml
 
 # 项目根目录（支持 GitHub Actions 的嵌套目录）
 import os
@@ -18,10 +27,25 @@ else:
     PROJECT_ROOT = Path(__file__).parent.resolve()
 
 CONFIG_FILE = PROJECT_ROOT / "config.yaml"
+RULES_FILE = PROJECT_ROOT / "rules.yaml"
+USER_AGENTS_FILE = PROJECT_ROOT / "user_agents.txt"
 DATA_FILE = PROJECT_ROOT / "data" / "data.json"
+HTTP_CACHE_FILE = PROJECT_ROOT / "data" / "http_cache.json"
+SQLITE_FILE = PROJECT_ROOT / "data" / "history.db"
+SEEN_URLS_DB = PROJECT_ROOT / "data" / "seen_urls.db"
+SEEN_URLS_BLOOM = PROJECT_ROOT / "data" / "seen_urls.bloom"
 LOG_FILE = PROJECT_ROOT / "logs" / "monitor.log"
 
+# fake-useragent 项目维护的浏览器 User-Agent 统计，用于生成 user_agents.txt
+DEFAULT_USER_AGENT_SOURCE = (
+    "https://raw.githubusercontent.com/fake-useragent/fake-useragent/main/src/fake_useragent/data/browsers.jsonl"
+)
+
 # 监控目标列表（11个竞争对手）
+# 可选字段 feed（RSS / Atom 地址）和 sitemap（sitemap.xml 地址）：配置后优先按上次的发布时间
+# 增量读取，失败时回退到页面解析
+# 可选字段 schedule：该站点的 cron 计划（如 "0 * * * *" 每小时、"0 8 * * 1" 每周一），缺省使用 task.schedule
+# config.yaml 的 targets 列表可以按 key 覆盖这里的字段、追加新站点，或用 enabled: false 停用站点
 TARGETS = [
     {
         "name": "3ERP",
@@ -92,64 +116,279 @@ TARGETS = [
 ]
 
 
-class Config:
-    """配置类"""
+logger = logging.getLogger(__name__)
 
-    def __init__(self):
-        self._config = self._load_config()
+# 启动时创建对象（存储、通知渠道、浏览器池等）所用的配置，热加载后需要重启进程才能生效
+RESTART_REQUIRED = (
+    "telegram_token", "telegram_chat_id", "telegram_base_url", "email_config",
+    "storage_backend", "url_index_enabled", "url_index_capacity", "url_index_error_rate",
+    "selenium_pool_size", "selenium_max_pages", "fetch_backend", "async_connection_limit",
+)
 
-    def _load_config(self):
-        """加载配置文件"""
-        if not CONFIG_FILE.exists():
-            raise FileNotFoundError(f"配置文件不存在: {CONFIG_FILE}")
 
-        with open(CONFIG_FILE, "r", encoding="utf-8") as f:
-            return yaml.safe_load(f)
+def _freeze(value: Any) -> Any:
+    """把 YAML 中的字典 / 列表转换为只读的 MappingProxyType / tuple"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
 
-    @property
-    def telegram_token(self):
-        """Telegram Bot Token"""
-        return self._config.get("telegram", {}).get("bot_token", "")
 
-    @property
-    def telegram_chat_id(self):
-        """Telegram Chat ID"""
-        return self._config.get("telegram", {}).get("chat_id", "")
+class _Section:
+    """读取并校验 config.yaml 的一个配置段"""
 
-    @property
-    def email_config(self):
-        """Email配置"""
-        return self._config.get("email", {})
+    def __init__(self, raw: Dict, name: str):
+        value = raw.get(name) or {}
+        if not isinstance(value, dict):
+            raise ValueError(f"配置段 {name} 应为字典")
+        self.name = name
+        self.data = value
 
-    @property
-    def keywords(self):
-        """监控关键词"""
-        return [k.upper() for k in self._config.get("keywords", ["CNC", "MACHINING"])]
+    def get(self, key: str, default: Any, kind: type = None, minimum: float = None, choices: Tuple = None) -> Any:
+        value = self.data.get(key)
+        if value is None:
+            value = default
+        if kind is bool:
+            value = bool(value)
+        elif kind is not None:
+            try:
+                value = kind(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"配置项 {self.name}.{key} 应为 {kind.__name__}: {value!r}")
+        if minimum is not None and value < minimum:
+            raise ValueError(f"配置项 {self.name}.{key} 不能小于 {minimum}: {value!r}")
+        if choices is not None and value not in choices:
+            raise ValueError(f"配置项 {self.name}.{key} 应为 {' / '.join(choices)} 之一: {value!r}")
+        return value
 
-    @property
-    def retry_count(self):
-        """重试次数"""
-        return self._config.get("task", {}).get("retry_count", 3)
 
-    @property
-    def retry_delay(self):
-        """重试延迟（秒）"""
-        return self._config.get("task", {}).get("retry_delay", 600)
+def _parse_run_time(value: str) -> Tuple[int, int]:
+    try:
+        hour, minute = (int(part) for part in str(value).split(":"))
+    except ValueError:
+        raise ValueError(f"配置项 task.run_time 应为 HH:MM: {value!r}")
+    if not (0 <= hour < 24 and 0 <= minute < 60):
+        raise ValueError(f"配置项 task.run_time 超出范围: {value!r}")
+    return hour, minute
 
-    @property
-    def request_timeout(self):
-        """请求超时（秒）"""
-        return self._config.get("task", {}).get("request_timeout", 30)
 
-    @property
-    def min_delay(self):
-        """最小请求间隔（秒）"""
-        return self._config.get("task", {}).get("min_delay", 2)
+def _merge_targets(overrides: Any) -> Tuple[Mapping, ...]:
+    """内置 TARGETS 与 config.yaml 中 targets 合并：同 key 覆盖字段，新 key 追加，enabled: false 停用"""
+    if overrides is None:
+        overrides = []
+    if not isinstance(overrides, list):
+        raise ValueError("配置段 targets 应为列表")
 
-    @property
-    def max_delay(self):
-        """最大请求间隔（秒）"""
-        return self._config.get("task", {}).get("max_delay", 5)
+    merged = {target["key"]: dict(target) for target in TARGETS}
+    for entry in overrides:
+        if not isinstance(entry, dict) or not entry.get("key"):
+            raise ValueError(f"targets 中的站点缺少 key: {entry!r}")
+        merged.setdefault(entry["key"], {}).update(entry)
+
+    targets = []
+    for key, target in merged.items():
+        if not target.pop("enabled", True):
+            continue
+        missing = [name for name in ("name", "url") if not target.get(name)]
+        if missing:
+            raise ValueError(f"站点 {key} 缺少字段: {', '.join(missing)}")
+        targets.append(_freeze(target))
+    return tuple(targets)
+
+
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    """一次加载的完整配置（只读），字段在构建时完成类型转换和校验"""
+
+    # 配置文件版本 (mtime_ns, size)，用于检测修改
+    version: Tuple[int, int]
+    targets: Tuple[Mapping, ...]
+
+    # Telegram / Email
+    telegram_token: str
+    telegram_chat_id: str
+    telegram_base_url: Optional[str]  # Bot API 地址，为空时使用官方地址
+    telegram_min_interval: float  # 同一会话两次发送的最小间隔（秒）
+    telegram_max_retries: int  # 发送失败（限流或网络错误）的最大重试次数
+    email_config: Mapping
+
+    # 关键词
+    keywords: Tuple[str, ...]  # 大写的关键词（兼容旧的子串匹配）
+    keyword_entries: Tuple[Any, ...]  # 关键词配置原文（字符串，或带 word_boundary 的字典）
+    keyword_word_boundary: bool  # 关键词是否默认按整词匹配
+    keyword_site_rules: Mapping  # 按站点的关键词规则（key 为站点 key）
+
+    # 任务
+    run_time: Tuple[int, int]  # 每日运行时间 (时, 分)
+    schedule: str  # 默认的 cron 运行计划（缺省按 run_time 每天运行一次）
+    schedule_jitter: float  # 计划运行时间加入的随机延迟上限（秒）
+    reload_interval: float  # 常驻模式检查配置文件是否修改的间隔（秒）
+    retry_count: int
+    retry_delay: float  # 首次重试前的等待（秒）
+    retry_max_delay: float  # 重试退避的最大等待秒数
+    run_deadline: float  # 单次运行的截止时间（秒），超过后不再重试失败的站点
+    request_timeout: float
+    min_delay: float  # 同一域名的最小请求间隔（秒）
+    max_delay: float  # 同一域名的最大请求间隔（秒）
+    concurrency: int  # 并发抓取的工作线程数
+    fetch_backend: str  # sync（requests）或 async（asyncio + aiohttp）
+    async_connection_limit: int
+    fast_parse: bool  # 只构建列表区域的子树
+    stream_fetch: bool  # 找到足够的文章后提前停止下载
+    stream_max_bytes: int
+
+    # 存储
+    storage_backend: str  # json（data.json 快照）或 sqlite（文章历史库）
+    url_index_enabled: bool
+    url_index_capacity: int
+    url_index_error_rate: float
+
+    # Selenium
+    selenium_wait_timeout: float  # 等待文章元素出现的超时时间（秒）
+    selenium_block_resources: Tuple[str, ...]  # 不加载的资源类型
+    selenium_pool_size: int  # 浏览器池最多同时运行的浏览器数
+    selenium_max_pages: int  # 每个浏览器渲染多少个页面后重启
+
+    # 数据源探测
+    source_probe: bool
+    source_reprobe_days: float
+
+    # 站点健康
+    health_enabled: bool
+    failure_threshold: int  # 连续失败多少次后打开熔断器
+    cooldown_hours: float  # 第一次熔断的冷却小时数，之后每次翻倍
+    max_cooldown_hours: float
+    adaptive_polling: bool
+    poll_factor: float  # 轮询间隔 = 平均发布间隔 x poll_factor
+    max_poll_interval_hours: float
+
+    # 通知发件箱
+    outbox_max_attempts: int  # 每条通知的最大投递次数，用尽后标记为 dead
+    outbox_retry_delay: float  # 第一次投递失败后的重试等待（秒），之后指数增长
+    outbox_retry_max_delay: float
+    outbox_poll_interval: float  # 投递线程检查到期重试的间隔（秒）
+    outbox_deliver_timeout: float  # 单次投递等待发送结果的最长秒数
+    outbox_retention_days: float  # 已投递的通知保留天数（保留期内相同去重键不会再次入队）
+
+    # User-Agent 池
+    user_agent_source: str  # --refresh-user-agents 默认读取的 browsers.jsonl（URL 或本地路径）
+    user_agent_limit: int  # user_agents.txt 保留的 User-Agent 数
+    user_agent_max_age_days: float  # user_agents.txt 超过该天数未更新时提示刷新，0 表示不提示
+
+    # 按站点缓存的关键词匹配器（第一次使用时编译）
+    _matchers: Dict = field(default_factory=dict, repr=False, compare=False)
+    _matchers_lock: Any = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    @classmethod
+    def from_dict(cls, raw: Optional[Dict], version: Tuple[int, int] = (0, 0)) -> "ConfigSnapshot":
+        """校验 config.yaml 的内容并构建快照，配置有误时抛出 ValueError"""
+        raw = raw or {}
+        if not isinstance(raw, dict):
+            raise ValueError("config.yaml 顶层应为字典")
+        telegram = _Section(raw, "telegram")
+        task = _Section(raw, "task")
+        storage = _Section(raw, "storage")
+        selenium = _Section(raw, "selenium")
+        sources = _Section(raw, "sources")
+        health = _Section(raw, "health")
+        outbox = _Section(raw, "outbox")
+        keyword_rules = _Section(raw, "keyword_rules")
+        user_agents = _Section(raw, "user_agents")
+
+        keyword_entries = raw.get("keywords") or ["CNC", "MACHINING"]
+        if not isinstance(keyword_entries, list):
+            raise ValueError("配置项 keywords 应为列表")
+        for entry in keyword_entries:
+            if isinstance(entry, dict) and not entry.get("keyword"):
+                raise ValueError(f"关键词缺少 keyword 字段: {entry!r}")
+
+        run_time = _parse_run_time(task.get("run_time", "08:00"))
+        schedule = task.get("schedule", "", str) or f"{run_time[1]} {run_time[0]} * * *"
+        if len(schedule.split()) != 5 and not schedule.startswith("@"):
+            raise ValueError(f"配置项 task.schedule 应为 5 段 cron 表达式: {schedule!r}")
+
+        min_delay = task.get("min_delay", 2, float, minimum=0)
+        max_delay = task.get("max_delay", 5, float, minimum=0)
+        if max_delay < min_delay:
+            raise ValueError("配置项 task.max_delay 不能小于 task.min_delay")
+
+        return cls(
+            version=version,
+            targets=_merge_targets(raw.get("targets")),
+            telegram_token=telegram.get("bot_token", ""),
+            telegram_chat_id=telegram.get("chat_id", ""),
+            telegram_base_url=telegram.get("base_url", "") or None,
+            telegram_min_interval=telegram.get("min_interval", 1.0, float, minimum=0),
+            telegram_max_retries=telegram.get("max_retries", 3, int, minimum=0),
+            email_config=_freeze(_Section(raw, "email").data),
+            keywords=tuple(str(k["keyword"] if isinstance(k, dict) else k).upper() for k in keyword_entries),
+            keyword_entries=_freeze(list(keyword_entries)),
+            keyword_word_boundary=keyword_rules.get("word_boundary", False, bool),
+            keyword_site_rules=_freeze(keyword_rules.get("sites", {}) or {}),
+            run_time=run_time,
+            schedule=schedule,
+            schedule_jitter=task.get("schedule_jitter", 300, float, minimum=0),
+            reload_interval=task.get("reload_interval", 60, float, minimum=1),
+            retry_count=task.get("retry_count", 3, int, minimum=0),
+            retry_delay=task.get("retry_delay", 600, float, minimum=0),
+            retry_max_delay=task.get("retry_max_delay", 1800, float, minimum=0),
+            run_deadline=task.get("run_deadline", 3600, float, minimum=0),
+            request_timeout=task.get("request_timeout", 30, float, minimum=1),
+            min_delay=min_delay,
+            max_delay=max_delay,
+            concurrency=max(1, task.get("concurrency", 4, int)),
+            fetch_backend=task.get("fetch_backend", "sync", str, choices=("sync", "async")),
+            async_connection_limit=task.get("async_connection_limit", 100, int, minimum=1),
+            fast_parse=task.get("fast_parse", True, bool),
+            stream_fetch=task.get("stream_fetch", False, bool),
+            stream_max_bytes=task.get("stream_max_bytes", 2 * 1024 * 1024, int, minimum=1024),
+            storage_backend=storage.get("backend", "json", str, choices=("json", "sqlite")),
+            url_index_enabled=storage.get("url_index", False, bool),
+            url_index_capacity=storage.get("url_index_capacity", 1_000_000, int, minimum=1),
+            url_index_error_rate=storage.get("url_index_error_rate", 0.001, float, minimum=1e-9),
+            selenium_wait_timeout=selenium.get("wait_timeout", 15, float, minimum=0),
+            selenium_block_resources=tuple(selenium.get("block_resources", ["image", "font", "stylesheet", "media"])),
+            selenium_pool_size=max(1, selenium.get("pool_size", 2, int)),
+            selenium_max_pages=max(1, selenium.get("max_pages_per_browser", 50, int)),
+            source_probe=sources.get("probe", True, bool),
+            source_reprobe_days=sources.get("reprobe_days", 7, float, minimum=0),
+            health_enabled=health.get("enabled", True, bool),
+            failure_threshold=health.get("failure_threshold", 3, int, minimum=1),
+            cooldown_hours=health.get("cooldown_hours", 24, float, minimum=0),
+            max_cooldown_hours=health.get("max_cooldown_hours", 336, float, minimum=0),
+            adaptive_polling=health.get("adaptive_polling", True, bool),
+            poll_factor=health.get("poll_factor", 0.25, float, minimum=0),
+            max_poll_interval_hours=health.get("max_poll_interval_hours", 72, float, minimum=0),
+            outbox_max_attempts=max(1, outbox.get("max_attempts", 10, int)),
+            outbox_retry_delay=outbox.get("retry_delay", 60, float, minimum=0),
+            outbox_retry_max_delay=outbox.get("retry_max_delay", 3600, float, minimum=0),
+            outbox_poll_interval=outbox.get("poll_interval", 60, float, minimum=1),
+            outbox_deliver_timeout=outbox.get("deliver_timeout", 120, float, minimum=1),
+            outbox_retention_days=outbox.get("retention_days", 30, float, minimum=0),
+            user_agent_source=user_agents.get("source", DEFAULT_USER_AGENT_SOURCE, str) or DEFAULT_USER_AGENT_SOURCE,
+            user_agent_limit=max(1, user_agents.get("limit", 50, int)),
+            user_agent_max_age_days=user_agents.get("max_age_days", 90, float, minimum=0),
+        )
+
+    def keyword_matcher(self, site_key: Optional[str] = None):
+        """站点使用的关键词匹配器（每个快照按站点编译一次）
+
+        keyword_rules.sites 中的站点规则：keywords 追加到全局关键词之后，replace 为 true 时只用站点自己的关键词；
+        word_boundary 覆盖全局的整词匹配设置。
+        """
+        from utils.keywords import KeywordMatcher
+
+        with self._matchers_lock:
+            matcher = self._matchers.get(site_key)
+            if matcher is None:
+                site_rule = self.keyword_site_rules.get(site_key, {}) if site_key else {}
+                keywords = list(site_rule.get("keywords", ()))
+                if not site_rule.get("replace", False):
+                    keywords = list(self.keyword_entries) + keywords
+                matcher = KeywordMatcher(keywords, site_rule.get("word_boundary", self.keyword_word_boundary))
+                self._matchers[site_key] = matcher
+            return matcher
 
     def is_telegram_configured(self):
         """检查Telegram是否已配置"""
@@ -166,5 +405,84 @@ class Config:
         )
 
 
+class Config:
+    """配置类
+
+    所有配置项从当前快照读取（config.concurrency 等同于 config.snapshot.concurrency）；
+    reload_if_changed 检测到 config.yaml 修改后构建新快照并整体替换，读取方不会看到一半新一半旧的配置。
+    一次运行中需要多个配置项保持一致时，先取 config.snapshot 再读取。
+    """
+
+    def __init__(self):
+        self._snapshot = self._load_snapshot()
+        self._failed_version: Optional[Tuple[int, int]] = None
+
+    @staticmethod
+    def _file_version() -> Tuple[int, int]:
+        stat = CONFIG_FILE.stat()
+        return stat.st_mtime_ns, stat.st_size
+
+    def _load_snapshot(self) -> ConfigSnapshot:
+        """加载并校验配置文件"""
+        if not CONFIG_FILE.exists():
+            raise FileNotFoundError(f"配置文件不存在: {CONFIG_FILE}")
+
+        version = self._file_version()
+        with open(CONFIG_FILE, "r", encoding="utf-8") as f:
+            return ConfigSnapshot.from_dict(yaml.safe_load(f), version)
+
+    @property
+    def snapshot(self) -> ConfigSnapshot:
+        """当前配置快照"""
+        return self._snapshot
+
+    def reload_if_changed(self) -> bool:
+        """config.yaml 的修改时间或大小变化时重新加载，返回是否换用了新快照
+
+        新配置校验失败时保留当前快照并记录错误（同一版本只记录一次）。
+        """
+        try:
+            version = self._file_version()
+        except OSError:
+            return False
+        if version in (self._snapshot.version, self._failed_version):
+            return False
+
+        try:
+            snapshot = self._load_snapshot()
+        except (OSError, ValueError, yaml.YAMLError) as e:
+            self._failed_version = version
+            logger.error(f"config.yaml 重新加载失败，继续使用当前配置: {e}")
+            return False
+
+        previous, self._snapshot = self._snapshot, snapshot
+        self._failed_version = None
+        changed = [f.name for f in fields(ConfigSnapshot)
+                   if f.compare and f.name != "version" and getattr(previous, f.name) != getattr(snapshot, f.name)]
+        logger.info(f"config.yaml 已重新加载，变化的配置: {', '.join(changed) or '无'}")
+        restart = [name for name in changed if name in RESTART_REQUIRED]
+        if restart:
+            logger.warning(f"以下配置需要重启进程后生效: {', '.join(restart)}")
+        return True
+
+    def keyword_matcher(self, site_key: Optional[str] = None):
+        """当前快照的关键词匹配器"""
+        return self._snapshot.keyword_matcher(site_key)
+
+    def is_telegram_configured(self):
+        """检查Telegram是否已配置"""
+        return self._snapshot.is_telegram_configured()
+
+    def is_email_configured(self):
+        """检查Email是否已配置"""
+        return self._snapshot.is_email_configured()
+
+
+# 每个快照字段生成一个只读属性（config.xxx -> config.snapshot.xxx），读取时不再查找配置字典
+for _field in fields(ConfigSnapshot):
+    if _field.compare:
+        setattr(Config, _field.name, property(attrgetter(f"_snapshot.{_field.name}")))
+del _field
+
 # 全局配置实例
 config = Config()
@@ -3,14 +3,26 @@ CNC竞品博客监控系统 - 主程序
 每天08:00自动执行，监控11个竞争对手博客的最新动态
 """
 import argparse
+import heapq
+import itertools
 import logging
+import random
 import sys
 import time
-from datetime import datetime
-
-from config import TARGETS, config
-from utils.parser import site_monitor
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from config import DATA_FILE, config
+from utils.http_cache import NOT_MODIFIED
+from utils.browser_pool import browser_pool
+from utils.health import health
+from utils.keywords import match_keywords
+from utils.outbox import outbox
+from utils.parser import SeleniumHelper, site_monitor
+from utils.scheduler import Scheduler
 from utils.storage import storage
+from utils.user_agents import refresh_user_agents, user_agents
 from utils.notifier import notifier
 
 # 日志记录器
@@ -37,33 +49,41 @@ def setup_logging():
     )
 
 
-def check_keywords(title: str) -> bool:
-    """检查标题是否包含关键词（不区分大小写）"""
-    title_upper = title.upper()
-    return any(keyword in title_upper for keyword in config.keywords)
+def check_keywords(title: str, site_key: str = None) -> list:
+    """返回标题中匹配到的关键词（不区分大小写，按站点的关键词规则）"""
+    return match_keywords(title, site_key)
 
 
-def process_site(target: dict, retry_count: int = 0):
-    """处理单个站点，返回 (result, new_articles, error_msg)"""
+def process_site(target: dict):
+    """处理单个站点（单次尝试），返回 (result, new_articles, error_msg, retryable)"""
     site_key = target["key"]
     site_name = target["name"]
     url = target["url"]
     use_google = target.get("use_google", False)
 
     logger.info(f"正在监控: {site_name} ({url})")
+    start = time.monotonic()
 
     matched_articles = []
     error_msg = None
 
     try:
         # 获取当前Top 3文章
-        articles = site_monitor.fetch_articles(site_key, url, use_google)
+        articles = site_monitor.fetch_articles(
+            site_key, url, use_google, feed=target.get("feed"), sitemap=target.get("sitemap")
+        )
+
+        if articles is NOT_MODIFIED:
+            # 304：页面未变化，跳过解析和快照比对
+            logger.info(f"站点 {site_name} 页面未变化 (304)，跳过")
+            health.record_success(site_key, time.monotonic() - start, 0)
+            return True, [], None, False
 
         if not articles:
             # 解析失败
             logger.warning(f"站点 {site_name} 解析结果为空")
             error_msg = "解析结果为空，可能网站结构已更改"
-            return False, [], error_msg
+            return False, [], error_msg, False
 
         logger.info(f"站点 {site_name} 获取到 {len(articles)} 篇文章")
 
@@ -73,47 +93,155 @@ def process_site(target: dict, retry_count: int = 0):
         if not new_articles:
             logger.info(f"站点 {site_name} 无新增文章")
         else:
-            # 过滤包含关键词的文章
-            matched_articles = [a for a in new_articles if check_keywords(a.get("title", ""))]
+            # 过滤包含关键词的文章，通知中附带匹配到的关键词（不写入快照）
+            for article in new_articles:
+                keywords = check_keywords(article.get("title", ""), site_key)
+                if keywords:
+                    matched_articles.append(dict(article, keywords=keywords))
 
             if matched_articles:
                 logger.info(f"站点 {site_name} 发现 {len(matched_articles)} 篇包含关键词的新文章")
             else:
                 logger.info(f"站点 {site_name} 有新增文章但不包含关键词，跳过通知")
 
-        # 无论是否有新文章，都更新快照
-        storage.update_snapshot(site_key, articles)
-        return True, matched_articles, None
+        # 无论是否有新文章，都更新快照；通知与快照一起写入发件箱，由投递线程发送
+        storage.update_snapshot(site_key, articles, notifications=outbox.article_notifications(target, matched_articles))
+        site_monitor.commit_validators(url)
+        site_monitor.commit_watermark(site_key)
+        health.record_success(site_key, time.monotonic() - start, len(new_articles))
+        return True, matched_articles, None, False
 
     except Exception as e:
+        # 出错的站点由 run_targets 放入重试队列
         logger.error(f"处理站点 {site_name} 时出错: {e}")
-
-        # 重试机制
-        if retry_count < config.retry_count:
-            logger.info(f"将在 {config.retry_delay} 秒后重试 ({retry_count + 1}/{config.retry_count})")
-            time.sleep(config.retry_delay)
-            return process_site(target, retry_count + 1)
-        else:
-            error_msg = f"重试{config.retry_count}次后仍失败: {str(e)}"
-            return False, [], error_msg
-
-
-def run_monitor():
-    """运行监控任务"""
+        return False, [], str(e), True
+
+
+def retry_backoff(attempt: int) -> float:
+    """第 attempt 次重试前的等待秒数：指数退避，上限 retry_max_delay，并加入随机抖动"""
+    delay = min(config.retry_max_delay, config.retry_delay * (2 ** attempt))
+    return random.uniform(delay / 2, delay)
+
+
+def check_targets(targets: list, force: bool = False) -> list:
+    """本次运行各站点的处理方式 [(action, reason)]，force 为 True 时全部运行"""
+    return [("run", None) if force else health.check(target["key"]) for target in targets]
+
+
+def run_targets(targets: list, force: bool = False, plan: list = None) -> list:
+    """并发处理全部站点，返回与 targets 顺序一致的 (result, new_articles, error_msg)
+
+    失败的站点不阻塞线程：按退避时间放入重试队列，其他站点继续处理，到期后再次提交；
+    超过运行截止时间（run_deadline）后不再重试，剩余的失败计入汇总。
+    熔断中或未到轮询时间的站点被跳过（result 为 None），force 为 True 时不检查；
+    plan 为 check_targets 预先得到的处理方式（预取页面前已经检查过健康状态）。
+    """
+    plan = check_targets(targets, force) if plan is None else plan
+    deadline = time.monotonic() + config.run_deadline
+    results = {}
+    retry_queue = []  # (到期时间, 序号, 站点下标, 已重试次数, 上次错误)
+    sequence = itertools.count()
+    probes = set()  # 熔断器半开试探的站点，只尝试一次
+
+    # 不同站点并发抓取，同一域名的请求间隔由 site_monitor 控制
+    with ThreadPoolExecutor(max_workers=config.concurrency, thread_name_prefix="site") as executor:
+        running = {}
+        for index, (target, (action, reason)) in enumerate(zip(targets, plan)):
+            if action == "skip":
+                logger.info(f"跳过站点 {target['name']}: {reason}")
+                results[index] = (None, [], None)
+                continue
+            if action == "probe":
+                logger.info(f"站点 {target['name']} 熔断冷却结束，进行试探")
+                probes.add(index)
+            running[executor.submit(process_site, target)] = (index, 0)
+
+        while running or retry_queue:
+            now = time.monotonic()
+            while retry_queue and retry_queue[0][0] <= now and now < deadline:
+                _, _, index, attempt, _ = heapq.heappop(retry_queue)
+                logger.info(f"重试站点 {targets[index]['name']} ({attempt}/{config.retry_count})")
+                running[executor.submit(process_site, targets[index])] = (index, attempt)
+
+            if now >= deadline and retry_queue:
+                for _, _, index, attempt, error in retry_queue:
+                    logger.warning(f"运行截止时间已到，放弃重试站点 {targets[index]['name']}")
+                    results[index] = (False, [], f"运行截止时间前未能恢复（已重试{attempt - 1}次）: {error}")
+                retry_queue.clear()
+
+            if not running:
+                # 只剩等待中的重试：睡到最早的重试到期
+                if retry_queue:
+                    time.sleep(max(0.0, min(retry_queue[0][0], deadline) - now))
+                continue
+
+            timeout = max(0.0, min(retry_queue[0][0], deadline) - now) if retry_queue else None
+            done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, attempt = running.pop(future)
+                result, new_articles, error_msg, retryable = future.result()
+                if index in probes and not result:
+                    results[index] = (result, new_articles, f"熔断试探失败: {error_msg}")
+                    continue
+                if not (retryable and attempt < config.retry_count):
+                    if retryable:
+                        error_msg = f"重试{config.retry_count}次后仍失败: {error_msg}"
+                    results[index] = (result, new_articles, error_msg)
+                    continue
+
+                delay = retry_backoff(attempt)
+                if time.monotonic() + delay >= deadline:
+                    logger.warning(f"站点 {targets[index]['name']} 的重试将超过运行截止时间，不再重试")
+                    results[index] = (False, [], f"运行截止时间前未能恢复（已重试{attempt}次）: {error_msg}")
+                    continue
+                logger.info(f"站点 {targets[index]['name']} 将在 {delay:.0f} 秒后重试 ({attempt + 1}/{config.retry_count})")
+                heapq.heappush(retry_queue, (time.monotonic() + delay, next(sequence), index, attempt + 1, error_msg))
+
+    # 最终失败的站点计入健康状态（成功由 process_site 记录）
+    for index, (result, _, _) in results.items():
+        if result is False:
+            health.record_failure(targets[index]["key"])
+
+    return [results[index] for index in range(len(targets))]
+
+
+def run_monitor(targets: list = None):
+    """运行监控任务（默认监控全部站点）"""
+    targets = config.targets if targets is None else targets
+    started_at = datetime.now()
     logger.info("=" * 60)
-    logger.info(f"开始执行竞品博客监控任务 - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    logger.info(f"开始执行竞品博客监控任务 - {started_at.strftime('%Y-%m-%d %H:%M:%S')}")
     logger.info("=" * 60)
 
     success_count = 0
     fail_count = 0
+    skip_count = 0
 
     # 收集所有通知
     all_new_articles = []
     all_errors = []
 
-    for target in TARGETS:
-        result, new_articles, error_msg = process_site(target)
-        if result:
+    # 每次运行为各站点重新抽取 User-Agent
+    user_agents.reset()
+
+    # 整个运行只加载一次 data.json，结束时一次性原子写回；提交后再投递发件箱中的通知
+    try:
+        with outbox.hold(), storage.session():
+            # 先检查健康状态，async 引擎下只预取本次会运行的站点（熔断中、未到轮询时间的站点不请求）
+            plan = check_targets(targets)
+            site_monitor.prefetch([target for target, (action, _) in zip(targets, plan) if action != "skip"])
+
+            results = run_targets(targets, plan=plan)
+            storage.enqueue_notifications(outbox.error_notifications(targets, results, started_at))
+    finally:
+        # 未被使用的预取页面不留到下次运行
+        site_monitor.clear_prefetched()
+        SeleniumHelper.close()
+
+    for target, (result, new_articles, error_msg) in zip(targets, results):
+        if result is None:
+            skip_count += 1
+        elif result:
             success_count += 1
         else:
             fail_count += 1
@@ -123,32 +251,116 @@ def run_monitor():
         if error_msg:
             all_errors.append({"site": target["name"], "error": error_msg})
 
-    # 汇总发送通知
-    if all_new_articles or all_errors:
-        notifier.send_summary(all_new_articles, all_errors)
+    storage.record_run(started_at, datetime.now(), success_count, fail_count)
+    site_monitor.save_validators()
+    sources_used = site_monitor.pop_source_stats()
+    if sources_used:
+        logger.info("数据源 - " + ", ".join(f"{key}: {name}" for key, name in sorted(sources_used.items())))
+    cache_stats = site_monitor.pop_parse_cache_stats()
+    logger.info(f"解析缓存 - 命中: {cache_stats['hit']}, 未命中: {cache_stats['miss']}")
+    stream_stats = site_monitor.parser.pop_stream_stats()
+    if stream_stats:
+        logger.info(
+            f"流式抓取 - {len(stream_stats)} 个站点, 提前结束 {sum(s['truncated'] for s in stream_stats.values())} 个, "
+            f"共节省 {sum(s['bytes_saved'] for s in stream_stats.values()) / 1024:.0f} KB"
+        )
+    browser_stats = browser_pool.pop_stats() if browser_pool.is_created else {}
+    if browser_stats.get("starts") or browser_stats.get("pages"):
+        logger.info(
+            f"浏览器池 - 启动 {browser_stats['starts']} 次, 平均启动耗时 {browser_stats['avg_startup_seconds']:.2f}s, "
+            f"渲染 {browser_stats['pages']} 页, 回收 {browser_stats['recycled']} 次, 崩溃 {browser_stats['crashed']} 次"
+        )
+    index_stats = storage.url_index_stats()
+    if index_stats:
+        logger.info(
+            f"URL索引 - 数量: {index_stats['count']}/{index_stats['capacity']}, "
+            f"内存: {index_stats['memory_bytes'] / 1024:.0f} KB, "
+            f"估算误判率: {index_stats['estimated_fp_rate']:.2e}, 实际误判率: {index_stats['observed_fp_rate']:.2e}"
+        )
+
+    created = outbox.pop_created()
+    if created:
+        logger.info(f"新文章 {len(all_new_articles)} 篇、异常站点 {len(all_errors)} 个，{created} 条通知已写入发件箱")
+    elif all_new_articles or all_errors:
+        logger.info(f"新文章 {len(all_new_articles)} 篇、异常站点 {len(all_errors)} 个，未配置通知渠道，不发送通知")
 
     logger.info("=" * 60)
-    logger.info(f"监控任务完成 - 成功: {success_count}, 失败: {fail_count}")
+    logger.info(f"监控任务完成 - 成功: {success_count}, 失败: {fail_count}, 跳过: {skip_count}")
     logger.info(f"结束时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     logger.info("=" * 60)
 
     return fail_count == 0
 
 
+def close_notifications():
+    """投递本次（以及之前未送达）的通知，关闭发送线程"""
+    outbox.close()
+    if notifier.is_created:
+        notifier.close()
+
+
+def check_target_rules(targets: list) -> None:
+    """提示既没有 rules.yaml 规则、也没有配置 feed / sitemap 的站点（这些站点无法解析出文章）"""
+    rules = site_monitor.parser.rules
+    for target in targets:
+        if target["key"] not in rules and not (target.get("feed") or target.get("sitemap")):
+            logger.warning(
+                f"站点 {target['name']} ({target['key']}) 没有解析规则，也没有配置 feed / sitemap，"
+                f"请在 rules.yaml 中添加规则（修改后自动重新加载）"
+            )
+
+
+def rebuild_scheduler(previous: Scheduler, now: datetime) -> Scheduler:
+    """配置重新加载后按新的站点列表和计划重建调度器，计划有变化的站点重新计算下次运行时间"""
+    snapshot = config.snapshot
+    try:
+        scheduler = Scheduler(snapshot.targets, snapshot.schedule, snapshot.schedule_jitter)
+    except ValueError as e:
+        logger.error(f"新配置中的运行计划无效，继续使用原计划: {e}")
+        return previous
+    changed = [
+        target for target in snapshot.targets
+        if target["key"] in previous.schedules
+        and previous.schedules[target["key"]].expression != scheduler.schedules[target["key"]].expression
+    ]
+    if changed:
+        scheduler.schedule_next(changed, now)
+    return scheduler
+
+
 def main():
     """主函数"""
     parser = argparse.ArgumentParser(description="CNC竞品博客监控系统")
     parser.add_argument("--test", action="store_true", help="测试模式，仅运行一次")
     parser.add_argument("--single", type=str, help="仅监控指定站点(key)")
+    parser.add_argument("--import-json", nargs="?", const=str(DATA_FILE), metavar="PATH",
+                        help="将 data.json 导入 SQLite 存储（默认 data/data.json）")
+    parser.add_argument("--refresh-user-agents", nargs="?", const="", metavar="SOURCE",
+                        help="从 browsers.jsonl（URL 或本地路径，默认 user_agents.source）重新生成 user_agents.txt")
     args = parser.parse_args()
 
     setup_logging()
 
+    if args.import_json:
+        from utils.sqlite_storage import SQLiteStorage
+        SQLiteStorage().import_json(Path(args.import_json))
+        return
+
+    if args.refresh_user_agents is not None:
+        refresh_user_agents(args.refresh_user_agents or None)
+        return
+
     if args.single:
         # 仅监控指定站点
-        target = next((t for t in TARGETS if t["key"] == args.single), None)
+        target = next((t for t in config.targets if t["key"] == args.single), None)
         if target:
-            process_site(target)
+            try:
+                with storage.session():
+                    run_targets([target], force=True)
+            finally:
+                SeleniumHelper.close()
+            site_monitor.save_validators()
+            close_notifications()
         else:
             logger.error(f"未找到站点: {args.single}")
             sys.exit(1)
@@ -157,21 +369,36 @@ def main():
         if args.test:
             logger.info("测试模式：运行一次监控")
             run_monitor()
+            close_notifications()
         else:
-            # 定时任务模式
+            # 定时任务模式：每个站点按自己的 cron 计划运行，只在有站点到期或需要检查配置文件时醒来
+            scheduler = Scheduler(config.targets, config.schedule, config.schedule_jitter)
+            check_target_rules(config.targets)
+            outbox.start()
+            announce = True
             while True:
+                config_changed = config.reload_if_changed()
+                if config_changed:
+                    # 新增 / 停用站点和修改后的计划立即生效
+                    scheduler = rebuild_scheduler(scheduler, datetime.now())
+                    announce = True
+                # rules.yaml 与 config.yaml 同时检查，新增站点的解析规则无需重启即可生效
+                if site_monitor.parser.reload_rules() or config_changed:
+                    check_target_rules(config.targets)
+
                 now = datetime.now()
-                run_time = config._config.get("task", {}).get("run_time", "08:00")
-                hour, minute = map(int, run_time.split(":"))
-
-                if now.hour == hour and now.minute < minute:
-                    logger.info(f"等待到 {run_time} 执行任务...")
-                    time.sleep(60)
-                else:
-                    # 无论成功失败都等待一天后重试
-                    run_monitor()
-                    logger.info("任务执行完成，等待下一次执行...")
-                    time.sleep(86400)  # 24小时
+                due = scheduler.due_targets(now)
+                if due:
+                    run_monitor(due)
+                    scheduler.schedule_next(due, now)
+                    announce = True
+
+                wait_seconds = scheduler.seconds_until_next(datetime.now())
+                if wait_seconds > 0:
+                    if announce:
+                        logger.info(f"下一次运行: {datetime.now() + timedelta(seconds=wait_seconds):%Y-%m-%d %H:%M:%S}")
+                        announce = False
+                    time.sleep(min(wait_seconds, config.reload_interval))
 
 
 if __name__ == "__main__":
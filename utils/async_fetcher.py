@@ -0,0 +1,93 @@
+"""
+异步抓取模块 - 基于 asyncio + aiohttp 的并发抓取引擎
+"""
+import asyncio
+import logging
+import random
+import time
+from typing import Dict, List, Optional, Set, Union
+from urllib.parse import urlparse
+
+from config import config
+from utils.http_cache import NOT_MODIFIED
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncFetcher:
+    """异步抓取引擎 - 单个事件循环内并发抓取多个页面，接口与 Parser._fetch_page 对应"""
+
+    def __init__(self, parser, limit: int = None, timeout: int = None,
+                 min_delay: float = None, max_delay: float = None):
+        self.parser = parser  # 复用 Parser 的请求头
+        self.limit = limit or config.async_connection_limit
+        self.timeout = timeout or config.request_timeout
+        self.min_delay = config.min_delay if min_delay is None else min_delay
+        self.max_delay = config.max_delay if max_delay is None else max_delay
+
+    @staticmethod
+    def is_available() -> bool:
+        """检查 aiohttp 是否已安装"""
+        try:
+            import aiohttp  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+    async def _wait_for_host(self, host: str, host_locks: Dict, host_last_fetch: Dict) -> None:
+        """同一域名的请求之间保持随机间隔，与同步模式的礼貌延时一致"""
+        host_lock = host_locks.setdefault(host, asyncio.Lock())
+        async with host_lock:
+            last_fetch = host_last_fetch.get(host)
+            if last_fetch is not None:
+                delay = random.uniform(self.min_delay, self.max_delay)
+                remaining = last_fetch + delay - time.monotonic()
+                if remaining > 0:
+                    await asyncio.sleep(remaining)
+            host_last_fetch[host] = time.monotonic()
+
+    async def fetch_page(self, session, url: str, host_locks: Dict, host_last_fetch: Dict,
+                         conditional: bool = True) -> Union[str, None, object]:
+        """获取单个页面内容，失败返回 None，页面未变化（304）返回 NOT_MODIFIED"""
+        import aiohttp
+
+        headers = self.parser._get_headers(url)
+        if conditional:
+            headers.update(self.parser.http_cache.conditional_headers(url))
+
+        await self._wait_for_host(urlparse(url).netloc.lower(), host_locks, host_last_fetch)
+        try:
+            async with session.get(url, headers=headers, allow_redirects=True) as response:
+                if response.status == 304:
+                    return NOT_MODIFIED
+                response.raise_for_status()
+                self.parser.http_cache.stage(
+                    url, response.headers.get("ETag"), response.headers.get("Last-Modified")
+                )
+                return await response.text(errors="replace")
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.error(f"获取页面失败 [{url}]: {e!r}")
+            return None
+
+    async def _fetch_all(self, urls: List[str], conditional_urls: Set[str]) -> Dict[str, Optional[str]]:
+        """在同一个 ClientSession 中并发抓取，连接池在请求之间复用"""
+        import aiohttp
+
+        connector = aiohttp.TCPConnector(limit=self.limit)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        host_locks: Dict[str, asyncio.Lock] = {}
+        host_last_fetch: Dict[str, float] = {}
+
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            pages = await asyncio.gather(
+                *(self.fetch_page(session, url, host_locks, host_last_fetch, url in conditional_urls)
+                  for url in urls)
+            )
+        return dict(zip(urls, pages))
+
+    def fetch_many(self, urls: List[str], conditional_urls: Set[str] = None) -> Dict[str, Optional[str]]:
+        """同步入口：抓取全部 URL，返回 {url: html}；conditional_urls 中的 URL 发送条件请求"""
+        urls = list(dict.fromkeys(urls))
+        if not urls:
+            return {}
+        return asyncio.run(self._fetch_all(urls, conditional_urls or set()))
@@ -0,0 +1,203 @@
+"""
+浏览器池模块 - 管理无头 Chrome 实例的启动、复用、健康检查和关闭
+"""
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from config import config
+from utils.lazy import LazyObject
+
+logger = logging.getLogger(__name__)
+
+# 按资源类型屏蔽的 URL 模式（Network.setBlockedURLs）
+BLOCKED_URL_PATTERNS = {
+    "image": ["*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico", "*.avif"],
+    "font": ["*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot"],
+    "stylesheet": ["*.css"],
+    "media": ["*.mp4", "*.webm", "*.mp3", "*.ogg", "*.m3u8"],
+}
+
+
+def _block_resources(driver, resource_types: List[str]) -> None:
+    """通过 DevTools 协议屏蔽图片、字体、样式表等重资源"""
+    patterns = [p for t in resource_types for p in BLOCKED_URL_PATTERNS.get(t, [])]
+    if not patterns:
+        return
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+    except Exception as e:
+        logger.warning(f"Selenium 资源屏蔽设置失败，将加载全部资源: {e}")
+
+
+def create_driver():
+    """创建一个无头 Chrome WebDriver，失败时返回 None"""
+    try:
+        from selenium import webdriver
+        from selenium.webdriver.chrome.service import Service
+        from selenium.webdriver.chrome.options import Options
+
+        chrome_options = Options()
+        chrome_options.add_argument("--headless")
+        chrome_options.add_argument("--no-sandbox")
+        chrome_options.add_argument("--disable-dev-shm-usage")
+        chrome_options.add_argument("--disable-gpu")
+        chrome_options.add_argument("--window-size=1920,1080")
+        chrome_options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36")
+        # 不需要等待全部资源加载完成，文章元素由 SeleniumHelper.fetch_page 条件等待
+        chrome_options.page_load_strategy = "eager"
+        blocked = config.selenium_block_resources
+        if "image" in blocked:
+            chrome_options.add_experimental_option(
+                "prefs", {"profile.managed_default_content_settings.images": 2}
+            )
+
+        # 优先使用系统自带的 chromedriver（GitHub Actions 环境）
+        try:
+            service = Service("/usr/bin/chromedriver")
+            driver = webdriver.Chrome(service=service, options=chrome_options)
+        except Exception:
+            # 回退到 webdriver_manager（本地 Windows 环境）
+            from webdriver_manager.chrome import ChromeDriverManager
+            service = Service(ChromeDriverManager().install())
+            driver = webdriver.Chrome(service=service, options=chrome_options)
+
+        _block_resources(driver, blocked)
+        return driver
+    except Exception as e:
+        logger.error(f"Selenium 初始化失败: {e}")
+        return None
+
+
+class BrowserWorker:
+    """池中的一个浏览器实例"""
+
+    def __init__(self, driver, startup_seconds: float):
+        self.driver = driver
+        self.startup_seconds = startup_seconds
+        self.pages = 0
+
+
+class BrowserPool:
+    """无头浏览器池
+
+    浏览器在第一次需要时才启动，最多同时存在 size 个；每个实例渲染 max_pages 个页面后
+    回收重启，使用中出错或健康检查失败的实例直接丢弃，不会影响后续页面。
+    """
+
+    def __init__(self, size: int = 2, max_pages: int = 50, factory=create_driver):
+        self.size = max(1, size)
+        self.max_pages = max(1, max_pages)
+        self._factory = factory
+        self._idle: List[BrowserWorker] = []
+        self._total = 0  # 已启动或正在启动的实例数
+        self._cond = threading.Condition()
+        self._stats = self._empty_stats()
+
+    @contextmanager
+    def browser(self):
+        """借出一个浏览器（无法启动时为 None），退出时归还；with 块内抛出异常视为浏览器已损坏"""
+        worker = self._acquire()
+        if worker is None:
+            yield None
+            return
+
+        try:
+            yield worker.driver
+        except Exception:
+            self._release(worker, broken=True)
+            raise
+        self._release(worker, broken=False)
+
+    def _acquire(self) -> Optional[BrowserWorker]:
+        with self._cond:
+            while not self._idle and self._total >= self.size:
+                self._cond.wait()
+            if self._idle:
+                worker = self._idle.pop()
+            else:
+                self._total += 1
+                worker = None
+
+        if worker is not None and not self._is_alive(worker):
+            logger.warning("浏览器健康检查失败，重新启动")
+            self._quit(worker)
+            with self._cond:
+                self._stats["crashed"] += 1
+            worker = None
+
+        return worker or self._start()
+
+    def _start(self) -> Optional[BrowserWorker]:
+        """启动一个新实例（调用前已占用名额），失败时释放名额"""
+        start = time.monotonic()
+        driver = self._factory()
+        elapsed = time.monotonic() - start
+        with self._cond:
+            if driver is None:
+                self._total -= 1
+                self._cond.notify()
+                return None
+            self._stats["starts"] += 1
+            self._stats["startup_seconds"] += elapsed
+        logger.info(f"浏览器启动完成，耗时 {elapsed:.2f}s")
+        return BrowserWorker(driver, elapsed)
+
+    def _release(self, worker: BrowserWorker, broken: bool) -> None:
+        worker.pages += 1
+        retire = broken or worker.pages >= self.max_pages
+        if retire:
+            self._quit(worker)
+
+        with self._cond:
+            self._stats["pages"] += 1
+            if retire:
+                self._total -= 1
+                self._stats["crashed" if broken else "recycled"] += 1
+            else:
+                self._idle.append(worker)
+            self._cond.notify()
+
+    @staticmethod
+    def _empty_stats() -> Dict:
+        return {"starts": 0, "startup_seconds": 0.0, "pages": 0, "recycled": 0, "crashed": 0}
+
+    @staticmethod
+    def _is_alive(worker: BrowserWorker) -> bool:
+        try:
+            worker.driver.current_url
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _quit(worker: BrowserWorker) -> None:
+        try:
+            worker.driver.quit()
+        except Exception as e:
+            logger.warning(f"关闭浏览器失败: {e}")
+
+    def close(self) -> None:
+        """关闭全部空闲浏览器（运行结束时调用，之后仍可按需重新启动）"""
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._total -= len(idle)
+            self._cond.notify_all()
+        for worker in idle:
+            self._quit(worker)
+        if idle:
+            logger.info(f"已关闭 {len(idle)} 个浏览器")
+
+    def pop_stats(self) -> Dict:
+        """返回并清空本次运行的统计：启动次数、平均启动耗时、渲染页数、回收和崩溃次数"""
+        with self._cond:
+            stats, self._stats = self._stats, self._empty_stats()
+        stats["avg_startup_seconds"] = stats["startup_seconds"] / stats["starts"] if stats["starts"] else 0.0
+        return stats
+
+
+# 全局浏览器池实例（第一次渲染页面时才创建）
+browser_pool = LazyObject(lambda: BrowserPool(config.selenium_pool_size, config.selenium_max_pages))
@@ -0,0 +1,180 @@
+"""
+邮件发送模块 - 后台发送线程，复用已登录的 SMTP 连接，断线自动重连
+"""
+import logging
+import queue
+import smtplib
+import threading
+import time
+from concurrent.futures import Future
+from email.message import Message
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 连接空闲超过这个秒数，发送前先用 NOOP 检查是否仍然可用
+NOOP_AFTER = 10
+
+
+class EmailDispatcher:
+    """后台邮件发送
+
+    第一次提交邮件时启动 pool_size 个发送线程，每个线程持有一个已登录的连接，
+    连续发送时复用；连接空闲超过 idle_timeout 秒后主动断开，发送失败时重连并重试。
+    """
+
+    def __init__(self, smtp_config: Dict, pool_size: int = 1, idle_timeout: float = 60, max_retries: int = 3):
+        self.smtp_config = smtp_config
+        self.pool_size = max(1, pool_size)
+        self.idle_timeout = idle_timeout
+        self.max_retries = max_retries
+
+        self._queue: "queue.Queue[Optional[Tuple[Message, Future]]]" = queue.Queue()
+        self._threads = []
+        self._start_lock = threading.Lock()
+        self._idle = threading.Condition()
+        self._pending = 0
+        self._stats = self._empty_stats()
+
+    @staticmethod
+    def _empty_stats() -> Dict:
+        return {"sent": 0, "failed": 0, "connections": 0, "reconnects": 0, "send_latency_total": 0.0}
+
+    def _start(self) -> None:
+        with self._start_lock:
+            self._threads = [t for t in self._threads if t.is_alive()]
+            for i in range(len(self._threads), self.pool_size):
+                thread = threading.Thread(target=self._worker, name=f"smtp-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, msg: Message) -> Future:
+        """提交一封邮件（立即返回）；返回的 Future 在发送完成后得到是否成功"""
+        self._start()
+        future = Future()
+        with self._idle:
+            self._pending += 1
+        self._queue.put((msg, future))
+        return future
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """等待已提交的邮件全部发送完成（或失败），超时返回 False"""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """发送完剩余邮件后断开连接并结束发送线程"""
+        self.flush(timeout)
+        with self._start_lock:
+            threads, self._threads = self._threads, []
+        for _ in threads:
+            self._queue.put(None)
+        for thread in threads:
+            thread.join(timeout)
+
+    def pop_stats(self) -> Dict:
+        """返回并清空统计：发送、失败、新建连接、重连次数和平均发送耗时"""
+        with self._idle:
+            stats, self._stats = self._stats, self._empty_stats()
+        stats["avg_send_latency"] = stats.pop("send_latency_total") / (stats["sent"] or 1)
+        return stats
+
+    def _connect(self) -> smtplib.SMTP:
+        cfg = self.smtp_config
+        host, port = cfg["smtp_host"], cfg.get("smtp_port", 587)
+        if cfg.get("use_ssl", False):
+            # 使用 SSL 连接 (端口 465)
+            server = smtplib.SMTP_SSL(host, port, timeout=30)
+        else:
+            # 使用普通 SMTP 连接
+            server = smtplib.SMTP(host, port, timeout=30)
+            if cfg.get("use_tls", False):
+                server.starttls()
+        if cfg.get("username") and cfg.get("password"):
+            server.login(cfg["username"], cfg["password"])
+        with self._idle:
+            self._stats["connections"] += 1
+        return server
+
+    @staticmethod
+    def _disconnect(server: Optional[smtplib.SMTP]) -> None:
+        if server is None:
+            return
+        try:
+            server.quit()
+        except Exception:
+            server.close()
+
+    @staticmethod
+    def _is_alive(server: smtplib.SMTP) -> bool:
+        try:
+            return server.noop()[0] == 250
+        except Exception:
+            return False
+
+    def _worker(self) -> None:
+        server: Optional[smtplib.SMTP] = None
+        last_used = 0.0
+        while True:
+            try:
+                item = self._queue.get(timeout=self.idle_timeout if server else None)
+            except queue.Empty:
+                # 空闲太久，主动断开，避免被服务器超时关闭
+                self._disconnect(server)
+                server = None
+                continue
+            if item is None:
+                self._disconnect(server)
+                return
+            msg, future = item
+
+            if server and time.monotonic() - last_used > NOOP_AFTER and not self._is_alive(server):
+                self._disconnect(server)
+                server = None
+            server, ok = self._send(server, msg)
+            last_used = time.monotonic()
+            future.set_result(ok)
+            with self._idle:
+                self._pending -= 1
+                self._idle.notify_all()
+
+    @staticmethod
+    def _is_transient(error: Exception) -> bool:
+        """断线、网络错误和 4xx 临时错误可以重试；5xx（认证失败、收件人被拒等）重试无意义"""
+        if isinstance(error, smtplib.SMTPResponseException):
+            return 400 <= error.smtp_code < 500
+        if isinstance(error, smtplib.SMTPServerDisconnected):
+            return True
+        return isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+
+    def _send(self, server: Optional[smtplib.SMTP], msg: Message) -> Tuple[Optional[smtplib.SMTP], bool]:
+        """发送一封邮件，失败时重连重试；返回可继续复用的连接和是否发送成功"""
+        for attempt in range(self.max_retries + 1):
+            start = time.monotonic()
+            try:
+                if server is None:
+                    server = self._connect()
+                    if attempt:
+                        with self._idle:
+                            self._stats["reconnects"] += 1
+                server.send_message(msg)
+            except Exception as e:
+                if not self._is_transient(e):
+                    logger.error(f"Email发送失败: {e}")
+                    break
+                logger.warning(f"Email发送失败，重连后重试 ({attempt + 1}/{self.max_retries + 1}): {e}")
+                self._disconnect(server)
+                server = None
+                if attempt < self.max_retries:
+                    time.sleep(min(2 ** attempt, 30))
+                continue
+            else:
+                with self._idle:
+                    self._stats["sent"] += 1
+                    self._stats["send_latency_total"] += time.monotonic() - start
+                logger.info(f"Email发送成功: {msg['Subject']}")
+                return server, True
+
+        with self._idle:
+            self._stats["failed"] += 1
+        return server, False
@@ -0,0 +1,106 @@
+"""
+订阅源模块 - 流式解析 RSS / Atom 和 sitemap.xml，用于增量发现新文章
+"""
+import heapq
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import unquote, urlsplit
+
+from lxml import etree
+
+
+def parse_date(text: Optional[str]) -> Optional[datetime]:
+    """解析 RFC 822（RSS pubDate）或 W3C / ISO 8601（Atom、sitemap lastmod）日期，统一为 UTC"""
+    if not text:
+        return None
+    text = text.strip()
+    try:
+        value = datetime.fromisoformat(text[:-1] + "+00:00" if text.endswith("Z") else text)
+    except ValueError:
+        try:
+            value = parsedate_to_datetime(text)
+        except (TypeError, ValueError):
+            return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _localname(element) -> str:
+    return etree.QName(element).localname if isinstance(element.tag, str) else ""
+
+
+def _child_text(element, *names: str) -> str:
+    for child in element:
+        if _localname(child) in names:
+            return (child.text or "").strip()
+    return ""
+
+
+def _atom_link(entry) -> str:
+    """Atom 的链接在 href 属性中，优先取 rel=alternate"""
+    fallback = ""
+    for child in entry:
+        if _localname(child) == "link":
+            if child.get("rel", "alternate") == "alternate":
+                return child.get("href", "")
+            fallback = fallback or child.get("href", "")
+    return fallback
+
+
+def _release(element) -> None:
+    """释放已处理的元素及其前面的兄弟节点，保持内存占用恒定"""
+    element.clear()
+    parent = element.getparent()
+    if parent is not None:
+        while element.getprevious() is not None:
+            del parent[0]
+
+
+def iter_feed_entries(stream) -> Iterator[Dict]:
+    """按文档顺序逐条解析 RSS item / Atom entry：{title, url, date(datetime 或 None)}"""
+    for _, element in etree.iterparse(stream, events=("end",), recover=True):
+        name = _localname(element)
+        if name not in ("item", "entry"):
+            continue
+        if name == "item":
+            url = _child_text(element, "link")
+            date = _child_text(element, "pubDate", "date")
+        else:
+            url = _atom_link(element)
+            date = _child_text(element, "published", "updated")
+        entry = {"title": _child_text(element, "title"), "url": url, "date": parse_date(date)}
+        _release(element)
+        yield entry
+
+
+def iter_sitemap_entries(stream) -> Iterator[Tuple[str, str, Optional[datetime]]]:
+    """逐条解析 sitemap：(kind, loc, lastmod)，kind 为 url 或 sitemap（sitemap 索引中的子文件）"""
+    for _, element in etree.iterparse(stream, events=("end",), recover=True):
+        name = _localname(element)
+        if name not in ("url", "sitemap"):
+            continue
+        entry = (name, _child_text(element, "loc"), parse_date(_child_text(element, "lastmod")))
+        _release(element)
+        yield entry
+
+
+def newest(entries: Iterator[Tuple[str, Optional[datetime]]], limit: int) -> List[Tuple[str, datetime]]:
+    """从 (loc, lastmod) 流中选出最新的 limit 个，只保留一个大小为 limit 的堆"""
+    heap: List[Tuple[datetime, str]] = []
+    for loc, lastmod in entries:
+        if lastmod is None:
+            continue
+        if len(heap) < limit:
+            heapq.heappush(heap, (lastmod, loc))
+        elif lastmod > heap[0][0]:
+            heapq.heapreplace(heap, (lastmod, loc))
+    return [(loc, lastmod) for lastmod, loc in sorted(heap, reverse=True)]
+
+
+def title_from_url(url: str) -> str:
+    """sitemap 不含标题，用链接最后一段生成标题（how-to-anodize-aluminum -> How To Anodize Aluminum）"""
+    slug = unquote(urlsplit(url).path.rstrip("/").rsplit("/", 1)[-1])
+    slug = slug.rsplit(".", 1)[0] if "." in slug else slug
+    return " ".join(word.capitalize() for word in slug.replace("_", "-").split("-") if word)
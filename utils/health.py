@@ -0,0 +1,120 @@
+"""
+站点健康模块 - 熔断器和自适应轮询，状态保存在站点元数据（health 字段）中
+"""
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+from config import config
+from utils.storage import storage
+
+logger = logging.getLogger(__name__)
+
+# 熔断器状态；OPEN 状态冷却期结束后的一次运行为半开试探（只尝试一次，不重试）
+CLOSED = "closed"
+OPEN = "open"
+
+# 每日运行的开始时间会有浮动，提前这么久的到期时间也视为已到期
+DUE_GRACE = timedelta(hours=1)
+
+# 延迟和发布间隔的指数移动平均系数
+EWMA_ALPHA = 0.3
+
+
+def _parse(value: Optional[str]) -> Optional[datetime]:
+    try:
+        return datetime.fromisoformat(value) if value else None
+    except ValueError:
+        return None
+
+
+def _ewma(previous: Optional[float], value: float) -> float:
+    return value if previous is None else previous + EWMA_ALPHA * (value - previous)
+
+
+class HealthTracker:
+    """站点健康状态
+
+    health 字段：consecutive_failures、last_success、last_failure、avg_latency（秒）、
+    state、opened_count、next_probe_at、last_new_article_at、avg_publish_interval（小时）、next_poll_at
+    """
+
+    def get(self, site_key: str) -> Dict:
+        return dict(storage.get_site_meta(site_key).get("health") or {})
+
+    def _save(self, site_key: str, health: Dict) -> None:
+        storage.update_site_meta(site_key, health=health)
+
+    def check(self, site_key: str, now: Optional[datetime] = None) -> Tuple[str, Optional[str]]:
+        """本次运行如何处理站点：("run" | "probe" | "skip", 跳过原因)"""
+        if not config.health_enabled:
+            return "run", None
+
+        now = now or datetime.now()
+        health = self.get(site_key)
+        if health.get("state") == OPEN:
+            next_probe_at = _parse(health.get("next_probe_at"))
+            if next_probe_at and next_probe_at - DUE_GRACE > now:
+                return "skip", f"熔断中，{next_probe_at:%Y-%m-%d %H:%M} 后试探"
+            return "probe", None
+
+        next_poll_at = _parse(health.get("next_poll_at"))
+        if config.adaptive_polling and next_poll_at and next_poll_at - DUE_GRACE > now:
+            return "skip", f"发布频率较低，{next_poll_at:%Y-%m-%d %H:%M} 后再轮询"
+        return "run", None
+
+    def record_success(self, site_key: str, latency: float, new_count: int) -> None:
+        """站点处理成功：关闭熔断器，更新延迟和发布频率"""
+        now = datetime.now()
+        health = self.get(site_key)
+        if health.get("state") == OPEN:
+            logger.info(f"站点 {site_key} 试探成功，熔断器关闭")
+
+        health.update(
+            state=CLOSED,
+            consecutive_failures=0,
+            opened_count=0,
+            next_probe_at=None,
+            last_success=now.isoformat(timespec="seconds"),
+            avg_latency=round(_ewma(health.get("avg_latency"), latency), 3),
+        )
+
+        if new_count:
+            last_new = _parse(health.get("last_new_article_at"))
+            if last_new:
+                # 两次发现新文章之间的间隔，近似站点的发布间隔
+                interval = (now - last_new).total_seconds() / 3600
+                health["avg_publish_interval"] = round(_ewma(health.get("avg_publish_interval"), interval), 2)
+            health["last_new_article_at"] = now.isoformat(timespec="seconds")
+
+        health["next_poll_at"] = self._next_poll_at(health, now)
+        self._save(site_key, health)
+
+    def _next_poll_at(self, health: Dict, now: datetime) -> Optional[str]:
+        """发布越少的站点轮询间隔越长（平均发布间隔 x poll_factor，不超过 max_poll_interval_hours）"""
+        interval = health.get("avg_publish_interval")
+        if not interval:
+            return None
+        hours = min(interval * config.poll_factor, config.max_poll_interval_hours)
+        return (now + timedelta(hours=hours)).isoformat(timespec="seconds")
+
+    def record_failure(self, site_key: str) -> None:
+        """站点最终失败（重试用尽）：连续失败达到阈值或试探失败时打开熔断器，冷却时间逐次翻倍"""
+        now = datetime.now()
+        health = self.get(site_key)
+        failures = health.get("consecutive_failures", 0) + 1
+        health.update(consecutive_failures=failures, last_failure=now.isoformat(timespec="seconds"))
+
+        if health.get("state") == OPEN or failures >= config.failure_threshold:
+            opened_count = health.get("opened_count", 0) + 1
+            hours = min(config.cooldown_hours * 2 ** (opened_count - 1), config.max_cooldown_hours)
+            next_probe_at = now + timedelta(hours=hours)
+            health.update(state=OPEN, opened_count=opened_count, next_probe_at=next_probe_at.isoformat(timespec="seconds"))
+            logger.warning(
+                f"站点 {site_key} 连续失败 {failures} 次，熔断器打开，{next_probe_at:%Y-%m-%d %H:%M} 后试探"
+            )
+        self._save(site_key, health)
+
+
+# 全局健康状态实例
+health = HealthTracker()
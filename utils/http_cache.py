@@ -0,0 +1,91 @@
+"""
+HTTP缓存模块 - 持久化列表页的 ETag / Last-Modified，用于条件请求
+"""
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+from config import HTTP_CACHE_FILE
+
+logger = logging.getLogger(__name__)
+
+
+class _NotModified:
+    """页面未变化（HTTP 304）的标记"""
+
+    def __repr__(self):
+        return "NOT_MODIFIED"
+
+
+NOT_MODIFIED = _NotModified()
+
+
+class ValidatorCache:
+    """URL -> {etag, last_modified} 的磁盘缓存
+
+    200 响应的校验值先暂存，站点处理成功（快照已更新）后再 commit，
+    避免解析失败的页面在下次运行时因 304 被当作"无变化"跳过。
+    """
+
+    def __init__(self, cache_file: Path = HTTP_CACHE_FILE):
+        self.cache_file = cache_file
+        self._lock = threading.Lock()
+        self._validators: Dict[str, Dict] = self._load()
+        self._pending: Dict[str, Dict] = {}
+        self._dirty = False
+
+    def _load(self) -> Dict:
+        """加载缓存文件"""
+        try:
+            with open(self.cache_file, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (json.JSONDecodeError, FileNotFoundError):
+            return {}
+
+    def conditional_headers(self, url: str) -> Dict:
+        """生成 If-None-Match / If-Modified-Since 请求头"""
+        with self._lock:
+            validator = self._validators.get(url)
+        if not validator:
+            return {}
+
+        headers = {}
+        if validator.get("etag"):
+            headers["If-None-Match"] = validator["etag"]
+        if validator.get("last_modified"):
+            headers["If-Modified-Since"] = validator["last_modified"]
+        return headers
+
+    def stage(self, url: str, etag: Optional[str], last_modified: Optional[str]) -> None:
+        """暂存 200 响应中的校验值"""
+        with self._lock:
+            if etag or last_modified:
+                self._pending[url] = {"etag": etag, "last_modified": last_modified}
+            else:
+                self._pending.pop(url, None)
+
+    def commit(self, url: str) -> None:
+        """站点处理成功后，启用暂存的校验值"""
+        with self._lock:
+            validator = self._pending.pop(url, None)
+            if validator:
+                self._validators[url] = validator
+                self._dirty = True
+
+    def save(self) -> None:
+        """写回缓存文件（先写临时文件再替换）"""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = dict(self._validators)
+            self._dirty = False
+
+        self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.cache_file.with_suffix(".tmp")
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, self.cache_file)
+        logger.debug(f"HTTP缓存已保存: {len(data)} 个URL")
@@ -0,0 +1,97 @@
+"""
+关键词匹配模块 - 全部关键词编译为一个前缀树正则，一次扫描标题得到所有匹配的关键词
+"""
+import re
+import unicodedata
+from typing import Dict, List, Optional, Union
+
+from config import config
+
+KeywordEntry = Union[str, Dict]
+
+
+def _needs_boundary(ch: str) -> bool:
+    """整词匹配只约束字母数字边界；中日韩文字没有词间空格，不加边界"""
+    return ch.isalnum() and unicodedata.east_asian_width(ch) not in ("W", "F")
+
+
+def _trie_regex(trie: Dict) -> str:
+    """把前缀树展开为正则（公共前缀只出现一次，分支按字符排序，可选后缀贪婪匹配最长关键词）"""
+    end = "" in trie
+    branches = [re.escape(ch) + _trie_regex(child) for ch, child in sorted(trie.items()) if ch]
+    if not branches:
+        return ""
+    if len(branches) == 1 and not end:
+        return branches[0]
+    alternation = f"(?:{'|'.join(branches)})"
+    return f"{alternation}?" if end else alternation
+
+
+class KeywordMatcher:
+    """编译后的多关键词匹配器
+
+    关键词和标题都做 Unicode casefold（不区分大小写，ß / ſ 等也能匹配）；
+    关键词可以是字符串，或 {"keyword": ..., "word_boundary": true/false} 单独指定是否整词匹配。
+    正则在每个位置匹配最长的关键词，该位置上作为其前缀的较短关键词同时计入，
+    因此 "CNC" 和 "CNC machining" 都会出现在结果中。
+    """
+
+    def __init__(self, keywords: List[KeywordEntry], word_boundary: bool = False):
+        # casefold 后的关键词 -> (原始写法, 是否整词匹配)
+        self._keywords: Dict[str, tuple] = {}
+        for entry in keywords:
+            if isinstance(entry, dict):
+                text, boundary = str(entry["keyword"]), entry.get("word_boundary", word_boundary)
+            else:
+                text, boundary = str(entry), word_boundary
+            folded = text.strip().casefold()
+            if folded:
+                self._keywords[folded] = (text.strip(), bool(boundary))
+
+        trie: Dict = {}
+        for folded in self._keywords:
+            node = trie
+            for ch in folded:
+                node = node.setdefault(ch, {})
+            node[""] = True
+        # 最长关键词 -> 同一位置开始的全部关键词（它自己和作为它前缀的关键词）
+        self._prefixes: Dict[str, List[str]] = {
+            folded: [folded[:i] for i in range(1, len(folded) + 1) if folded[:i] in self._keywords]
+            for folded in self._keywords
+        }
+        self._pattern = re.compile(f"(?=({_trie_regex(trie)}))") if trie else None
+
+    def __len__(self) -> int:
+        return len(self._keywords)
+
+    def _boundary_ok(self, text: str, start: int, folded: str) -> bool:
+        end = start + len(folded)
+        if _needs_boundary(folded[0]) and start > 0 and _needs_boundary(text[start - 1]):
+            return False
+        if _needs_boundary(folded[-1]) and end < len(text) and _needs_boundary(text[end]):
+            return False
+        return True
+
+    def match(self, text: str) -> List[str]:
+        """返回 text 中出现的关键词（原始写法，按首次出现的顺序去重）"""
+        if not self._pattern or not text:
+            return []
+        folded_text = text.casefold()
+        found: Dict[str, None] = {}
+        for m in self._pattern.finditer(folded_text):
+            start = m.start()
+            for folded in self._prefixes[m.group(1)]:
+                original, boundary = self._keywords[folded]
+                if original not in found and (not boundary or self._boundary_ok(folded_text, start, folded)):
+                    found[original] = None
+        return list(found)
+
+
+def keyword_matcher(site_key: Optional[str] = None) -> KeywordMatcher:
+    """站点使用的匹配器（由当前配置快照按站点编译并缓存，配置热加载后自动使用新规则）"""
+    return config.keyword_matcher(site_key)
+
+
+def match_keywords(title: str, site_key: Optional[str] = None) -> List[str]:
+    """标题中匹配到的关键词"""
+    return keyword_matcher(site_key).match(title)
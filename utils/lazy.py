@@ -0,0 +1,45 @@
+"""
+延迟创建模块 - 全局单例在第一次使用时才创建，导入模块不再触发磁盘读写、网络客户端和重量级依赖的加载
+"""
+import threading
+from typing import Any, Callable
+
+
+class LazyObject:
+    """代理对象：第一次访问属性时调用 factory 创建真实对象，之后所有属性读写都转发给它
+
+    创建过程加锁，多个线程同时第一次访问只会创建一次。
+    """
+
+    __slots__ = ("_lazy_factory", "_lazy_instance", "_lazy_lock")
+
+    def __init__(self, factory: Callable[[], Any]):
+        object.__setattr__(self, "_lazy_factory", factory)
+        object.__setattr__(self, "_lazy_instance", None)
+        object.__setattr__(self, "_lazy_lock", threading.Lock())
+
+    def _resolve(self) -> Any:
+        instance = self._lazy_instance
+        if instance is None:
+            with self._lazy_lock:
+                instance = self._lazy_instance
+                if instance is None:
+                    instance = self._lazy_factory()
+                    object.__setattr__(self, "_lazy_instance", instance)
+        return instance
+
+    @property
+    def is_created(self) -> bool:
+        """真实对象是否已经创建（用于关闭资源时跳过从未使用过的单例）"""
+        return self._lazy_instance is not None
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._resolve(), name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self._resolve(), name, value)
+
+    def __repr__(self) -> str:
+        if self._lazy_instance is None:
+            return f"<LazyObject {getattr(self._lazy_factory, '__qualname__', self._lazy_factory)} (未创建)>"
+        return repr(self._lazy_instance)
@@ -1,101 +1,56 @@
 """
 通知模块 - Telegram和Email通知
 """
-import asyncio
 import logging
-import smtplib
+from concurrent.futures import TimeoutError as FutureTimeout
 from datetime import datetime
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
 from typing import List, Dict, Optional
 
-from telegram import Bot
-from telegram.error import TelegramError
-
 from config import config
+from utils.lazy import LazyObject
 
 logger = logging.getLogger(__name__)
 
 
 class TelegramNotifier:
-    """Telegram通知类"""
+    """Telegram通知类（消息由常驻发送线程合并、限速发送）"""
 
     def __init__(self, token: str = None, chat_id: str = None):
         self.token = token or config.telegram_token
         self.chat_id = chat_id or config.telegram_chat_id
-        self.bot = Bot(token=self.token) if self.token else None
+        self.worker = None
+        if self.is_configured():
+            # 发送线程模块依赖 asyncio，telegram 库在线程启动后才导入
+            from utils.telegram_worker import create_worker
+            self.worker = create_worker(self.token, self.chat_id)
 
     def is_configured(self) -> bool:
         """检查是否已配置"""
-        return bool(self.token and self.chat_id and self.bot)
-
-    def send_message(self, text: str) -> bool:
-        """发送消息"""
-        if not self.is_configured():
-            logger.warning("Telegram未配置，跳过发送")
-            return False
-
-        try:
-            # python-telegram-bot 20.x 使用异步API
-            import concurrent.futures
-            def _send():
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                try:
-                    return loop.run_until_complete(
-                        self.bot.send_message(
-                            chat_id=self.chat_id,
-                            text=text,
-                            parse_mode="HTML"
-                        )
-                    )
-                finally:
-                    loop.close()
-
-            with concurrent.futures.ThreadPoolExecutor() as executor:
-                future = executor.submit(_send)
-                future.result()
-
-            logger.info(f"Telegram消息发送成功")
-            return True
-        except TelegramError as e:
-            logger.error(f"Telegram发送失败: {e}")
-            return False
-        except Exception as e:
-            logger.error(f"Telegram发送失败: {e}")
-            return False
-
-    def send_article_alert(self, site_name: str, article: Dict) -> bool:
-        """发送文章提醒"""
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M")
-
-        message = (
-            f"📢 <b>【竞品动态提醒】</b>\n\n"
-            f"<b>厂商</b>：{site_name}\n"
-            f"<b>标题</b>：{article.get('title', '')}\n"
-            f"<b>链接</b>：{article.get('url', '')}\n"
-            f"<b>检测时间</b>：{timestamp}"
-        )
-
-        return self.send_message(message)
+        return bool(self.token and self.chat_id)
 
-    def send_error_alert(self, site_name: str, error_msg: str) -> bool:
-        """发送错误报警"""
-        message = (
-            f"⚠️ <b>【爬虫失效提醒】</b>\n\n"
-            f"<b>站点</b>：{site_name}\n"
-            f"<b>错误</b>：{error_msg}\n"
-            f"<b>时间</b>：{datetime.now().strftime('%Y-%m-%d %H:%M')}"
-        )
+    def close(self) -> None:
+        """发送剩余消息并关闭发送线程"""
+        if self.worker:
+            self.worker.close()
 
-        return self.send_message(message)
+    def pop_stats(self) -> Dict:
+        """本次运行的发送统计"""
+        return self.worker.pop_stats() if self.worker else {}
 
 
 class EmailNotifier:
     """Email通知类"""
 
     def __init__(self):
+        from utils.email_dispatcher import EmailDispatcher
+
         self.config = config.email_config
+        self.dispatcher = EmailDispatcher(
+            self.config,
+            pool_size=self.config.get("pool_size", 1),
+            idle_timeout=self.config.get("idle_timeout", 60),
+            max_retries=self.config.get("max_retries", 3),
+        )
 
     def is_configured(self) -> bool:
         """检查是否已配置"""
@@ -106,153 +61,97 @@ class EmailNotifier:
             self.config.get("to_emails")
         )
 
-    def _create_html_content(self, articles: List[Dict], site_name: str) -> str:
-        """创建HTML内容"""
-        rows = ""
-        for article in articles:
-            rows += f"""
-            <tr>
-                <td>{site_name}</td>
-                <td>{article.get('title', '')}</td>
-                <td><a href="{article.get('url', '')}">{article.get('url', '')}</a></td>
-                <td>{article.get('date', '')}</td>
-            </tr>
-            """
-
-        html = f"""
-        <html>
-        <head>
-            <meta charset="utf-8">
-            <style>
-                table {{ border-collapse: collapse; width: 100%; }}
-                th, td {{ border: 1px solid #ddd; padding: 8px; text-align: left; }}
-                th {{ background-color: #4CAF50; color: white; }}
-                tr:nth-child(even) {{ background-color: #f2f2f2; }}
-            </style>
-        </head>
-        <body>
-            <h2>📢 竞品监控新文章提醒</h2>
-            <p>检测到以下新增文章（包含关键词：CNC/Machining）：</p>
-            <table>
-                <tr>
-                    <th>厂商</th>
-                    <th>标题</th>
-                    <th>链接</th>
-                    <th>日期</th>
-                </tr>
-                {rows}
-            </table>
-            <p style="color: #666; font-size: 12px;">
-                此邮件由CNC竞品监控系统自动发送<br>
-                检测时间：{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-            </p>
-        </body>
-        </html>
-        """
-        return html
+    def build_message(self, subject: str, html_content: str):
+        """构造 HTML 邮件"""
+        from email.mime.multipart import MIMEMultipart
+        from email.mime.text import MIMEText
 
-    def send_email(self, subject: str, html_content: str) -> bool:
-        """发送邮件"""
-        if not self.is_configured():
-            logger.warning("Email未配置，跳过发送")
-            return False
+        msg = MIMEMultipart("alternative")
+        msg["Subject"] = subject
+        msg["From"] = self.config.get("from_email", self.config.get("username"))
+        msg["To"] = ", ".join(self.config["to_emails"])
 
-        try:
-            msg = MIMEMultipart("alternative")
-            msg["Subject"] = subject
-            msg["From"] = self.config.get("from_email", self.config.get("username"))
-            msg["To"] = ", ".join(self.config["to_emails"])
-
-            part = MIMEText(html_content, "html", "utf-8")
-            msg.attach(part)
-
-            smtp_host = self.config["smtp_host"]
-            smtp_port = self.config.get("smtp_port", 587)
-            username = self.config["username"]
-            password = self.config["password"]
-            use_tls = self.config.get("use_tls", False)
-            use_ssl = self.config.get("use_ssl", False)
-
-            if use_ssl:
-                # 使用 SSL 连接 (端口 465)
-                with smtplib.SMTP_SSL(smtp_host, smtp_port) as server:
-                    server.login(username, password)
-                    server.send_message(msg)
-            else:
-                # 使用普通 SMTP 连接
-                with smtplib.SMTP(smtp_host, smtp_port) as server:
-                    if use_tls:
-                        server.starttls()
-                    server.login(username, password)
-                    server.send_message(msg)
-
-            logger.info(f"Email发送成功: {subject}")
-            return True
-
-        except Exception as e:
-            logger.error(f"Email发送失败: {e}")
-            return False
+        part = MIMEText(html_content, "html", "utf-8")
+        msg.attach(part)
+        return msg
 
-    def send_article_alert(self, articles: List[Dict], site_name: str) -> bool:
-        """发送文章提醒"""
-        date_str = datetime.now().strftime("%Y-%m-%d")
-        subject = f"【竞品监控】发现新文章提醒 - {date_str}"
+    def close(self) -> None:
+        """发送剩余邮件并断开连接"""
+        self.dispatcher.close()
 
-        html_content = self._create_html_content(articles, site_name)
-        return self.send_email(subject, html_content)
+    def pop_stats(self) -> Dict:
+        """本次运行的发送统计"""
+        return self.dispatcher.pop_stats()
 
 
 class Notifier:
-    """统一通知类"""
+    """统一通知类（只通过 deliver 发送，由发件箱调用，保证去重和失败重试）"""
 
     def __init__(self):
         self.telegram = TelegramNotifier()
         self.email = EmailNotifier()
 
-    def notify_new_articles(self, site_name: str, articles: List[Dict]) -> None:
-        """通知新文章"""
-        for article in articles:
-            self.telegram.send_article_alert(site_name, article)
-
-        if self.email.is_configured() and articles:
-            self.email.send_article_alert(articles, site_name)
-
-    def notify_error(self, site_name: str, error_msg: str) -> None:
-        """通知错误"""
-        self.telegram.send_error_alert(site_name, error_msg)
+    def close(self) -> None:
+        """关闭通知发送线程和邮件连接"""
+        self.telegram.close()
+        self.email.close()
 
-    def send_summary(self, all_articles: List[Dict], all_errors: List[Dict]) -> None:
-        """发送汇总通知"""
+    def configured_channels(self) -> List[str]:
+        """已配置的通知渠道"""
+        channels = []
+        if self.telegram.is_configured():
+            channels.append("telegram")
+        if self.email.is_configured():
+            channels.append("email")
+        return channels
+
+    def deliver(self, channel: str, all_articles: List[Dict], all_errors: List[Dict],
+                timeout: Optional[float] = None) -> bool:
+        """通过指定渠道发送一条汇总通知并等待结果（供发件箱投递使用），返回是否发送成功"""
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M")
+        if channel == "telegram" and self.telegram.is_configured():
+            future = self.telegram.worker.submit(self._create_summary_text(all_articles, all_errors, timestamp))
+        elif channel == "email" and self.email.is_configured():
+            subject, html = self._create_summary_email(all_articles, all_errors, timestamp)
+            future = self.email.dispatcher.submit(self.email.build_message(subject, html))
+        else:
+            logger.warning(f"通知渠道 {channel} 未配置，无法投递")
+            return False
 
-        # Telegram 汇总消息
-        if self.telegram.is_configured():
-            message = f"📊 <b>【竞品监控日报】</b>\n\n"
-            message += f"<b>检测时间</b>：{timestamp}\n\n"
-
-            if all_articles:
-                message += f"📢 <b>发现 {len(all_articles)} 篇新文章：</b>\n"
-                for article in all_articles:
-                    title = article.get('title', '')[:50]
-                    url = article.get('url', '')
-                    message += f"• {title}\n{url}\n\n"
-            else:
-                message += "✅ 无新增文章\n\n"
-
-            if all_errors:
-                message += f"⚠️ <b>{len(all_errors)} 个站点异常：</b>\n"
-                for err in all_errors:
-                    message += f"• {err['site']}: {err['error'][:50]}\n"
-
-            self.telegram.send_message(message)
-
-        # Email 汇总（有文章或错误时发送）
-        if self.email.is_configured() and (all_articles or all_errors):
-            subject = f"【竞品监控】日报 - {timestamp}"
-            if all_articles:
-                subject = f"【竞品监控】发现 {len(all_articles)} 篇新文章 - {timestamp}"
-            html = self._create_summary_html(all_articles, all_errors, timestamp)
-            self.email.send_email(subject, html)
+        try:
+            return future.result(timeout)
+        except FutureTimeout:
+            logger.warning(f"通知渠道 {channel} 在 {timeout} 秒内未完成发送")
+            return False
+
+    def _create_summary_text(self, all_articles: List[Dict], all_errors: List[Dict], timestamp: str) -> str:
+        """创建 Telegram 汇总消息"""
+        message = f"📊 <b>【竞品监控日报】</b>\n\n"
+        message += f"<b>检测时间</b>：{timestamp}\n\n"
+
+        if all_articles:
+            message += f"📢 <b>发现 {len(all_articles)} 篇新文章：</b>\n"
+            for article in all_articles:
+                title = article.get('title', '')[:50]
+                url = article.get('url', '')
+                keywords = f" [{', '.join(article['keywords'])}]" if article.get('keywords') else ""
+                message += f"• {title}{keywords}\n{url}\n\n"
+        else:
+            message += "✅ 无新增文章\n\n"
+
+        if all_errors:
+            message += f"⚠️ <b>{len(all_errors)} 个站点异常：</b>\n"
+            for err in all_errors:
+                message += f"• {err['site']}: {err['error'][:50]}\n"
+
+        return message
+
+    def _create_summary_email(self, all_articles: List[Dict], all_errors: List[Dict], timestamp: str):
+        """创建汇总邮件的标题和HTML内容"""
+        subject = f"【竞品监控】日报 - {timestamp}"
+        if all_articles:
+            subject = f"【竞品监控】发现 {len(all_articles)} 篇新文章 - {timestamp}"
+        return subject, self._create_summary_html(all_articles, all_errors, timestamp)
 
     def _create_summary_html(self, all_articles: List[Dict], all_errors: List[Dict], timestamp: str) -> str:
         """创建汇总HTML内容"""
@@ -261,6 +160,7 @@ class Notifier:
             rows += f"""
             <tr>
                 <td>{article.get('title', '')}</td>
+                <td>{', '.join(article.get('keywords', []))}</td>
                 <td><a href="{article.get('url', '')}">链接</a></td>
             </tr>
             """
@@ -291,7 +191,7 @@ class Notifier:
             <p><b>检测时间</b>：{timestamp}</p>
 
             <h3>📢 新文章 ({len(all_articles)})</h3>
-            {f'<table><tr><th>标题</th><th>链接</th></tr>{rows}</table>' if all_articles else '<p>✅ 无新增文章</p>'}
+            {f'<table><tr><th>标题</th><th>关键词</th><th>链接</th></tr>{rows}</table>' if all_articles else '<p>✅ 无新增文章</p>'}
 
             {f'<h3>⚠️ 异常站点 ({len(all_errors)})</h3><table><tr><th>站点</th><th>错误</th></tr>{error_rows}</table>' if all_errors else ''}
         </body>
@@ -301,6 +201,6 @@ class Notifier:
 
 
 # 全局通知器实例
-notifier = Notifier()
-telegram_notifier = TelegramNotifier()
-email_notifier = EmailNotifier()
+notifier = LazyObject(Notifier)
+telegram_notifier = LazyObject(TelegramNotifier)
+email_notifier = LazyObject(EmailNotifier)
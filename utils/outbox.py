@@ -0,0 +1,192 @@
+"""
+通知发件箱模块 - 通知与快照在同一次提交中写入存储，由投递线程按渠道合并发送，失败按退避重试
+"""
+import logging
+import random
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from config import config
+from utils.notifier import notifier
+from utils.storage import OUTBOX_DEAD, OUTBOX_DELIVERED, new_outbox_entry, storage
+
+logger = logging.getLogger(__name__)
+
+
+def retry_delay(attempts: int) -> float:
+    """第 attempts 次投递失败后的等待秒数：指数退避，上限 retry_max_delay，并加入随机抖动"""
+    delay = min(config.outbox_retry_max_delay, config.outbox_retry_delay * (2 ** (attempts - 1)))
+    return random.uniform(delay / 2, delay)
+
+
+class Outbox:
+    """通知发件箱（至少投递一次）
+
+    去重键：新文章为 渠道:article:站点:URL（同一文章只入队一次），站点异常为 渠道:error:站点:运行开始时间。
+    每次投递取出全部到期条目，按渠道合并为一条汇总通知；发送成功标记为 delivered，
+    失败按指数退避安排重试，投递 max_attempts 次仍失败标记为 dead。
+    监控运行期间（hold）不读取发件箱，只投递已经提交的条目。
+    """
+
+    def __init__(self):
+        self._thread: Optional[threading.Thread] = None
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._drain_lock = threading.Lock()
+        self._held = 0
+        self._held_lock = threading.Lock()
+        # 本次运行生成的通知条目数（没有配置任何渠道时为 0）
+        self._created = 0
+        self._created_lock = threading.Lock()
+
+    def article_notifications(self, target: Dict, articles: List[Dict]) -> List[Dict]:
+        """新文章通知（每个已配置渠道一条）"""
+        return self._count([
+            new_outbox_entry(f"{channel}:article:{target['key']}:{article['url']}", channel, "article",
+                             {"site": target["name"], "article": article})
+            for article in articles
+            for channel in notifier.configured_channels()
+        ])
+
+    def error_notifications(self, targets: List[Dict], results: List, run_started_at: datetime) -> List[Dict]:
+        """本次运行中失败站点的异常通知"""
+        run_id = run_started_at.isoformat(timespec="seconds")
+        return self._count([
+            new_outbox_entry(f"{channel}:error:{target['key']}:{run_id}", channel, "error",
+                             {"site": target["name"], "error": error_msg})
+            for target, (_, _, error_msg) in zip(targets, results) if error_msg
+            for channel in notifier.configured_channels()
+        ])
+
+    def _count(self, entries: List[Dict]) -> List[Dict]:
+        with self._created_lock:
+            self._created += len(entries)
+        return entries
+
+    def pop_created(self) -> int:
+        """返回并清零本次运行生成的通知条目数"""
+        with self._created_lock:
+            created, self._created = self._created, 0
+        return created
+
+    @contextmanager
+    def hold(self):
+        """监控运行期间暂停读取发件箱（存储会话提交前的条目不可见），结束后立即触发投递"""
+        with self._held_lock:
+            self._held += 1
+        try:
+            yield
+        finally:
+            with self._held_lock:
+                self._held -= 1
+            self.kick()
+
+    def kick(self) -> None:
+        """唤醒投递线程"""
+        self._wakeup.set()
+
+    def start(self) -> None:
+        """启动投递线程（常驻模式），每 poll_interval 秒或被唤醒时投递一次"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="outbox", daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        """停止投递线程，并把到期的通知再投递一次"""
+        if self._thread and self._thread.is_alive():
+            self._stop.set()
+            self._wakeup.set()
+            self._thread.join()
+        self._thread = None
+        self.drain()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.drain()
+            except Exception as e:
+                logger.error(f"投递通知时出错: {e}")
+            self._wakeup.wait(config.outbox_poll_interval)
+            self._wakeup.clear()
+
+    def drain(self) -> int:
+        """投递一次到期的通知，返回投递成功的条目数"""
+        with self._drain_lock:
+            now = datetime.now()
+            with self._held_lock:
+                if self._held:
+                    return 0
+                entries = storage.pending_notifications(now)
+
+            by_channel: Dict[str, List[Dict]] = {}
+            for entry in entries:
+                by_channel.setdefault(entry["channel"], []).append(entry)
+
+            delivered = 0
+            for channel, channel_entries in by_channel.items():
+                if self._deliver(channel, channel_entries):
+                    delivered += len(channel_entries)
+
+            purged = storage.purge_notifications(now - timedelta(days=config.outbox_retention_days))
+            if entries or purged:
+                counts = storage.outbox_counts()
+                logger.info(
+                    f"发件箱 - 本次投递 {delivered}/{len(entries)} 条, 清理 {purged} 条, "
+                    f"待投递 {counts['pending']}, 已投递 {counts['delivered']}, 放弃 {counts['dead']}"
+                )
+                self._log_channel_stats()
+            return delivered
+
+    def _deliver(self, channel: str, entries: List[Dict]) -> bool:
+        """把同一渠道的条目合并为一条汇总通知发送，并记录投递结果"""
+        articles = [entry["payload"]["article"] for entry in entries if entry["kind"] == "article"]
+        errors = [entry["payload"] for entry in entries if entry["kind"] == "error"]
+        try:
+            ok = notifier.deliver(channel, articles, errors, timeout=config.outbox_deliver_timeout)
+            error = None if ok else "发送失败"
+        except Exception as e:
+            ok, error = False, str(e)
+
+        now = datetime.now()
+        with storage.session():
+            for entry in entries:
+                attempts = entry["attempts"] + 1
+                if ok:
+                    storage.update_notification(entry["key"], status=OUTBOX_DELIVERED, attempts=attempts,
+                                                finished_at=now.isoformat(timespec="seconds"), last_error=None)
+                elif attempts >= config.outbox_max_attempts:
+                    logger.error(f"通知 {entry['key']} 投递 {attempts} 次仍失败，放弃: {error}")
+                    storage.update_notification(entry["key"], status=OUTBOX_DEAD, attempts=attempts,
+                                                finished_at=now.isoformat(timespec="seconds"), last_error=error)
+                else:
+                    next_attempt_at = now + timedelta(seconds=retry_delay(attempts))
+                    storage.update_notification(entry["key"], attempts=attempts, last_error=error,
+                                                next_attempt_at=next_attempt_at.isoformat(timespec="seconds"))
+        if not ok:
+            logger.warning(f"{channel} 通知投递失败（{len(entries)} 条），稍后重试: {error}")
+        return ok
+
+    @staticmethod
+    def _log_channel_stats() -> None:
+        telegram_stats = notifier.telegram.pop_stats()
+        if telegram_stats and telegram_stats["alerts"]:
+            logger.info(
+                f"Telegram - 提醒 {telegram_stats['alerts']} 条, 合并为 {telegram_stats['messages']} 条消息, "
+                f"失败 {telegram_stats['failed']}, 重试 {telegram_stats['retries']}, "
+                f"平均发送耗时 {telegram_stats['avg_send_latency']:.2f}s, 最长排队 {telegram_stats['max_queue_latency']:.2f}s"
+            )
+        email_stats = notifier.email.pop_stats()
+        if email_stats["sent"] or email_stats["failed"]:
+            logger.info(
+                f"Email - 发送 {email_stats['sent']} 封, 失败 {email_stats['failed']}, "
+                f"新建连接 {email_stats['connections']}, 重连 {email_stats['reconnects']}, "
+                f"平均发送耗时 {email_stats['avg_send_latency']:.2f}s"
+            )
+
+
+# 全局发件箱实例
+outbox = Outbox()
@@ -1,322 +1,294 @@
 """
 解析器模块 - 解析各站点HTML获取Top 3文章
 """
+import codecs
+import hashlib
 import random
+import re
+import threading
 import time
 import logging
-from typing import List, Dict, Optional
+from datetime import datetime, timedelta
+from typing import List, Dict, Optional, Union
+from urllib.parse import urlparse
 
 import requests
+import yaml
 from bs4 import BeautifulSoup
-from fake_useragent import UserAgent
+from lxml import etree
 
 from config import config
+from utils.browser_pool import browser_pool
+from utils.feeds import iter_feed_entries, iter_sitemap_entries, newest, parse_date, title_from_url
+from utils.http_cache import NOT_MODIFIED, ValidatorCache
+from utils.lazy import LazyObject
+from utils.rules import ExtractionRule, load_rules, rules_version
+from utils.sources import SOURCES, extract_embedded, is_complete, parse_wp_posts, same_scope, wp_api_url
+from utils.storage import storage
+from utils.user_agents import user_agents
 
 logger = logging.getLogger(__name__)
 
+# 解析缓存版本号：修改解析逻辑后递增，使旧的缓存结果失效
+PARSE_CACHE_VERSION = 1
 
-class SeleniumHelper:
-    """Selenium辅助类 - 用于处理JavaScript动态加载的页面"""
+# 流式抓取每次读取的字节数
+STREAM_CHUNK_SIZE = 16 * 1024
 
-    _driver = None
+# 计算页面哈希前去除的内容（脚本、样式、注释中常含随机 nonce，且不影响解析结果）
+_VOLATILE_RE = re.compile(r"<script\b.*?</script>|<style\b.*?</style>|<!--.*?-->", re.S | re.I)
 
-    @classmethod
-    def get_driver(cls):
-        """获取或创建WebDriver"""
-        if cls._driver is None:
-            try:
-                from selenium import webdriver
-                from selenium.webdriver.chrome.service import Service
-                from selenium.webdriver.chrome.options import Options
-
-                chrome_options = Options()
-                chrome_options.add_argument("--headless")
-                chrome_options.add_argument("--no-sandbox")
-                chrome_options.add_argument("--disable-dev-shm-usage")
-                chrome_options.add_argument("--disable-gpu")
-                chrome_options.add_argument("--window-size=1920,1080")
-                chrome_options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36")
-
-                # 优先使用系统自带的 chromedriver（GitHub Actions 环境）
-                try:
-                    service = Service("/usr/bin/chromedriver")
-                    cls._driver = webdriver.Chrome(service=service, options=chrome_options)
-                except Exception:
-                    # 回退到 webdriver_manager（本地 Windows 环境）
-                    from webdriver_manager.chrome import ChromeDriverManager
-                    service = Service(ChromeDriverManager().install())
-                    cls._driver = webdriver.Chrome(service=service, options=chrome_options)
-
-                logger.info("Selenium WebDriver 初始化成功")
-            except Exception as e:
-                logger.error(f"Selenium 初始化失败: {e}")
-                return None
-        return cls._driver
 
-    @classmethod
-    def fetch_page(cls, url: str, wait_time: int = 5) -> Optional[str]:
-        """使用Selenium获取页面HTML"""
-        driver = cls.get_driver()
-        if not driver:
-            return None
+class SeleniumHelper:
+    """Selenium辅助类 - 用于处理JavaScript动态加载的页面（浏览器由 browser_pool 管理）"""
 
+    # 改为条件等待之前 driver.get 之后的固定等待秒数，用于统计节省的时间
+    FIXED_WAIT = 5
+
+    @classmethod
+    def fetch_page(cls, url: str, wait_for: Optional[str] = None, timeout: Optional[float] = None) -> Optional[str]:
+        """使用Selenium获取页面HTML
+
+        Args:
+            url: 页面URL
+            wait_for: 文章元素的 CSS 选择器，出现后立即返回；为空时等待文档加载完成
+            timeout: 最长等待秒数，超时后仍返回当前页面
+        """
+        timeout = config.selenium_wait_timeout if timeout is None else timeout
         try:
-            driver.get(url)
-            time.sleep(wait_time)  # 等待JavaScript加载
-            return driver.page_source
+            with browser_pool.browser() as driver:
+                if not driver:
+                    return None
+
+                from selenium.common.exceptions import TimeoutException
+                from selenium.webdriver.common.by import By
+                from selenium.webdriver.support import expected_conditions as EC
+                from selenium.webdriver.support.ui import WebDriverWait
+
+                driver.get(url)
+                start = time.monotonic()
+                if wait_for:
+                    condition = EC.presence_of_element_located((By.CSS_SELECTOR, wait_for))
+                else:
+                    condition = lambda d: d.execute_script("return document.readyState") == "complete"
+                try:
+                    WebDriverWait(driver, timeout, poll_frequency=0.2).until(condition)
+                except TimeoutException:
+                    logger.warning(f"Selenium 等待超时 ({timeout}s) [{url}]: {wait_for or 'document.readyState'}")
+                waited = time.monotonic() - start
+                if waited <= cls.FIXED_WAIT:
+                    logger.info(
+                        f"Selenium 等待 {waited:.2f}s [{url}]，"
+                        f"比固定等待 {cls.FIXED_WAIT}s 节省 {cls.FIXED_WAIT - waited:.2f}s"
+                    )
+                else:
+                    logger.info(
+                        f"Selenium 等待 {waited:.2f}s [{url}]，"
+                        f"比固定等待 {cls.FIXED_WAIT}s 多等 {waited - cls.FIXED_WAIT:.2f}s"
+                    )
+                return driver.page_source
         except Exception as e:
             logger.error(f"Selenium获取页面失败 [{url}]: {e}")
             return None
 
     @classmethod
     def close(cls):
-        """关闭WebDriver"""
-        if cls._driver:
-            cls._driver.quit()
-            cls._driver = None
+        """关闭全部浏览器"""
+        if browser_pool.is_created:
+            browser_pool.close()
 
 
 class Parser:
     """页面解析器类"""
 
-    def __init__(self):
-        self.ua = UserAgent()
+    def __init__(self, fast_parse: bool = None):
+        self.fast_parse = config.fast_parse if fast_parse is None else fast_parse
         self.session = requests.Session()
-
-    def _get_headers(self) -> Dict:
-        """获取随机请求头"""
+        self.http_cache = ValidatorCache()
+        # 流式抓取统计 {site_key: {...}}
+        self.stream_stats: Dict[str, Dict] = {}
+        self._stream_stats_lock = threading.Lock()
+        self.rules: Dict[str, ExtractionRule] = self._checked_rules(load_rules())
+        self._failed_rules_version = None
+
+    def _checked_rules(self, rules: Dict[str, ExtractionRule]) -> Dict[str, ExtractionRule]:
+        for site_key, rule in rules.items():
+            if rule.hook and not hasattr(self, rule.hook):
+                raise ValueError(f"站点 {site_key} 的规则引用了不存在的解析方法: {rule.hook}")
+        return rules
+
+    def reload_rules(self) -> bool:
+        """rules.yaml 修改后重新编译规则，返回是否换用了新规则
+
+        新规则有误时保留当前规则并记录错误（同一版本只记录一次）。
+        """
+        try:
+            version = rules_version()
+        except OSError:
+            return False
+        if version == self._failed_rules_version:
+            return False
+        try:
+            rules = load_rules()
+            if rules is self.rules:
+                return False
+            self.rules = self._checked_rules(rules)
+        except (OSError, ValueError, yaml.YAMLError) as e:
+            self._failed_rules_version = version
+            logger.error(f"rules.yaml 重新加载失败，继续使用当前规则: {e}")
+            return False
+        self._failed_rules_version = None
+        logger.info(f"rules.yaml 已重新加载，共 {len(rules)} 个站点规则")
+        return True
+
+    def _get_headers(self, url: str) -> Dict:
+        """获取请求头（User-Agent 按域名固定，本次运行中同一站点的请求使用同一个浏览器标识）"""
         return {
-            "User-Agent": self.ua.random,
+            "User-Agent": user_agents.for_host(urlparse(url).netloc.lower()),
             "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
             "Accept-Language": "en-US,en;q=0.5",
             "Connection": "keep-alive",
         }
 
-    def _fetch_page(self, url: str, use_google: bool = False) -> Optional[str]:
-        """获取页面内容"""
+    def _fetch_page(self, url: str, use_google: bool = False, conditional: bool = True) -> Union[str, None, object]:
+        """获取页面内容，页面未变化（304）时返回 NOT_MODIFIED"""
+        headers = self._get_headers(url)
+        if conditional:
+            headers.update(self.http_cache.conditional_headers(url))
+
         try:
             response = self.session.get(
                 url,
-                headers=self._get_headers(),
+                headers=headers,
                 timeout=config.request_timeout,
                 allow_redirects=True
             )
+            if response.status_code == 304:
+                return NOT_MODIFIED
             response.raise_for_status()
+            self.http_cache.stage(url, response.headers.get("ETag"), response.headers.get("Last-Modified"))
             return response.text
         except requests.RequestException as e:
             logger.error(f"获取页面失败 [{url}]: {e}")
             return None
 
-    def _parse_common(self, soup: BeautifulSoup, selectors: Dict) -> List[Dict]:
-        """通用解析方法"""
-        articles = []
-
-        title_selector = selectors.get("title", "a")
-        url_selector = selectors.get("url", "a")
-        container_selector = selectors.get("container")
-
-        if container_selector:
-            containers = soup.select(container_selector)
-            for container in containers[:3]:
-                title_elem = container.select_one(title_selector)
-                url_elem = container.select_one(url_selector)
-
-                if title_elem and url_elem:
-                    title = title_elem.get_text(strip=True)
-                    url = url_elem.get("href", "")
-
-                    if title and url:
-                        articles.append({
-                            "title": title,
-                            "url": url,
-                            "date": ""
-                        })
-        else:
-            links = soup.select(url_selector)[:3]
-            for link in links:
-                title = link.get_text(strip=True)
-                url = link.get("href", "")
-
-                if title and url:
-                    articles.append({
-                        "title": title,
-                        "url": url,
-                        "date": ""
-                    })
-
-        return articles
-
-    def parse_3erp(self, html: str) -> List[Dict]:
-        """解析 3ERP 博客"""
-        soup = BeautifulSoup(html, "lxml")
-        articles = []
-
-        # 3ERP 使用 article.bde-loop-item 结构
-        article_elements = soup.select("article.bde-loop-item")
-
-        for article in article_elements[:3]:
-            # 查找标题 - 多个选择器尝试
-            title_elem = (
-                article.select_one("h2.bde-heading") or
-                article.select_one("div.bde-text-20841-103") or
-                article.select_one("div[class*='bde-text-']")
-            )
-            # 查找链接
-            link_elem = article.select_one("a.bde-container-link")
-
-            if title_elem and link_elem:
-                title = title_elem.get_text(strip=True)
-                url = link_elem.get("href", "")
-
-                if title and url and len(title) > 5:
-                    articles.append({
-                        "title": title,
-                        "url": url,
-                        "date": ""
-                    })
-
-        return articles
-
-    def parse_rapiddirect(self, html: str) -> List[Dict]:
-        """解析 RapidDirect 博客"""
-        soup = BeautifulSoup(html, "lxml")
-        articles = []
-
-        # 使用 h2 + next sibling link 方式
-        headings = soup.find_all('h2')
-        for h in headings[:3]:
-            title = h.get_text(strip=True)
-            next_a = h.find_next('a')
-            if next_a and title and len(title) > 5:
-                url = next_a.get('href', '')
-                if url and '/blog/' in url and 'category' not in url:
-                    articles.append({
-                        "title": title,
-                        "url": url,
-                        "date": ""
-                    })
-
-        return articles
-
-    def parse_fictiv(self, html: str) -> List[Dict]:
-        """解析 Fictiv 网站"""
-        soup = BeautifulSoup(html, "lxml")
-        articles = []
-
-        # 找到所有 /articles/ 链接，从父元素获取标题
-        links = soup.find_all('a', href=lambda x: x and '/articles/' in x and 'category' not in x)
-        seen = set()
-
-        for link in links:
-            href = link.get('href', '')
-            if href and href not in seen:
-                seen.add(href)
-
-                # 从父元素获取标题
-                parent = link.find_parent(['div', 'section', 'article'])
-                if parent:
-                    title_elem = parent.select_one('h2, h3, h4')
-                    if title_elem:
-                        title = title_elem.get_text(strip=True)
-                        if title and len(title) > 10:
-                            # 补全URL
-                            url = href if href.startswith('http') else 'https://fictiv.com' + href
-                            articles.append({
-                                "title": title[:100],
-                                "url": url,
-                                "date": ""
-                            })
-                            if len(articles) >= 3:
-                                break
-
-        return articles
-
-    def parse_protolabs(self, html: str) -> List[Dict]:
-        """解析 Protolabs 博客"""
-        soup = BeautifulSoup(html, "lxml")
-        articles = []
-
-        # 使用 h2/h3 + parent link 方式
-        headings = soup.find_all(['h2', 'h3'])
-        for h in headings[:3]:
-            title = h.get_text(strip=True)
-            parent_a = h.find_parent('a')
-            if parent_a and title and len(title) > 5:
-                url = parent_a.get('href', '')
-                if url:
-                    # 补全URL
-                    if not url.startswith('http'):
-                        url = 'https://www.protolabs.com' + url
-                    articles.append({
-                        "title": title,
-                        "url": url,
-                        "date": ""
-                    })
-
-        return articles
-
-    def parse_wayken(self, html: str) -> List[Dict]:
-        """解析 Wayken 博客"""
-        soup = BeautifulSoup(html, "lxml")
-
-        selectors = {
-            "container": "div.blog-item, article, div.post",
-            "title": "h2 a, h3 a, a.article-title",
-            "url": "h2 a, h3 a, a.article-title"
-        }
-        return self._parse_common(soup, selectors)
-
-    def parse_jlccnc(self, html: str) -> List[Dict]:
-        """解析 JLCCNC 博客"""
-        soup = BeautifulSoup(html, "lxml")
-        articles = []
-
-        # 找到所有博客链接
-        links = soup.find_all('a', href=True)
-        seen = set()
+    def _fetch_json(self, url: str):
+        """获取 JSON 接口，接口不存在或返回的不是 JSON 时返回 None（探测数据源时属于正常情况）"""
+        headers = self._get_headers(url)
+        headers["Accept"] = "application/json"
+        try:
+            response = self.session.get(url, headers=headers, timeout=config.request_timeout, allow_redirects=True)
+            if response.status_code != 200:
+                logger.debug(f"接口不可用 [{url}]: HTTP {response.status_code}")
+                return None
+            return response.json()
+        except (requests.RequestException, ValueError) as e:
+            logger.debug(f"接口不可用 [{url}]: {e}")
+            return None
 
-        for link in links:
-            href = link.get('href', '')
-            # 过滤出博客文章链接
-            if href and '/blog/' in href and 'category' not in href:
-                if href not in seen:
-                    seen.add(href)
-                    text = link.get_text(strip=True)
-                    # 过滤太短的标题
-                    if text and len(text) > 15:
-                        # 补全URL
-                        url = href if href.startswith('http') else 'https://jlccnc.com' + href
-                        articles.append({
-                            "title": text[:100],
-                            "url": url,
-                            "date": ""
-                        })
-                        if len(articles) >= 3:
+    def _open_stream(self, url: str) -> Optional[requests.Response]:
+        """以流式方式打开 URL（调用方负责关闭响应），失败时返回 None"""
+        try:
+            response = self.session.get(url, headers=self._get_headers(url), timeout=config.request_timeout,
+                                        allow_redirects=True, stream=True)
+        except requests.RequestException as e:
+            logger.warning(f"获取订阅源失败 [{url}]: {e}")
+            return None
+        if response.status_code != 200:
+            logger.warning(f"获取订阅源失败 [{url}]: HTTP {response.status_code}")
+            response.close()
+            return None
+        response.raw.decode_content = True
+        return response
+
+    def _fetch_page_streaming(self, url: str, rule: ExtractionRule,
+                              conditional: bool = True) -> Union[str, None, object]:
+        """流式获取页面：边下载边增量解析，提取到足够且稳定的文章后停止下载
+
+        lxml 增量解析器只用于统计候选元素（链接、标题、卡片）的数量，候选足够时
+        才对已下载的前缀执行一次规则提取；连续两次提取结果一致才提前结束，
+        避免最后一篇文章的标题被截断。
+        """
+        headers = self._get_headers(url)
+        if conditional:
+            headers.update(self.http_cache.conditional_headers(url))
+
+        max_bytes = rule.max_bytes or config.stream_max_bytes
+        start = time.monotonic()
+        try:
+            with self.session.get(url, headers=headers, timeout=config.request_timeout,
+                                  allow_redirects=True, stream=True) as response:
+                if response.status_code == 304:
+                    return NOT_MODIFIED
+                response.raise_for_status()
+                self.http_cache.stage(url, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+
+                decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")(errors="replace")
+                pull_parser = etree.HTMLPullParser(events=("end",))
+                parts: List[str] = []
+                candidates = 0
+                next_attempt = rule.limit
+                last_result = None
+                first_article_at = None
+                truncated = False
+
+                for chunk in response.iter_content(STREAM_CHUNK_SIZE):
+                    parts.append(decoder.decode(chunk))
+                    pull_parser.feed(chunk)
+                    for _, element in pull_parser.read_events():
+                        if rule.candidate_tags is None or element.tag in rule.candidate_tags:
+                            candidates += 1
+                        element.clear(keep_tail=True)
+                    if rule.candidate_tags is None:
+                        candidates = len(parts)
+
+                    if response.raw.tell() >= max_bytes:
+                        truncated = True
+                        break
+                    if candidates < next_attempt:
+                        continue
+
+                    articles = rule.extract(self._make_soup("".join(parts), rule))
+                    if articles and first_article_at is None:
+                        first_article_at = time.monotonic() - start
+                    if len(articles) >= rule.limit:
+                        if articles == last_result:
+                            truncated = True
                             break
+                        # 下一个分块到达后再确认一次
+                        last_result = articles
+                        next_attempt = candidates
+                    else:
+                        next_attempt = candidates * 2
+
+                parts.append(decoder.decode(b"", final=True))
+                bytes_read = response.raw.tell()
+                content_length = response.headers.get("Content-Length")
+        except requests.RequestException as e:
+            logger.error(f"获取页面失败 [{url}]: {e}")
+            return None
 
-        return articles
-
-    def parse_partmfg(self, html: str) -> List[Dict]:
-        """解析 Partmfg 博客"""
-        soup = BeautifulSoup(html, "lxml")
-
-        selectors = {
-            "container": "div.blog-post, article, div.post",
-            "title": "h2 a, h3 a, a.post-title",
-            "url": "h2 a, h3 a, a.post-title"
-        }
-        return self._parse_common(soup, selectors)
-
-    def parse_china_machining(self, html: str) -> List[Dict]:
-        """解析 China-Machining 博客"""
-        soup = BeautifulSoup(html, "lxml")
-
-        selectors = {
-            "container": "div.blog-item, article, div.news-item",
-            "title": "h2 a, h3 a, a.title",
-            "url": "h2 a, h3 a, a.title"
-        }
-        return self._parse_common(soup, selectors)
+        bytes_total = int(content_length) if content_length and content_length.isdigit() else None
+        with self._stream_stats_lock:
+            self.stream_stats[rule.site_key] = {
+                "bytes_read": bytes_read,
+                "bytes_saved": max(bytes_total - bytes_read, 0) if (truncated and bytes_total) else 0,
+                "truncated": truncated,
+                "time_to_first_article": first_article_at,
+                "elapsed": time.monotonic() - start,
+            }
+        return "".join(parts)
+
+    def pop_stream_stats(self) -> Dict[str, Dict]:
+        """返回并清空本次运行的流式抓取统计"""
+        with self._stream_stats_lock:
+            stats, self.stream_stats = self.stream_stats, {}
+        return stats
+
+    def _make_soup(self, html: str, rule: ExtractionRule = None) -> BeautifulSoup:
+        """构建 DOM；快速解析模式下只保留规则需要的子树"""
+        strainer = rule.strainer if (rule and self.fast_parse) else None
+        return BeautifulSoup(html, "lxml", parse_only=strainer)
 
     def parse_hlc_metalparts(self, html: str) -> List[Dict]:
         """解析 HLC-Metalparts 新闻列表"""
@@ -364,120 +336,412 @@ class Parser:
 
         return articles
 
-    def parse_zintilon(self, html: str) -> List[Dict]:
-        """解析 Zintilon 博客"""
-        soup = BeautifulSoup(html, "lxml")
-        articles = []
-
-        # 使用 h2/h3 + parent link 方式
-        headings = soup.find_all(['h2', 'h3'])
-        for h in headings[:3]:
-            title = h.get_text(strip=True)
-            parent_a = h.find_parent('a')
-            if parent_a and title and len(title) > 5:
-                url = parent_a.get('href', '')
-                if url:
-                    # 补全URL
-                    if not url.startswith('http'):
-                        url = 'https://www.zintilon.com' + url
-                    articles.append({
-                        "title": title,
-                        "url": url,
-                        "date": ""
-                    })
-
-        return articles
+    def parse(self, site_key: str, html: str) -> List[Dict]:
+        """按站点规则解析页面；规则声明了 hook 的站点调用 Parser 上的同名方法"""
+        rule = self.rules.get(site_key)
+        if not rule:
+            logger.warning(f"未找到站点 {site_key} 的解析规则")
+            return []
 
-    def parse_cnclathing(self, html: str) -> List[Dict]:
-        """解析 CNC Lathing 网站"""
-        soup = BeautifulSoup(html, "lxml")
-        articles = []
+        if rule.hook:
+            return getattr(self, rule.hook)(html)
+        return rule.extract(self._make_soup(html, rule))
 
-        # 查找所有链接
-        links = soup.find_all('a', href=True)
-        seen = set()
 
-        # 需要过滤的关键词
-        exclude_keywords = ['quote', 'about', 'products', 'contact', 'home', 'email', 'cdn-cgi', 'tel:', 'blog', 'news']
+class SiteMonitor:
+    """站点监控类"""
 
-        for link in links:
-            href = link.get('href', '')
-            text = link.get_text(strip=True)
-
-            # 过滤
-            if (href and href not in seen and
-                text and len(text) > 15 and
-                not any(kw in href.lower() for kw in exclude_keywords) and
-                not any(kw in text.lower() for kw in ['email', 'quote', 'phone', 'contact'])):
-
-                # 只保留有意义的文章/指南链接
-                if '/' in href and not href.startswith('//'):
-                    seen.add(href)
-                    url = href if href.startswith('http') else 'https://www.cnclathing.com' + href
-                    articles.append({
-                        "title": text[:100],
-                        "url": url,
-                        "date": ""
-                    })
-                    if len(articles) >= 3:
-                        break
+    # 需要使用 Selenium 的站点
+    SELENIUM_SITES = ["jlccnc"]
 
-        return articles
+    def __init__(self, page_parser: Optional[Parser] = None):
+        self.parser = Parser() if page_parser is None else page_parser
+        # 按域名记录上次请求时间，礼貌延时只作用于同一域名
+        self._host_lock = threading.Lock()
+        self._host_locks: Dict[str, threading.Lock] = {}
+        self._host_last_fetch: Dict[str, float] = {}
+        # 页面哈希命中 / 未命中次数
+        self._parse_cache_stats = {"hit": 0, "miss": 0}
+        self._stats_lock = threading.Lock()
+        # 本次运行各站点使用的数据源
+        self._sources_used: Dict[str, str] = {}
+        # 订阅源读取到的最新发布时间，站点处理成功后才写入存储
+        self._pending_watermarks: Dict[str, str] = {}
+        # async 引擎预先抓取的页面 {url: html}
+        self._prefetched: Dict[str, Optional[str]] = {}
+        self._prefetch_lock = threading.Lock()
+
+    def prefetch(self, targets: List[Dict]) -> None:
+        """async 引擎下，在一个事件循环中并发抓取所有静态站点，供 fetch_articles 使用"""
+        if config.fetch_backend != "async":
+            return
+
+        from utils.async_fetcher import AsyncFetcher
+
+        if not AsyncFetcher.is_available():
+            logger.warning("未安装 aiohttp，回退到同步抓取")
+            return
+
+        static_targets = [
+            t for t in targets if not (t.get("feed") or t.get("sitemap")) and self.uses_static_page(t["key"])
+        ]
+        urls = [t["url"] for t in static_targets]
+        if not urls:
+            return
+        conditional_urls = {t["url"] for t in static_targets if self._can_use_validators(t["key"])}
+        start = time.monotonic()
+        pages = AsyncFetcher(self.parser).fetch_many(urls, conditional_urls)
+        logger.info(f"async 引擎抓取 {len(urls)} 个页面，耗时 {time.monotonic() - start:.2f} 秒")
+
+        with self._prefetch_lock:
+            # 抓取失败的页面不缓存，交给同步路径重新抓取
+            self._prefetched.update({url: html for url, html in pages.items() if html})
+
+    def clear_prefetched(self) -> None:
+        """丢弃本次运行中未被使用的预取页面"""
+        with self._prefetch_lock:
+            self._prefetched.clear()
+
+    def fetch_articles(self, site_key: str, url: str, use_google: bool = False,
+                       feed: Optional[str] = None, sitemap: Optional[str] = None) -> Union[List[Dict], object]:
+        """获取站点文章列表，页面（或订阅源）未变化时返回 NOT_MODIFIED
+
+        配置了 feed / sitemap 的站点先增量读取订阅源；否则优先使用上次探测出的最便宜的数据源，
+        接口或内嵌数据失效、或缓存过期时重新探测。
+        """
+        rule = self.parser.rules.get(site_key)
+        for kind, feed_url in (("feed", feed), ("sitemap", sitemap)):
+            if not feed_url:
+                continue
+            articles = self._fetch_incremental(kind, site_key, feed_url, rule)
+            if articles is not None:
+                self._record_source(site_key, kind)
+                return articles
+            logger.warning(f"站点 {site_key} 的 {kind} 不可用，回退到页面解析")
+
+        source = storage.get_site_meta(site_key).get("source") or {}
+        if not config.source_probe or not rule:
+            name = self._fallback_source(site_key)
+        elif self._source_expired(source):
+            return self._probe_sources(site_key, url, use_google, rule)
+        else:
+            name = source["name"]
+
+        articles = self._fetch_from_source(name, site_key, url, use_google, rule)
+        if name in ("html", "selenium") or articles is NOT_MODIFIED or is_complete(articles, rule):
+            self._record_source(site_key, name)
+            return articles
+
+        logger.warning(f"站点 {site_key} 的数据源 {name} 不再可用，重新探测")
+        return self._probe_sources(site_key, url, use_google, rule)
+
+    def _fetch_incremental(self, kind: str, site_key: str, feed_url: str,
+                           rule: Optional[ExtractionRule]) -> Union[List[Dict], object, None]:
+        """增量读取 RSS / Atom 或 sitemap，订阅源不可用时返回 None
+
+        只读取比水位线（上次见到的最新发布时间）更新的条目，没有新条目时返回 NOT_MODIFIED；
+        有新条目时与上次的快照合并，返回最新的 limit 篇文章。
+        """
+        limit = rule.limit if rule else 3
+        snapshot = storage.get_yesterday_snapshot(site_key)
+        # 没有快照时完整读取，避免水位线存在但快照为空
+        watermark = parse_date(storage.get_site_meta(site_key).get("watermark")) if snapshot else None
+
+        self._wait_for_host(feed_url)
+        if kind == "feed":
+            entries = self._read_feed(feed_url, watermark, limit, rule)
+        else:
+            found = self._read_sitemap(feed_url, watermark, limit, rule)
+            entries = None if found is None else [
+                {"title": title_from_url(loc), "url": loc, "date": lastmod} for loc, lastmod in found
+            ]
 
-    def parse(self, site_key: str, html: str) -> List[Dict]:
-        """根据站点key调用对应的解析方法"""
-        parser_methods = {
-            "3erp": self.parse_3erp,
-            "rapiddirect": self.parse_rapiddirect,
-            "fictiv": self.parse_fictiv,
-            "protolabs": self.parse_protolabs,
-            "wayken": self.parse_wayken,
-            "jlccnc": self.parse_jlccnc,
-            "partmfg": self.parse_partmfg,
-            "china-machining": self.parse_china_machining,
-            "hlc-metalparts": self.parse_hlc_metalparts,
-            "zintilon": self.parse_zintilon,
-            "cnclathing": self.parse_cnclathing,
-        }
+        if entries is None:
+            return None
+        if not entries:
+            if watermark:
+                logger.info(f"站点 {site_key} 的 {kind} 没有晚于 {watermark.isoformat()} 的新条目")
+                return NOT_MODIFIED
+            return None
 
-        parser = parser_methods.get(site_key)
-        if parser:
-            return parser(html)
+        dates = [entry["date"] for entry in entries if entry["date"]]
+        if dates:
+            with self._stats_lock:
+                self._pending_watermarks[site_key] = max(dates).isoformat()
+
+        articles = [
+            {"title": entry["title"], "url": entry["url"], "date": entry["date"].date().isoformat() if entry["date"] else ""}
+            for entry in entries
+        ]
+        known = {article["url"] for article in articles}
+        articles += [article for article in snapshot if article.get("url") not in known]
+        return articles[:limit]
+
+    def _read_feed(self, feed_url: str, watermark: Optional[datetime], limit: int,
+                   rule: Optional[ExtractionRule]) -> Optional[List[Dict]]:
+        """按文档顺序（最新在前）读取条目，遇到不晚于水位线的条目即停止下载"""
+        response = self.parser._open_stream(feed_url)
+        if response is None:
+            return None
 
-        logger.warning(f"未找到站点 {site_key} 的解析方法")
-        return []
+        entries = []
+        parsed_any = False
+        with response:
+            try:
+                for entry in iter_feed_entries(response.raw):
+                    parsed_any = True
+                    if watermark and entry["date"] and entry["date"] <= watermark:
+                        break
+                    title = rule._clean_title(entry["title"]) if rule else entry["title"]
+                    if not (title and entry["url"]):
+                        continue
+                    entries.append(dict(entry, title=title))
+                    if len(entries) >= limit:
+                        break
+            except Exception as e:
+                logger.warning(f"解析订阅源失败 [{feed_url}]: {e}")
+                return None
+        return entries if parsed_any else None
 
+    def _read_sitemap(self, sitemap_url: str, watermark: Optional[datetime], limit: int,
+                      rule: Optional[ExtractionRule], depth: int = 0) -> Optional[List]:
+        """流式读取 sitemap，返回晚于水位线的最新 limit 个 (loc, lastmod)
 
-class SiteMonitor:
-    """站点监控类"""
+        sitemap 不保证顺序，逐条扫描时只保留大小为 limit 的堆；sitemap 索引中只展开
+        lastmod 晚于水位线的子文件。没有 lastmod 的链接无法增量判断，直接忽略。
+        """
+        response = self.parser._open_stream(sitemap_url)
+        if response is None:
+            return None
 
-    # 需要使用 Selenium 的站点
-    SELENIUM_SITES = ["jlccnc"]
+        children = []
+        parsed_any = False
+
+        def candidates():
+            nonlocal parsed_any
+            for kind, loc, lastmod in iter_sitemap_entries(response.raw):
+                parsed_any = True
+                if kind == "sitemap":
+                    if depth < 2 and (watermark is None or lastmod is None or lastmod > watermark):
+                        children.append(loc)
+                elif watermark is None or (lastmod and lastmod > watermark):
+                    if not rule or rule.hook or rule._accept_url(loc):
+                        yield loc, lastmod
+
+        with response:
+            try:
+                found = newest(candidates(), limit)
+            except Exception as e:
+                logger.warning(f"解析 sitemap 失败 [{sitemap_url}]: {e}")
+                return None
+        if not parsed_any:
+            return None
 
-    def __init__(self):
-        self.parser = Parser()
+        for child in children:
+            self._wait_for_host(child)
+            found = newest(iter(found + (self._read_sitemap(child, watermark, limit, rule, depth + 1) or [])), limit)
+        return found
 
-    def fetch_articles(self, site_key: str, url: str, use_google: bool = False) -> List[Dict]:
-        """获取站点文章列表"""
-        html = self._fetch_page(url, use_google, site_key)
-        if not html:
-            return []
+    def commit_watermark(self, site_key: str) -> None:
+        """站点处理成功后推进订阅源水位线"""
+        with self._stats_lock:
+            watermark = self._pending_watermarks.pop(site_key, None)
+        if watermark:
+            storage.update_site_meta(site_key, watermark=watermark)
 
-        articles = self.parser.parse(site_key, html)
-        return articles[:3]  # 只返回Top 3
+    def _fallback_source(self, site_key: str) -> str:
+        return "selenium" if site_key in self.SELENIUM_SITES else "html"
 
-    def _fetch_page(self, url: str, use_google: bool = False, site_key: str = None) -> Optional[str]:
-        """获取页面内容（带延时）"""
-        time.sleep(random.uniform(config.min_delay, config.max_delay))
+    @staticmethod
+    def _source_expired(source: Dict) -> bool:
+        """超过 reprobe_days 天后重新探测，以便发现新出现的更便宜的数据源"""
+        try:
+            probed_at = datetime.fromisoformat(source["probed_at"])
+        except (KeyError, TypeError, ValueError):
+            return True
+        return datetime.now() - probed_at > timedelta(days=config.source_reprobe_days)
+
+    def _probe_sources(self, site_key: str, url: str, use_google: bool,
+                       rule: Optional[ExtractionRule]) -> Union[List[Dict], object]:
+        """按成本从低到高尝试数据源，记录第一个可用的数据源
+
+        WordPress 接口返回的是全站文章，只有与列表页（HTML 或 Selenium）的解析结果有重合时才选用，
+        避免监控分类页的站点被扩大到全站。
+        """
+        fallback = self._fallback_source(site_key)
+        page = None
+        fallback_articles = None
+        articles: Union[List[Dict], object] = []
+        # 按 SOURCES 的成本顺序，html 和 selenium 只尝试站点对应的一个
+        for name in (name for name in SOURCES if name not in ("html", "selenium") or name == fallback):
+            if name == "selenium" and fallback_articles is not None:
+                articles = fallback_articles
+            elif name in ("api", "selenium"):
+                articles = self._fetch_from_source(name, site_key, url, use_google, rule)
+            else:
+                # 内嵌数据和静态 HTML 共用一次完整（非条件、非流式）的页面抓取
+                if page is None:
+                    page = self._fetch_static(url, use_google, site_key, conditional=False, stream=False) or ""
+                articles = self._articles_from_page(name, site_key, url, page, rule)
+                if articles is NOT_MODIFIED:
+                    return NOT_MODIFIED
+
+            if name == "api" and is_complete(articles, rule):
+                if fallback == "selenium":
+                    fallback_articles = self._fetch_from_source("selenium", site_key, url, use_google, rule)
+                else:
+                    page = self._fetch_static(url, use_google, site_key, conditional=False, stream=False) or ""
+                    fallback_articles = self._articles_from_page("html", site_key, url, page, rule)
+                if not same_scope(articles, fallback_articles or []):
+                    logger.info(f"站点 {site_key} 的文章接口与列表页的文章不一致（范围不同），不使用接口")
+                    articles = []
+
+            if name in ("api", "embedded") and not is_complete(articles, rule):
+                continue
+            if articles:
+                logger.info(f"站点 {site_key} 选用数据源: {name}")
+                storage.update_site_meta(site_key, source={
+                    "name": name, "probed_at": datetime.now().isoformat(timespec="seconds")
+                })
+                self._record_source(site_key, name)
+            return articles
+        return articles
 
-        # 对于需要 Selenium 的站点
-        if site_key and site_key in self.SELENIUM_SITES:
+    def _fetch_from_source(self, name: str, site_key: str, url: str, use_google: bool,
+                           rule: Optional[ExtractionRule]) -> Union[List[Dict], object]:
+        """从指定数据源获取文章"""
+        if name == "api":
+            self._wait_for_host(url)
+            # 多取一些文章，经过 URL 过滤后仍能凑满 limit 篇
+            return parse_wp_posts(self.parser._fetch_json(wp_api_url(url, rule.limit * 3)), rule)
+        if name == "selenium":
+            self._wait_for_host(url)
             logger.info(f"使用 Selenium 获取站点 {site_key}")
-            return SeleniumHelper.fetch_page(url)
-
-        return self.parser._fetch_page(url, use_google)
-
+            page = SeleniumHelper.fetch_page(url, wait_for=rule.wait_for if rule else None)
+        else:
+            # 内嵌数据通常位于页面末尾，不能流式截断
+            page = self._fetch_static(url, use_google, site_key, stream=(name == "html"))
+        return self._articles_from_page(name, site_key, url, page, rule)
+
+    def _articles_from_page(self, name: str, site_key: str, url: str, html,
+                            rule: Optional[ExtractionRule]) -> Union[List[Dict], object]:
+        if html is NOT_MODIFIED:
+            return NOT_MODIFIED
+        if not html:
+            return []
+        if name == "embedded":
+            return extract_embedded(html, url, rule)
+        return self._parse_page(site_key, html)
+
+    def _parse_page(self, site_key: str, html: str) -> List[Dict]:
+        """按规则解析页面；页面内容与上次相同时直接返回上次的解析结果，不构建 DOM"""
+        digest = self._page_digest(html, site_key)
+        parse_cache = storage.get_site_meta(site_key).get("parse_cache", {})
+        if parse_cache.get("hash") == digest:
+            self._count_parse_cache("hit")
+            logger.info(f"站点 {site_key} 页面哈希未变化，使用缓存的解析结果")
+            return parse_cache["articles"]
+
+        self._count_parse_cache("miss")
+        articles = self.parser.parse(site_key, html)[:3]  # 只返回Top 3
+        if articles:
+            storage.update_site_meta(site_key, parse_cache={"hash": digest, "articles": articles})
+        return articles
 
-# 全局解析器实例
-parser = Parser()
-site_monitor = SiteMonitor()
+    def _record_source(self, site_key: str, name: str) -> None:
+        with self._stats_lock:
+            self._sources_used[site_key] = name
+
+    def pop_source_stats(self) -> Dict[str, str]:
+        """返回并清空本次运行各站点使用的数据源"""
+        with self._stats_lock:
+            used, self._sources_used = self._sources_used, {}
+        return used
+
+    def uses_static_page(self, site_key: str) -> bool:
+        """站点本次是否会抓取静态 HTML（决定 async 引擎是否预取）"""
+        if site_key in self.SELENIUM_SITES:
+            return False
+        source = storage.get_site_meta(site_key).get("source") or {}
+        return source.get("name") != "api" or self._source_expired(source)
+
+    def _page_digest(self, html: str, site_key: str) -> str:
+        """计算页面内容哈希（忽略脚本、样式和注释），规则变化时哈希随之变化"""
+        content = _VOLATILE_RE.sub("", html)
+        rule = self.parser.rules.get(site_key)
+        fingerprint = rule.fingerprint if rule else ""
+        digest = hashlib.sha1(f"{PARSE_CACHE_VERSION}:{fingerprint}:{content}".encode("utf-8", "replace"))
+        return digest.hexdigest()
+
+    def _count_parse_cache(self, outcome: str) -> None:
+        """记录解析缓存命中情况"""
+        with self._stats_lock:
+            self._parse_cache_stats[outcome] += 1
+
+    def pop_parse_cache_stats(self) -> Dict[str, int]:
+        """返回并清零本次运行的解析缓存命中统计"""
+        with self._stats_lock:
+            stats = dict(self._parse_cache_stats)
+            self._parse_cache_stats = {"hit": 0, "miss": 0}
+        return stats
+
+    def _wait_for_host(self, url: str) -> None:
+        """同一域名的两次请求之间保持 min_delay~max_delay 秒的随机间隔"""
+        host = urlparse(url).netloc.lower()
+        with self._host_lock:
+            host_lock = self._host_locks.setdefault(host, threading.Lock())
+
+        # 持有域名锁期间等待，保证同一域名的请求依次间隔发出
+        with host_lock:
+            last_fetch = self._host_last_fetch.get(host)
+            if last_fetch is not None:
+                delay = random.uniform(config.min_delay, config.max_delay)
+                remaining = last_fetch + delay - time.monotonic()
+                if remaining > 0:
+                    time.sleep(remaining)
+            self._host_last_fetch[host] = time.monotonic()
+
+    def _fetch_static(self, url: str, use_google: bool = False, site_key: str = None,
+                      conditional: Optional[bool] = None, stream: bool = True) -> Optional[str]:
+        """获取静态页面内容（带延时）"""
+        # 优先使用 async 引擎预取的页面，每个页面只使用一次（重试时重新抓取）
+        with self._prefetch_lock:
+            html = self._prefetched.pop(url, None)
+        if html:
+            return html
+
+        self._wait_for_host(url)
+
+        if conditional is None:
+            conditional = self._can_use_validators(site_key)
+        rule = self.parser.rules.get(site_key)
+        if stream and config.stream_fetch and rule and not rule.hook:
+            html = self.parser._fetch_page_streaming(url, rule, conditional)
+            stats = self.parser.stream_stats.get(site_key)
+            if stats:
+                ttfa = stats["time_to_first_article"]
+                logger.info(
+                    f"站点 {site_key} 流式抓取: 读取 {stats['bytes_read']} 字节, 节省 {stats['bytes_saved']} 字节, "
+                    f"首篇文章 {f'{ttfa:.2f}s' if ttfa is not None else '-'}, 提前结束: {stats['truncated']}"
+                )
+            return html
+
+        return self.parser._fetch_page(url, use_google, conditional=conditional)
+
+    @staticmethod
+    def _can_use_validators(site_key: str) -> bool:
+        """本地已有快照时才发送条件请求，否则 304 会导致快照永远为空"""
+        return bool(site_key and storage.get_yesterday_snapshot(site_key))
+
+    def commit_validators(self, url: str) -> None:
+        """站点处理成功后启用本次响应的 ETag / Last-Modified"""
+        self.parser.http_cache.commit(url)
+
+    def save_validators(self) -> None:
+        """持久化 HTTP 校验值缓存"""
+        self.parser.http_cache.save()
+
+
+# 全局解析器实例（第一次使用时才创建；site_monitor 与 parser 共用同一个 Parser）
+parser = LazyObject(Parser)
+site_monitor = LazyObject(lambda: SiteMonitor(parser))
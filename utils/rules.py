@@ -0,0 +1,207 @@
+"""
+规则模块 - 从 rules.yaml 加载并编译各站点的文章提取规则
+"""
+import hashlib
+import json
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import soupsieve
+import yaml
+from bs4 import BeautifulSoup, SoupStrainer
+
+from config import RULES_FILE
+
+MODES = ("container", "heading", "link")
+
+
+class ExtractionRule:
+    """编译后的站点提取规则，选择器和正则在构造时编译一次"""
+
+    def __init__(self, site_key: str, spec: Dict):
+        self.site_key = site_key
+        # 规则指纹：规则变化时解析缓存随之失效
+        self.fingerprint = hashlib.sha1(json.dumps(spec, sort_keys=True).encode("utf-8")).hexdigest()
+        self.hook: Optional[str] = spec.get("hook")
+        self.mode: Optional[str] = spec.get("mode")
+        if not self.hook and self.mode not in MODES:
+            raise ValueError(f"站点 {site_key} 的规则缺少 hook 或 mode 无效: {self.mode!r}")
+
+        self.limit = spec.get("limit", 3)
+        self.scan = spec.get("scan", 3)
+        self.min_title_length = spec.get("min_title_length", 1)
+        self.max_title_length: Optional[int] = spec.get("max_title_length")
+        self.url_base = spec.get("url_base", "")
+        self.url_include = self._compile_regex(spec.get("url_include"))
+        self.url_exclude = self._compile_regex(spec.get("url_exclude"))
+        self.title_exclude = self._compile_regex(spec.get("title_exclude"))
+        self.dedupe = spec.get("dedupe", "first")
+
+        titles = spec.get("title", [])
+        self.title_selectors = [soupsieve.compile(s) for s in ([titles] if isinstance(titles, str) else titles)]
+        self.date_selector = soupsieve.compile(spec["date"]) if spec.get("date") else None
+        self.container = soupsieve.compile(spec["container"]) if spec.get("container") else None
+        self.headings: List[str] = spec.get("headings", ["h2", "h3"])
+        self.title_from = spec.get("title_from", "text")
+        self.ancestor: List[str] = spec.get("ancestor", ["div", "section", "article"])
+
+        link = spec.get("link")
+        if self.mode == "container":
+            self.link = soupsieve.compile(link) if link else None
+        else:
+            self.link = link or "parent"
+
+        if self.mode == "container" and not (self.container and self.title_selectors):
+            raise ValueError(f"站点 {site_key} 的 container 规则需要 container 和 title")
+
+        self.strainer = self._compile_strainer(spec.get("parse_only"))
+        self.max_bytes: Optional[int] = spec.get("max_bytes")
+        self.wait_for: Optional[str] = spec.get("wait_for")
+        self.candidate_tags = self._candidate_tags(spec)
+
+    def _candidate_tags(self, spec: Dict) -> Optional[set]:
+        """流式抓取时用于统计候选文章的标签名（None 表示无法按标签判断）"""
+        if self.mode == "link":
+            return {"a"}
+        if self.mode == "heading":
+            return set(self.headings)
+        if self.mode == "container":
+            tags = set()
+            for part in spec["container"].split(","):
+                match = re.match(r"\s*([a-zA-Z][\w-]*)", part)
+                if not match:
+                    return None
+                tags.add(match.group(1).lower())
+            return tags
+        return None
+
+    @staticmethod
+    def _compile_regex(pattern: Optional[str]):
+        return re.compile(pattern) if pattern else None
+
+    @staticmethod
+    def _compile_strainer(spec: Optional[Dict]) -> Optional[SoupStrainer]:
+        """parse_only 编译为 SoupStrainer；解析阶段 class 是未拆分的原始字符串，需按单词正则匹配"""
+        if not spec:
+            return None
+        attrs = {k: v for k, v in spec.items() if k not in ("name", "class")}
+        if spec.get("class"):
+            attrs["class"] = re.compile(rf"(?:^|\s){re.escape(spec['class'])}(?:\s|$)")
+        return SoupStrainer(spec.get("name"), attrs=attrs)
+
+    def _clean_title(self, title: str) -> Optional[str]:
+        """检查标题长度和排除规则，返回截断后的标题"""
+        if not title or len(title) < self.min_title_length:
+            return None
+        if self.title_exclude and self.title_exclude.search(title):
+            return None
+        return title[:self.max_title_length] if self.max_title_length else title
+
+    def _accept_url(self, url: str) -> bool:
+        if not url:
+            return False
+        if self.url_include and not self.url_include.search(url):
+            return False
+        if self.url_exclude and self.url_exclude.search(url):
+            return False
+        return True
+
+    def _absolute(self, url: str) -> str:
+        if self.url_base and not url.startswith("http"):
+            return self.url_base + url
+        return url
+
+    def _select_title(self, element):
+        """按顺序尝试标题选择器"""
+        for selector in self.title_selectors:
+            title_elem = selector.select_one(element)
+            if title_elem:
+                return title_elem
+        return None
+
+    def extract(self, soup: BeautifulSoup) -> List[Dict]:
+        """在 DOM 上执行规则，返回文章列表"""
+        if self.mode == "container":
+            return self._extract_containers(soup)
+        if self.mode == "heading":
+            return self._extract_headings(soup)
+        return self._extract_links(soup)
+
+    def _extract_containers(self, soup: BeautifulSoup) -> List[Dict]:
+        articles = []
+        for container in self.container.select(soup, limit=self.scan):
+            title_elem = self._select_title(container)
+            link_elem = self.link.select_one(container) if self.link else title_elem
+            if not (title_elem and link_elem):
+                continue
+
+            title = self._clean_title(title_elem.get_text(strip=True))
+            url = link_elem.get("href", "")
+            if title and self._accept_url(url):
+                date = ""
+                if self.date_selector:
+                    date_elem = self.date_selector.select_one(container)
+                    if date_elem:
+                        date = date_elem.get("datetime") or date_elem.get_text(strip=True)
+                articles.append({"title": title, "url": self._absolute(url), "date": date})
+        return articles[:self.limit]
+
+    def _extract_headings(self, soup: BeautifulSoup) -> List[Dict]:
+        articles = []
+        for heading in soup.find_all(self.headings, limit=self.scan):
+            link_elem = heading.find_next("a") if self.link == "next" else heading.find_parent("a")
+            title = self._clean_title(heading.get_text(strip=True))
+            if not (link_elem and title):
+                continue
+
+            url = link_elem.get("href", "")
+            if self._accept_url(url):
+                articles.append({"title": title, "url": self._absolute(url), "date": ""})
+        return articles[:self.limit]
+
+    def _extract_links(self, soup: BeautifulSoup) -> List[Dict]:
+        articles = []
+        seen = set()
+        for link in soup.find_all("a", href=True):
+            href = link.get("href", "")
+            if not self._accept_url(href) or href in seen:
+                continue
+            if self.dedupe == "first":
+                seen.add(href)
+
+            if self.title_from == "ancestor":
+                parent = link.find_parent(self.ancestor)
+                title_elem = self._select_title(parent) if parent else None
+                text = title_elem.get_text(strip=True) if title_elem else ""
+            else:
+                text = link.get_text(strip=True)
+
+            title = self._clean_title(text)
+            if not title:
+                continue
+
+            seen.add(href)
+            articles.append({"title": title, "url": self._absolute(href), "date": ""})
+            if len(articles) >= self.limit:
+                break
+        return articles
+
+
+def rules_version(rules_file: Path = RULES_FILE) -> tuple:
+    """规则文件版本 (mtime_ns, size)，用于检测修改"""
+    stat = rules_file.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
+@lru_cache(maxsize=4)
+def _compile_rules(rules_file: Path, version: tuple) -> Dict[str, ExtractionRule]:
+    with open(rules_file, "r", encoding="utf-8") as f:
+        specs = yaml.safe_load(f) or {}
+    return {site_key: ExtractionRule(site_key, spec) for site_key, spec in specs.items()}
+
+
+def load_rules(rules_file: Path = RULES_FILE) -> Dict[str, ExtractionRule]:
+    """加载并编译全部站点规则（文件未修改时返回已编译的规则）"""
+    return _compile_rules(rules_file, rules_version(rules_file))
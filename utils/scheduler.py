@@ -0,0 +1,140 @@
+"""
+调度模块 - cron 表达式解析和按站点的运行计划，下次运行时间保存在站点元数据（next_run 字段）中
+"""
+import calendar
+import logging
+import random
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set
+
+from utils.storage import storage
+
+logger = logging.getLogger(__name__)
+
+# 超过这个时间仍未运行的计划视为停机期间错过的运行
+CATCH_UP_THRESHOLD = timedelta(minutes=5)
+
+
+class CronSchedule:
+    """五段 cron 表达式（分 时 日 月 周），支持 * , - / 以及 @hourly / @daily / @weekly / @monthly"""
+
+    ALIASES = {
+        "@hourly": "0 * * * *",
+        "@daily": "0 0 * * *",
+        "@weekly": "0 0 * * 0",
+        "@monthly": "0 0 1 * *",
+    }
+    # (最小值, 最大值)；星期中 0 和 7 都表示周日
+    FIELD_RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+    def __init__(self, expression: str):
+        self.expression = expression
+        fields = self.ALIASES.get(expression.strip(), expression).split()
+        if len(fields) != 5:
+            raise ValueError(f"cron 表达式需要 5 段: {expression!r}")
+
+        self.minutes, self.hours, self.days, self.months, weekdays = (
+            self._parse_field(field, low, high) for field, (low, high) in zip(fields, self.FIELD_RANGES)
+        )
+        self.weekdays = {day % 7 for day in weekdays}
+        # 日和星期都受限时按 cron 惯例取并集
+        self._any_day = fields[2] == "*"
+        self._any_weekday = fields[4] == "*"
+
+    @staticmethod
+    def _parse_field(field: str, low: int, high: int) -> Set[int]:
+        values = set()
+        for part in field.split(","):
+            step = 1
+            if "/" in part:
+                part, step_text = part.split("/", 1)
+                step = int(step_text)
+            if part == "*":
+                start, end = low, high
+            elif "-" in part:
+                start, end = (int(value) for value in part.split("-", 1))
+            else:
+                start = int(part)
+                end = high if step > 1 else start
+            if step < 1 or start < low or end > high or start > end:
+                raise ValueError(f"cron 字段超出范围: {field!r}")
+            values.update(range(start, end + 1, step))
+        return values
+
+    def _day_matches(self, moment: datetime) -> bool:
+        in_days = moment.day in self.days
+        in_weekdays = moment.isoweekday() % 7 in self.weekdays
+        if self._any_day and self._any_weekday:
+            return True
+        if self._any_day:
+            return in_weekdays
+        if self._any_weekday:
+            return in_days
+        return in_days or in_weekdays
+
+    def next_after(self, moment: datetime) -> datetime:
+        """moment 之后（不含）的第一个匹配时间；不匹配的月、日、时整体跳过"""
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = candidate + timedelta(days=366 * 5)
+        while candidate < limit:
+            if candidate.month not in self.months:
+                days_left = calendar.monthrange(candidate.year, candidate.month)[1] - candidate.day + 1
+                candidate = (candidate + timedelta(days=days_left)).replace(hour=0, minute=0)
+            elif not self._day_matches(candidate):
+                candidate = (candidate + timedelta(days=1)).replace(hour=0, minute=0)
+            elif candidate.hour not in self.hours:
+                candidate = (candidate + timedelta(hours=1)).replace(minute=0)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+        raise ValueError(f"cron 表达式没有匹配的时间: {self.expression!r}")
+
+
+class Scheduler:
+    """按站点的运行计划
+
+    每个站点使用自己的 schedule（缺省为全局计划），下次运行时间 = cron 匹配时间 + 随机抖动，
+    保存在站点元数据中；进程重启后，停机期间错过的运行只补跑一次。
+    """
+
+    def __init__(self, targets: List[Dict], default_schedule: str, jitter: float = 0):
+        self.targets = targets
+        self.jitter = jitter
+        self.schedules = {
+            target["key"]: CronSchedule(target.get("schedule") or default_schedule) for target in targets
+        }
+
+    def next_run(self, site_key: str) -> Optional[datetime]:
+        value = storage.get_site_meta(site_key).get("next_run")
+        try:
+            return datetime.fromisoformat(value) if value else None
+        except ValueError:
+            return None
+
+    def due_targets(self, now: datetime) -> List[Dict]:
+        """到期（或从未调度过）的站点"""
+        due = []
+        for target in self.targets:
+            next_run = self.next_run(target["key"])
+            if next_run is None or next_run <= now:
+                if next_run and now - next_run > CATCH_UP_THRESHOLD:
+                    logger.info(f"站点 {target['name']} 错过了 {next_run:%Y-%m-%d %H:%M} 的运行，立即补跑")
+                due.append(target)
+        return due
+
+    def schedule_next(self, targets: List[Dict], now: datetime) -> None:
+        """从 now 起计算下一次运行时间（按 cron 的绝对时间，不受本次运行耗时影响）"""
+        with storage.session():
+            for target in targets:
+                next_run = self.schedules[target["key"]].next_after(now)
+                if self.jitter:
+                    next_run += timedelta(seconds=random.uniform(0, self.jitter))
+                storage.update_site_meta(target["key"], next_run=next_run.isoformat(timespec="seconds"))
+
+    def seconds_until_next(self, now: datetime) -> float:
+        """距离最早一个站点到期的秒数"""
+        next_runs = [self.next_run(target["key"]) for target in self.targets]
+        if any(next_run is None for next_run in next_runs):
+            return 0.0
+        return max(0.0, (min(next_runs) - now).total_seconds())
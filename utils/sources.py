@@ -0,0 +1,141 @@
+"""
+数据源模块 - 从 CMS 接口和页面内嵌数据中提取文章，避免构建 DOM 或启动浏览器
+"""
+import html as html_lib
+import json
+import re
+from typing import Dict, Iterator, List, Optional
+from urllib.parse import urljoin, urlsplit
+
+from utils.rules import ExtractionRule
+
+# 按成本从低到高排列的数据源
+#   api       WordPress REST 接口（只返回需要的字段）
+#   embedded  页面内嵌的 JSON-LD / __NEXT_DATA__，无需构建 DOM
+#   html      静态 HTML + rules.yaml 规则解析
+#   selenium  浏览器渲染后按规则解析
+SOURCES = ("api", "embedded", "html", "selenium")
+
+WP_API_PATH = "/wp-json/wp/v2/posts"
+
+ARTICLE_TYPES = {"Article", "BlogPosting", "NewsArticle", "TechArticle"}
+
+_JSON_LD_RE = re.compile(
+    r"<script[^>]+type=[\"']application/ld\+json[\"'][^>]*>(.*?)</script>", re.S | re.I
+)
+_NEXT_DATA_RE = re.compile(r"<script[^>]+id=[\"']__NEXT_DATA__[\"'][^>]*>(.*?)</script>", re.S | re.I)
+_TAG_RE = re.compile(r"<[^>]+>")
+
+# __NEXT_DATA__ 中文章对象的字段名
+_URL_KEYS = ("url", "link", "href", "uri", "slug")
+_DATE_KEYS = ("date", "datePublished", "publishedAt", "published_at", "publishDate", "createdAt", "created_at")
+
+
+def wp_api_url(page_url: str, limit: int) -> str:
+    """站点根目录下的 WordPress 文章接口地址"""
+    parts = urlsplit(page_url)
+    return f"{parts.scheme}://{parts.netloc}{WP_API_PATH}?per_page={limit}&_fields=title,link,date"
+
+
+def parse_wp_posts(data, rule: ExtractionRule) -> List[Dict]:
+    """解析 WordPress 文章接口返回的 JSON（与 HTML 解析一样经过站点规则的 URL 过滤）"""
+    if not isinstance(data, list):
+        return []
+
+    articles = []
+    for post in data:
+        if not isinstance(post, dict):
+            continue
+        rendered = post["title"].get("rendered", "") if isinstance(post.get("title"), dict) else ""
+        title = rule._clean_title(html_lib.unescape(_TAG_RE.sub("", rendered)).strip())
+        url = post.get("link")
+        if title and isinstance(url, str) and rule._accept_url(url):
+            articles.append({"title": title, "url": url, "date": str(post.get("date", ""))[:10]})
+    return articles[:rule.limit]
+
+
+def _walk(node, skip_types=("BreadcrumbList",)) -> Iterator[Dict]:
+    """按文档顺序深度优先遍历 JSON 中的全部对象（跳过面包屑导航）"""
+    if isinstance(node, dict):
+        if node.get("@type") in skip_types:
+            return
+        yield node
+        for value in node.values():
+            yield from _walk(value, skip_types)
+    elif isinstance(node, list):
+        for value in node:
+            yield from _walk(value, skip_types)
+
+
+def _load_json(text: str):
+    try:
+        return json.loads(text)
+    except ValueError:
+        return None
+
+
+def _json_ld_candidates(page: str) -> Iterator[Dict]:
+    """JSON-LD 中的 Article / BlogPosting 和 ItemList 条目"""
+    for block in _JSON_LD_RE.findall(page):
+        for node in _walk(_load_json(block)):
+            types = node.get("@type")
+            types = set(types) if isinstance(types, list) else {types}
+            if types & ARTICLE_TYPES:
+                url = node.get("url") or node.get("mainEntityOfPage")
+                if isinstance(url, dict):
+                    url = url.get("@id")
+                yield {"title": node.get("headline") or node.get("name"), "url": url,
+                       "date": node.get("datePublished", "")}
+            elif "ListItem" in types and isinstance(node.get("url"), str):
+                yield {"title": node.get("name"), "url": node["url"], "date": ""}
+
+
+def _next_data_candidates(page: str) -> Iterator[Dict]:
+    """__NEXT_DATA__ 中同时带标题、链接和日期的对象（没有日期的通常是导航菜单）"""
+    match = _NEXT_DATA_RE.search(page)
+    if not match:
+        return
+    for node in _walk(_load_json(match.group(1))):
+        title = node.get("title") or node.get("headline")
+        url_key = next((k for k in _URL_KEYS if isinstance(node.get(k), str) and node.get(k)), None)
+        date_key = next((k for k in _DATE_KEYS if node.get(k)), None)
+        if isinstance(title, str) and url_key and date_key:
+            yield {"title": title, "url": node[url_key], "date": str(node[date_key]), "slug": url_key == "slug"}
+
+
+def extract_embedded(page: str, page_url: str, rule: ExtractionRule) -> List[Dict]:
+    """从页面内嵌的 JSON-LD 或 __NEXT_DATA__ 提取文章，链接和标题沿用站点规则的过滤条件"""
+    articles = []
+    seen = {page_url.rstrip("/")}
+    for candidate in (*_json_ld_candidates(page), *_next_data_candidates(page)):
+        if not isinstance(candidate["title"], str) or not isinstance(candidate["url"], str):
+            continue
+        if candidate.get("slug"):
+            url = urljoin(page_url.rstrip("/") + "/", candidate["url"].lstrip("/"))
+        else:
+            url = urljoin(page_url, candidate["url"])
+        title = rule._clean_title(html_lib.unescape(candidate["title"]).strip())
+        if not title or url.rstrip("/") in seen or not rule._accept_url(url):
+            continue
+
+        seen.add(url.rstrip("/"))
+        articles.append({"title": title, "url": url, "date": str(candidate["date"] or "")[:10]})
+        if len(articles) >= rule.limit:
+            break
+    return articles
+
+
+def same_scope(articles: List[Dict], reference: List[Dict]) -> bool:
+    """接口返回的最新文章是否与列表页解析结果相同（接口是全站文章，列表页可能只是某个分类）
+
+    列表页的文章必须按顺序恰好是接口的前几篇；只有一篇重合（分类的最新文章恰好也是全站最新）不算同一范围。
+    """
+    def paths(items):
+        return [urlsplit(item["url"]).path.rstrip("/") for item in items if item.get("url")]
+    listing = paths(reference)
+    return bool(listing) and paths(articles)[:len(listing)] == listing
+
+
+def is_complete(articles: Optional[List[Dict]], rule: ExtractionRule) -> bool:
+    """接口和内嵌数据只有返回满额文章时才视为可用，否则继续尝试更贵的数据源"""
+    return bool(articles) and len(articles) >= rule.limit
@@ -0,0 +1,288 @@
+"""
+SQLite存储模块 - 保存全部历史文章，接口与 Storage 一致
+"""
+import json
+import logging
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from config import DATA_FILE, SQLITE_FILE
+from utils.storage import META_KEY, OUTBOX_DEAD, OUTBOX_DELIVERED, OUTBOX_KEY, OUTBOX_PENDING, Storage
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sites (
+    site_key TEXT PRIMARY KEY,
+    meta TEXT NOT NULL DEFAULT '{}',
+    updated_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS articles (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    site_key TEXT NOT NULL,
+    url TEXT NOT NULL,
+    title TEXT NOT NULL DEFAULT '',
+    date TEXT NOT NULL DEFAULT '',
+    data TEXT NOT NULL DEFAULT '{}',
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL,
+    snapshot_rank INTEGER
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_articles_site_url ON articles (site_key, url);
+CREATE INDEX IF NOT EXISTS idx_articles_snapshot ON articles (site_key, snapshot_rank);
+
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started_at TEXT NOT NULL,
+    finished_at TEXT NOT NULL,
+    success_count INTEGER NOT NULL,
+    fail_count INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS outbox (
+    key TEXT PRIMARY KEY,
+    channel TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL,
+    next_attempt_at TEXT NOT NULL,
+    finished_at TEXT,
+    last_error TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_outbox_pending ON outbox (status, next_attempt_at);
+"""
+
+OUTBOX_COLUMNS = (
+    "key", "channel", "kind", "payload", "status", "attempts",
+    "created_at", "next_attempt_at", "finished_at", "last_error",
+)
+
+
+def _now() -> str:
+    return datetime.now().isoformat(timespec="seconds")
+
+
+class SQLiteStorage(Storage):
+    """SQLite 存储类
+
+    articles 表保存每个站点出现过的全部文章（first_seen / last_seen），
+    snapshot_rank 非空的行即当前的 Top 3 快照；新文章判定是对全部历史 URL 的索引查询。
+    """
+
+    def __init__(self, db_file: Path = SQLITE_FILE):
+        self.db_file = db_file
+        self._lock = threading.RLock()
+        self._session_depth = 0
+        self.db_file.parent.mkdir(parents=True, exist_ok=True)
+        # 并发抓取时多个线程共用一个连接，由 self._lock 串行化
+        self._conn = sqlite3.connect(str(self.db_file), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self.url_index = self._create_url_index()
+
+    @contextmanager
+    def session(self):
+        """运行级会话：所有更新在一个事务中，最外层退出时一次性提交"""
+        with self._lock:
+            self._session_depth += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._session_depth -= 1
+                if self._session_depth == 0:
+                    self._conn.commit()
+                    self._flush_url_index()
+
+    def _commit(self) -> None:
+        """会话外的修改立即提交"""
+        if self._session_depth == 0:
+            self._conn.commit()
+            self._flush_url_index()
+
+    def get_yesterday_snapshot(self, site_key: str) -> List[Dict]:
+        """获取指定站点的最新快照"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT data FROM articles WHERE site_key = ? AND snapshot_rank IS NOT NULL "
+                "ORDER BY snapshot_rank",
+                (site_key,)
+            ).fetchall()
+        return [json.loads(row["data"]) for row in rows]
+
+    def get_all_snapshots(self) -> Dict:
+        """获取所有站点的快照"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT site_key, data FROM articles WHERE snapshot_rank IS NOT NULL "
+                "ORDER BY site_key, snapshot_rank"
+            ).fetchall()
+
+        snapshots: Dict[str, List[Dict]] = {}
+        for row in rows:
+            snapshots.setdefault(row["site_key"], []).append(json.loads(row["data"]))
+        return snapshots
+
+    def update_snapshot(self, site_key: str, articles: List[Dict], notifications: Optional[List[Dict]] = None) -> None:
+        """更新指定站点的快照，并把文章写入历史；notifications 与快照在同一个事务中写入发件箱"""
+        now = _now()
+        with self._lock:
+            self._conn.execute("INSERT OR IGNORE INTO sites (site_key, updated_at) VALUES (?, ?)", (site_key, now))
+            self._conn.execute("UPDATE sites SET updated_at = ? WHERE site_key = ?", (now, site_key))
+            self._conn.execute(
+                "UPDATE articles SET snapshot_rank = NULL WHERE site_key = ? AND snapshot_rank IS NOT NULL",
+                (site_key,)
+            )
+            for rank, article in enumerate(articles):
+                url = article.get("url", "")
+                if not url:
+                    continue
+                self._conn.execute(
+                    "INSERT INTO articles (site_key, url, title, date, data, first_seen, last_seen, snapshot_rank) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (site_key, url) DO UPDATE SET "
+                    "title = excluded.title, date = excluded.date, data = excluded.data, "
+                    "last_seen = excluded.last_seen, snapshot_rank = excluded.snapshot_rank",
+                    (site_key, url, article.get("title", ""), article.get("date", ""),
+                     json.dumps(article, ensure_ascii=False), now, now, rank)
+                )
+            self._insert_notifications(notifications or [])
+            if self.url_index:
+                self.url_index.add_many(site_key, [a["url"] for a in articles if a.get("url")])
+            self._commit()
+
+    def _insert_notifications(self, notifications: List[Dict]) -> None:
+        # 去重：已入队（包括已投递）的键不再重复入队
+        placeholders = ", ".join("?" * len(OUTBOX_COLUMNS))
+        self._conn.executemany(
+            f"INSERT OR IGNORE INTO outbox ({', '.join(OUTBOX_COLUMNS)}) VALUES ({placeholders})",
+            [
+                tuple(json.dumps(entry[column], ensure_ascii=False) if column == "payload" else entry[column]
+                      for column in OUTBOX_COLUMNS)
+                for entry in notifications
+            ]
+        )
+
+    def enqueue_notifications(self, notifications: List[Dict]) -> None:
+        """把通知写入发件箱（不关联快照的通知，如站点异常）"""
+        with self._lock:
+            self._insert_notifications(notifications)
+            self._commit()
+
+    def pending_notifications(self, now: datetime) -> List[Dict]:
+        """到期的待投递通知，按入队时间排序"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM outbox WHERE status = ? AND next_attempt_at <= ? ORDER BY created_at, rowid",
+                (OUTBOX_PENDING, now.isoformat(timespec="seconds"))
+            ).fetchall()
+        entries = [dict(row) for row in rows]
+        for entry in entries:
+            entry["payload"] = json.loads(entry["payload"])
+        return entries
+
+    def update_notification(self, key: str, **fields) -> None:
+        """更新发件箱条目（投递结果、下次重试时间等）"""
+        assignments = ", ".join(f"{column} = ?" for column in fields if column in OUTBOX_COLUMNS)
+        values = [value for column, value in fields.items() if column in OUTBOX_COLUMNS]
+        with self._lock:
+            self._conn.execute(f"UPDATE outbox SET {assignments} WHERE key = ?", (*values, key))
+            self._commit()
+
+    def purge_notifications(self, before: datetime) -> int:
+        """删除 before 之前已结束（已投递或重试用尽）的条目，返回删除数量"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM outbox WHERE status != ? AND finished_at < ?",
+                (OUTBOX_PENDING, before.isoformat(timespec="seconds"))
+            )
+            self._commit()
+        return cursor.rowcount
+
+    def outbox_counts(self) -> Dict[str, int]:
+        """发件箱中各状态的条目数"""
+        counts = {OUTBOX_PENDING: 0, OUTBOX_DELIVERED: 0, OUTBOX_DEAD: 0}
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) AS n FROM outbox GROUP BY status").fetchall()
+        counts.update({row["status"]: row["n"] for row in rows})
+        return counts
+
+    def get_site_meta(self, site_key: str) -> Dict:
+        """获取指定站点的元数据"""
+        with self._lock:
+            row = self._conn.execute("SELECT meta FROM sites WHERE site_key = ?", (site_key,)).fetchone()
+        return json.loads(row["meta"]) if row else {}
+
+    def update_site_meta(self, site_key: str, **fields) -> None:
+        """更新指定站点的元数据（只覆盖传入的字段）"""
+        with self._lock:
+            meta = self.get_site_meta(site_key)
+            meta.update(fields)
+            self._conn.execute(
+                "INSERT INTO sites (site_key, meta, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (site_key) DO UPDATE SET meta = excluded.meta, updated_at = excluded.updated_at",
+                (site_key, json.dumps(meta, ensure_ascii=False), _now())
+            )
+            self._commit()
+
+    def get_all_urls(self, site_key: str) -> set:
+        """获取指定站点出现过的全部URL"""
+        with self._lock:
+            rows = self._conn.execute("SELECT url FROM articles WHERE site_key = ?", (site_key,)).fetchall()
+        return {row["url"] for row in rows}
+
+    def get_new_articles(self, site_key: str, current_articles: List[Dict]) -> List[Dict]:
+        """获取新增文章列表（对全部历史URL做索引查询）"""
+        # Bloom 过滤器前置：索引确认出现过的URL不再查询 articles 表
+        candidates = self._filter_seen(site_key, [a for a in current_articles if a.get("url")])
+        urls = [article["url"] for article in candidates]
+        if not urls:
+            return []
+
+        placeholders = ", ".join("?" * len(urls))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT url FROM articles WHERE site_key = ? AND url IN ({placeholders})",
+                (site_key, *urls)
+            ).fetchall()
+        seen_urls = {row["url"] for row in rows}
+
+        return [a for a in candidates if a["url"] not in seen_urls]
+
+    def record_run(self, started_at: datetime, finished_at: datetime, success_count: int, fail_count: int) -> None:
+        """记录一次监控运行"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO runs (started_at, finished_at, success_count, fail_count) VALUES (?, ?, ?, ?)",
+                (started_at.isoformat(timespec="seconds"), finished_at.isoformat(timespec="seconds"),
+                 success_count, fail_count)
+            )
+            self._commit()
+
+    def import_json(self, json_file: Path = DATA_FILE) -> int:
+        """从 data.json 一次性导入快照和站点元数据，返回导入的站点数"""
+        with open(json_file, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        meta = data.pop(META_KEY, {})
+        outbox = data.pop(OUTBOX_KEY, {})
+        with self.session():
+            for site_key, articles in data.items():
+                self.update_snapshot(site_key, articles)
+            for site_key, fields in meta.items():
+                self.update_site_meta(site_key, **fields)
+            with self._lock:
+                self._insert_notifications(list(outbox.values()))
+
+        logger.info(f"已从 {json_file} 导入 {len(data)} 个站点到 {self.db_file}")
+        return len(data)
@@ -3,11 +3,44 @@
 """
 import json
 import os
+import tempfile
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, List, Optional, Set, Tuple
 
-from config import DATA_FILE
+from config import DATA_FILE, config
+from utils.lazy import LazyObject
+
+
+# data.json 中保存站点元数据（页面哈希、解析缓存等）的保留键，不属于任何站点快照
+META_KEY = "_meta"
+
+# data.json 中保存待投递通知（发件箱）的保留键，按去重键索引
+OUTBOX_KEY = "_outbox"
+
+# 发件箱条目状态：待投递、已投递、重试用尽
+OUTBOX_PENDING = "pending"
+OUTBOX_DELIVERED = "delivered"
+OUTBOX_DEAD = "dead"
+
+
+def new_outbox_entry(key: str, channel: str, kind: str, payload: Dict) -> Dict:
+    """创建发件箱条目，key 为去重键（同一键只会入队一次）"""
+    now = datetime.now().isoformat(timespec="seconds")
+    return {
+        "key": key,
+        "channel": channel,
+        "kind": kind,
+        "payload": payload,
+        "status": OUTBOX_PENDING,
+        "attempts": 0,
+        "created_at": now,
+        "next_attempt_at": now,
+        "finished_at": None,
+        "last_error": None,
+    }
 
 
 class Storage:
@@ -15,8 +48,22 @@ class Storage:
 
     def __init__(self, data_file: Path = DATA_FILE):
         self.data_file = data_file
+        self._lock = threading.RLock()  # 并发抓取时保护 读取-修改-写回
+        # 运行级会话：内存中的数据副本及本次会话修改过的条目
+        self._session_data: Optional[Dict] = None
+        self._session_depth = 0
+        self._dirty: Set[Tuple[str, str]] = set()
+        self.url_index = self._create_url_index()
         self._ensure_data_file()
 
+    @staticmethod
+    def _create_url_index():
+        """按配置创建已见URL索引"""
+        if not config.url_index_enabled:
+            return None
+        from utils.url_index import SeenUrlIndex
+        return SeenUrlIndex(capacity=config.url_index_capacity, error_rate=config.url_index_error_rate)
+
     def _ensure_data_file(self):
         """确保数据文件存在"""
         if not self.data_file.exists():
@@ -32,24 +79,204 @@ class Storage:
             return {}
 
     def _save_data(self, data: Dict):
-        """保存数据文件"""
-        with open(self.data_file, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        """保存数据文件（先写临时文件再原子替换，进程中途退出也不会损坏原文件）"""
+        fd, tmp_path = tempfile.mkstemp(prefix=self.data_file.name, suffix=".tmp", dir=self.data_file.parent)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.data_file)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    @contextmanager
+    def session(self):
+        """运行级存储会话：只加载一次数据文件，更新在内存中进行，结束时一次性写回
+
+        会话可以嵌套，只有最外层退出时才写回；写回前重新读取磁盘数据，
+        只合并本次会话修改过的站点，避免覆盖其他进程（如 --single）的更新。
+        """
+        with self._lock:
+            if self._session_depth == 0:
+                self._session_data = self._load_data()
+                self._dirty = set()
+            self._session_depth += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._session_depth -= 1
+                if self._session_depth == 0:
+                    try:
+                        self._commit_session()
+                        self._flush_url_index()
+                    finally:
+                        self._session_data = None
+                        self._dirty = set()
+
+    def _commit_session(self) -> None:
+        """把会话中修改过的条目合并到磁盘数据并原子写回"""
+        if not self._dirty:
+            return
+
+        data = self._load_data()
+        for kind, site_key in self._dirty:
+            if kind == "snapshot":
+                data[site_key] = self._session_data[site_key]
+            elif kind == "outbox":
+                # 发件箱按条目合并，site_key 此时是去重键；会话中删除的条目同样从磁盘删除
+                entry = self._session_data.get(OUTBOX_KEY, {}).get(site_key)
+                if entry is None:
+                    data.get(OUTBOX_KEY, {}).pop(site_key, None)
+                else:
+                    data.setdefault(OUTBOX_KEY, {})[site_key] = entry
+            else:
+                data.setdefault(META_KEY, {})[site_key] = self._session_data[META_KEY][site_key]
+        self._save_data(data)
+
+    def _flush_url_index(self) -> None:
+        """持久化已见URL索引"""
+        if self.url_index:
+            self.url_index.flush()
+
+    def _read(self) -> Dict:
+        """读取数据：会话中直接使用内存副本"""
+        if self._session_data is not None:
+            return self._session_data
+        return self._load_data()
+
+    def _write(self, kind: str, site_key: str, update, also: Iterable[Tuple[str, str]] = ()) -> None:
+        """修改数据：会话中只修改内存副本并记录，否则立即写回文件
+
+        also 为同一次修改涉及的其他条目，与主条目在同一次写回中落盘。
+        """
+        with self._lock:
+            if self._session_data is not None:
+                update(self._session_data)
+                self._dirty.add((kind, site_key))
+                self._dirty.update(also)
+            else:
+                data = self._load_data()
+                update(data)
+                self._save_data(data)
 
     def get_yesterday_snapshot(self, site_key: str) -> List[Dict]:
         """获取指定站点的昨日快照"""
-        data = self._load_data()
-        return data.get(site_key, [])
+        with self._lock:
+            return list(self._read().get(site_key, []))
 
     def get_all_snapshots(self) -> Dict:
         """获取所有站点的快照"""
-        return self._load_data()
+        with self._lock:
+            data = dict(self._read())
+        data.pop(META_KEY, None)
+        data.pop(OUTBOX_KEY, None)
+        return data
 
-    def update_snapshot(self, site_key: str, articles: List[Dict]) -> None:
-        """更新指定站点的快照"""
-        data = self._load_data()
-        data[site_key] = articles
-        self._save_data(data)
+    def update_snapshot(self, site_key: str, articles: List[Dict], notifications: Optional[List[Dict]] = None) -> None:
+        """更新指定站点的快照；notifications 为本次要发出的通知，与快照在同一次写回中进入发件箱"""
+        notifications = notifications or []
+
+        def update(data):
+            data[site_key] = list(articles)
+            self._add_notifications(data, notifications)
+
+        self._write("snapshot", site_key, update, also=[("outbox", entry["key"]) for entry in notifications])
+        self._index_urls(site_key, articles)
+
+    @staticmethod
+    def _add_notifications(data: Dict, notifications: Iterable[Dict]) -> None:
+        outbox = data.setdefault(OUTBOX_KEY, {})
+        for entry in notifications:
+            # 去重：已入队（包括已投递）的键不再重复入队
+            outbox.setdefault(entry["key"], dict(entry))
+
+    def enqueue_notifications(self, notifications: List[Dict]) -> None:
+        """把通知写入发件箱（不关联快照的通知，如站点异常）"""
+        if not notifications:
+            return
+
+        def update(data):
+            self._add_notifications(data, notifications)
+
+        keys = [entry["key"] for entry in notifications]
+        self._write("outbox", keys[0], update, also=[("outbox", key) for key in keys[1:]])
+
+    def pending_notifications(self, now: datetime) -> List[Dict]:
+        """到期的待投递通知，按入队时间排序"""
+        due = now.isoformat(timespec="seconds")
+        with self._lock:
+            entries = [
+                dict(entry) for entry in self._read().get(OUTBOX_KEY, {}).values()
+                if entry["status"] == OUTBOX_PENDING and entry["next_attempt_at"] <= due
+            ]
+        return sorted(entries, key=lambda entry: entry["created_at"])
+
+    def update_notification(self, key: str, **fields) -> None:
+        """更新发件箱条目（投递结果、下次重试时间等）"""
+        def update(data):
+            entry = data.get(OUTBOX_KEY, {}).get(key)
+            if entry is not None:
+                entry.update(fields)
+
+        self._write("outbox", key, update)
+
+    def purge_notifications(self, before: datetime) -> int:
+        """删除 before 之前已结束（已投递或重试用尽）的条目，返回删除数量；保留期内的键仍用于去重"""
+        cutoff = before.isoformat(timespec="seconds")
+        with self._lock:
+            expired = [
+                key for key, entry in self._read().get(OUTBOX_KEY, {}).items()
+                if entry["status"] != OUTBOX_PENDING and (entry.get("finished_at") or "") < cutoff
+            ]
+            if expired:
+                def update(data):
+                    for key in expired:
+                        data[OUTBOX_KEY].pop(key, None)
+
+                self._write("outbox", expired[0], update, also=[("outbox", key) for key in expired[1:]])
+        return len(expired)
+
+    def outbox_counts(self) -> Dict[str, int]:
+        """发件箱中各状态的条目数"""
+        counts = {OUTBOX_PENDING: 0, OUTBOX_DELIVERED: 0, OUTBOX_DEAD: 0}
+        with self._lock:
+            for entry in self._read().get(OUTBOX_KEY, {}).values():
+                counts[entry["status"]] = counts.get(entry["status"], 0) + 1
+        return counts
+
+    def _index_urls(self, site_key: str, articles: List[Dict]) -> None:
+        """把快照中的URL写入已见URL索引，会话中在会话结束时统一持久化"""
+        if not self.url_index:
+            return
+        self.url_index.add_many(site_key, [a["url"] for a in articles if a.get("url")])
+        if self._session_depth == 0:
+            self._flush_url_index()
+
+    def _filter_seen(self, site_key: str, articles: List[Dict]) -> List[Dict]:
+        """用已见URL索引过滤掉曾经出现过的文章"""
+        if not self.url_index:
+            return articles
+        return [a for a in articles if not self.url_index.contains(site_key, a["url"])]
+
+    def url_index_stats(self) -> Dict:
+        """已见URL索引统计（未启用时为空）"""
+        return self.url_index.stats() if self.url_index else {}
+
+    def get_site_meta(self, site_key: str) -> Dict:
+        """获取指定站点的元数据"""
+        with self._lock:
+            return dict(self._read().get(META_KEY, {}).get(site_key, {}))
+
+    def update_site_meta(self, site_key: str, **fields) -> None:
+        """更新指定站点的元数据（只覆盖传入的字段）"""
+        def update(data):
+            data.setdefault(META_KEY, {}).setdefault(site_key, {}).update(fields)
+
+        self._write("meta", site_key, update)
 
     def get_all_urls(self, site_key: str) -> set:
         """获取指定站点的所有URL集合（用于比对）"""
@@ -58,13 +285,7 @@ class Storage:
 
     def has_new_articles(self, site_key: str, current_articles: List[Dict]) -> bool:
         """检查是否有新增文章"""
-        yesterday_urls = self.get_all_urls(site_key)
-
-        for article in current_articles:
-            url = article.get("url", "")
-            if url and url not in yesterday_urls:
-                return True
-        return False
+        return bool(self.get_new_articles(site_key, current_articles))
 
     def get_new_articles(self, site_key: str, current_articles: List[Dict]) -> List[Dict]:
         """获取新增文章列表"""
@@ -76,8 +297,19 @@ class Storage:
             if url and url not in yesterday_urls:
                 new_articles.append(article)
 
-        return new_articles
+        return self._filter_seen(site_key, new_articles)
+
+    def record_run(self, started_at: datetime, finished_at: datetime, success_count: int, fail_count: int) -> None:
+        """记录一次监控运行（JSON 存储不保留运行历史）"""
+
+
+def create_storage() -> Storage:
+    """根据配置创建存储后端"""
+    if config.storage_backend == "sqlite":
+        from utils.sqlite_storage import SQLiteStorage
+        return SQLiteStorage()
+    return Storage()
 
 
-# 全局存储实例
-storage = Storage()
+# 全局存储实例（第一次使用时才创建，导入模块不读写磁盘）
+storage = LazyObject(create_storage)
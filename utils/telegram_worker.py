@@ -0,0 +1,288 @@
+"""
+Telegram 发送模块 - 常驻发送线程：一个事件循环、一个 Bot 客户端，合并消息并按会话限速
+"""
+import asyncio
+import html
+import logging
+import re
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Set, Tuple
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+# Telegram 单条消息的最大长度
+MESSAGE_LIMIT = 4096
+
+# 合并消息时的分隔符
+SEPARATOR = "\n\n"
+
+
+# HTML 标签（group 1 为 "/" 表示结束标签）和字符实体
+_MARKUP_RE = re.compile(r"<(/?)[a-zA-Z][^>]*>|&#?\w+;")
+_TAG_RE = re.compile(r"<[^>]+>")
+
+
+def _safe_cut(line: str, limit: int) -> int:
+    """line[:limit] 中最后一个不在标签、实体内部，也不在未闭合元素中间的切分位置，没有时返回 0"""
+    best, depth = 0, 0
+    for m in _MARKUP_RE.finditer(line):
+        if depth == 0:
+            best = min(m.start(), limit)
+        if m.end() > limit:
+            return best
+        if m.group(0).startswith("<"):
+            depth = max(0, depth - 1) if m.group(1) else depth + 1
+    return limit if depth == 0 else best
+
+
+def _split_plain(line: str, limit: int) -> List[str]:
+    """去掉标签后按纯文本切分（转义后的每段不超过 limit，不会截断实体）"""
+    chunks, current = [], ""
+    for ch in html.unescape(_TAG_RE.sub("", line)):
+        escaped = html.escape(ch, quote=False)
+        if len(current) + len(escaped) > limit:
+            chunks.append(current)
+            current = ""
+        current += escaped
+    chunks.append(current)
+    return chunks
+
+
+def _split_long(text: str, limit: int) -> List[str]:
+    """超长消息按行切分；单行超长时只在标签、实体和元素之外切开
+
+    单个元素（如很长的 <a> 标题）本身超过 limit 时，去掉标签按纯文本发送，避免 Telegram 报 can't parse entities。
+    """
+    pieces, current = [], ""
+    for line in text.split("\n"):
+        while len(line) > limit:
+            if current:
+                pieces.append(current)
+                current = ""
+            cut = _safe_cut(line, limit)
+            if cut:
+                pieces.append(line[:cut])
+                line = line[cut:]
+            else:
+                *head, line = _split_plain(line, limit)
+                pieces.extend(head)
+        candidate = f"{current}\n{line}" if current else line
+        if len(candidate) > limit:
+            pieces.append(current)
+            candidate = line
+        current = candidate
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def _coalesce_groups(texts: List[str], limit: int) -> List[Tuple[str, Set[int]]]:
+    """合并后的消息及其包含的提醒下标（超长提醒会被拆到多条消息中）"""
+    groups, current, members = [], "", set()
+    for index, text in enumerate(texts):
+        for piece in _split_long(text, limit) if len(text) > limit else [text]:
+            candidate = f"{current}{SEPARATOR}{piece}" if current else piece
+            if len(candidate) > limit:
+                groups.append((current, members))
+                candidate, members = piece, set()
+            current = candidate
+            members.add(index)
+    if current:
+        groups.append((current, members))
+    return groups
+
+
+def coalesce(texts: List[str], limit: int = MESSAGE_LIMIT) -> List[str]:
+    """把多条提醒按顺序合并为尽量少的消息，每条不超过 limit 个字符"""
+    return [message for message, _ in _coalesce_groups(texts, limit)]
+
+
+class TelegramWorker:
+    """Telegram 发送线程
+
+    第一次提交消息时启动线程，线程内只有一个事件循环和一个 Bot（HTTP 连接复用）。
+    提交的消息先等待 linger 秒收集同批提醒，再合并成不超过 4096 字符的消息发送；
+    同一会话两次发送至少间隔 min_interval 秒，遇到 429 按 retry_after 等待后重试。
+    """
+
+    def __init__(self, token: str, chat_id: str, base_url: Optional[str] = None,
+                 min_interval: float = 1.0, max_retries: int = 3, linger: float = 0.5):
+        self.token = token
+        self.chat_id = chat_id
+        self.base_url = base_url
+        self.min_interval = min_interval
+        self.max_retries = max_retries
+        self.linger = linger
+
+        self._thread: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._ready = threading.Event()
+        self._start_lock = threading.Lock()
+        # 已提交但尚未发送完成的提醒数
+        self._pending = 0
+        self._idle = threading.Condition()
+        self._next_send_at: Dict[str, float] = {}
+        self._stats = self._empty_stats()
+
+    @staticmethod
+    def _empty_stats() -> Dict:
+        return {"alerts": 0, "messages": 0, "failed": 0, "retries": 0,
+                "queue_latency_total": 0.0, "queue_latency_max": 0.0, "send_latency_total": 0.0}
+
+    def start(self) -> None:
+        with self._start_lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._ready.clear()
+            self._thread = threading.Thread(target=self._run_loop, name="telegram", daemon=True)
+            self._thread.start()
+        self._ready.wait()
+
+    def submit(self, text: str) -> Future:
+        """提交一条提醒（立即返回，由发送线程合并发送）；返回的 Future 在发送完成后得到是否成功"""
+        self.start()
+        future = Future()
+        with self._idle:
+            self._pending += 1
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, (text, time.monotonic(), future))
+        return future
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """等待已提交的提醒全部发送完成（或失败），超时返回 False"""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """发送完剩余消息后关闭 Bot 客户端和事件循环"""
+        if not (self._thread and self._thread.is_alive()):
+            return
+        self.flush(timeout)
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, None)
+        self._thread.join(timeout)
+
+    def pop_stats(self) -> Dict:
+        """返回并清空统计：提醒数、实际发送消息数、失败、重试、排队和发送延迟"""
+        with self._idle:
+            stats, self._stats = self._stats, self._empty_stats()
+        delivered = stats["alerts"] or 1
+        stats["avg_queue_latency"] = stats.pop("queue_latency_total") / delivered
+        stats["max_queue_latency"] = stats.pop("queue_latency_max")
+        stats["avg_send_latency"] = stats.pop("send_latency_total") / (stats["messages"] or 1)
+        return stats
+
+    def _run_loop(self) -> None:
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._queue = asyncio.Queue()
+        self._ready.set()
+        try:
+            self._loop.run_until_complete(self._worker())
+        finally:
+            self._loop.close()
+
+    async def _worker(self) -> None:
+        from telegram import Bot
+
+        kwargs = {"base_url": self.base_url} if self.base_url else {}
+        bot = Bot(token=self.token, **kwargs)
+        try:
+            while True:
+                item = await self._queue.get()
+                if item is None:
+                    break
+
+                # 等待 linger 秒，把同一批次的提醒一起取出
+                batch = [item]
+                await asyncio.sleep(self.linger)
+                stop = False
+                while not self._queue.empty():
+                    queued = self._queue.get_nowait()
+                    if queued is None:
+                        stop = True
+                        break
+                    batch.append(queued)
+
+                # 提醒所在的消息全部发送成功才算成功
+                delivered = [True] * len(batch)
+                for message, members in _coalesce_groups([text for text, _, _ in batch], MESSAGE_LIMIT):
+                    if not await self._send(bot, message):
+                        for index in members:
+                            delivered[index] = False
+
+                now = time.monotonic()
+                for (_, _, future), ok in zip(batch, delivered):
+                    future.set_result(ok)
+                with self._idle:
+                    for _, queued_at, _ in batch:
+                        self._stats["alerts"] += 1
+                        self._stats["queue_latency_total"] += now - queued_at
+                        self._stats["queue_latency_max"] = max(self._stats["queue_latency_max"], now - queued_at)
+                    self._pending -= len(batch)
+                    self._idle.notify_all()
+                if stop:
+                    break
+        finally:
+            try:
+                await bot.shutdown()
+            except Exception as e:
+                logger.debug(f"关闭 Telegram 客户端失败: {e}")
+
+    async def _throttle(self) -> None:
+        """同一会话的两次发送至少间隔 min_interval 秒"""
+        wait = self._next_send_at.get(self.chat_id, 0.0) - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        self._next_send_at[self.chat_id] = time.monotonic() + self.min_interval
+
+    async def _send(self, bot, text: str) -> bool:
+        from telegram.error import BadRequest, NetworkError, RetryAfter, TelegramError
+
+        for attempt in range(self.max_retries + 1):
+            await self._throttle()
+            start = time.monotonic()
+            try:
+                await bot.send_message(chat_id=self.chat_id, text=text, parse_mode="HTML")
+            except RetryAfter as e:
+                retry_after = e.retry_after
+                wait = retry_after.total_seconds() if hasattr(retry_after, "total_seconds") else float(retry_after)
+                logger.warning(f"Telegram 限流，{wait:.0f} 秒后重试")
+                self._next_send_at[self.chat_id] = time.monotonic() + wait
+            except BadRequest as e:
+                # BadRequest 是 NetworkError 的子类，但请求本身有误（如会话不存在），重试无意义
+                logger.error(f"Telegram发送失败: {e}")
+                break
+            except NetworkError as e:
+                logger.warning(f"Telegram 网络错误，稍后重试: {e}")
+                await asyncio.sleep(2 ** attempt)
+            except TelegramError as e:
+                logger.error(f"Telegram发送失败: {e}")
+                break
+            else:
+                with self._idle:
+                    self._stats["messages"] += 1
+                    self._stats["send_latency_total"] += time.monotonic() - start
+                logger.info("Telegram消息发送成功")
+                return True
+
+            if attempt < self.max_retries:
+                with self._idle:
+                    self._stats["retries"] += 1
+
+        with self._idle:
+            self._stats["failed"] += 1
+        return False
+
+
+def create_worker(token: str, chat_id: str) -> TelegramWorker:
+    """按配置创建发送线程"""
+    return TelegramWorker(
+        token, chat_id,
+        base_url=config.telegram_base_url,
+        min_interval=config.telegram_min_interval,
+        max_retries=config.telegram_max_retries,
+    )
@@ -0,0 +1,197 @@
+"""
+URL索引模块 - 已见URL的持久化索引（内存映射 Bloom 过滤器 + SQLite 精确存储）
+"""
+import hashlib
+import logging
+import math
+import mmap
+import os
+import sqlite3
+import struct
+import threading
+from pathlib import Path
+from typing import Dict, Iterable
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from config import SEEN_URLS_BLOOM, SEEN_URLS_DB
+
+logger = logging.getLogger(__name__)
+
+# 规范化时去除的跟踪参数
+TRACKING_PARAMS = {"fbclid", "gclid", "dclid", "msclkid", "mc_cid", "mc_eid", "_ga", "_gl", "ref", "ref_src", "igshid"}
+TRACKING_PREFIXES = ("utm_", "hsa_", "pk_")
+
+
+def canonicalize_url(url: str) -> str:
+    """URL 规范化：忽略 http/https、默认端口、跟踪参数、锚点和结尾斜杠，查询参数排序"""
+    parts = urlsplit(url.strip())
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port not in (80, 443):
+        host = f"{host}:{parts.port}"
+
+    path = parts.path or "/"
+    if len(path) > 1:
+        path = path.rstrip("/")
+
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k.lower() not in TRACKING_PARAMS and not k.lower().startswith(TRACKING_PREFIXES)
+    )
+    # 协议统一省略，http 与 https 视为同一篇文章
+    return urlunsplit(("", host, path, urlencode(query), ""))
+
+
+class BloomFilter:
+    """基于内存映射文件的 Bloom 过滤器
+
+    文件头保存位数、哈希函数个数和已插入数量，位数组由操作系统按需换页，
+    进程不需要把全部 URL 读入内存。
+    """
+
+    HEADER = struct.Struct("<8sQIQ")
+    MAGIC = b"CNCBLOOM"
+
+    def __init__(self, path: Path, capacity: int, error_rate: float):
+        self.path = path
+        bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        hashes = max(1, round(bits / capacity * math.log(2)))
+
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(self.HEADER.pack(self.MAGIC, bits, hashes, 0))
+                f.truncate(self.HEADER.size + (bits + 7) // 8)
+
+        self._file = open(path, "r+b")
+        self._mm = mmap.mmap(self._file.fileno(), 0)
+        magic, self.bits, self.hashes, self.count = self.HEADER.unpack_from(self._mm, 0)
+        if magic != self.MAGIC:
+            raise ValueError(f"不是有效的 Bloom 过滤器文件: {path}")
+        # 以文件中的实际位数为准（扩容重建后可能大于配置的容量）
+        self.capacity = int(self.bits * (math.log(2) ** 2) / -math.log(error_rate))
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1, h2 = struct.unpack("<QQ", digest)
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.bits
+
+    def __contains__(self, key: str) -> bool:
+        offset = self.HEADER.size
+        return all(self._mm[offset + pos // 8] & (1 << (pos % 8)) for pos in self._positions(key))
+
+    def add(self, key: str) -> None:
+        offset = self.HEADER.size
+        for pos in self._positions(key):
+            self._mm[offset + pos // 8] |= 1 << (pos % 8)
+        self.count += 1
+
+    @property
+    def memory_bytes(self) -> int:
+        """位数组占用的字节数"""
+        return (self.bits + 7) // 8
+
+    @property
+    def estimated_fp_rate(self) -> float:
+        """按当前插入数量估算的误判率"""
+        return (1 - math.exp(-self.hashes * self.count / self.bits)) ** self.hashes
+
+    def flush(self) -> None:
+        self.HEADER.pack_into(self._mm, 0, self.MAGIC, self.bits, self.hashes, self.count)
+        self._mm.flush()
+
+    def close(self) -> None:
+        self.flush()
+        self._mm.close()
+        self._file.close()
+
+
+class SeenUrlIndex:
+    """已见URL索引
+
+    Bloom 过滤器判定"一定没见过"时直接返回，只有可能见过的 URL 才查询
+    SQLite 精确存储；插入数量超过容量时按精确存储重建更大的过滤器。
+    """
+
+    def __init__(self, bloom_file: Path = SEEN_URLS_BLOOM, db_file: Path = SEEN_URLS_DB,
+                 capacity: int = 1_000_000, error_rate: float = 0.001):
+        self.bloom_file = bloom_file
+        self.error_rate = error_rate
+        self._lock = threading.RLock()
+        self._bloom = BloomFilter(bloom_file, capacity, error_rate)
+
+        db_file.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(db_file), check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS seen_urls (url TEXT PRIMARY KEY) WITHOUT ROWID")
+
+        # 本进程内的查询统计，用于计算实际误判率
+        self._negative_queries = 0
+        self._false_positives = 0
+
+        if self._bloom.count > self._bloom.capacity:
+            self._rebuild(self._bloom.count * 2)
+
+    @staticmethod
+    def _key(site_key: str, url: str) -> str:
+        return f"{site_key}|{canonicalize_url(url)}"
+
+    def contains(self, site_key: str, url: str) -> bool:
+        """检查 URL 是否出现过"""
+        key = self._key(site_key, url)
+        with self._lock:
+            if key not in self._bloom:
+                self._negative_queries += 1
+                return False
+            found = self._conn.execute("SELECT 1 FROM seen_urls WHERE url = ?", (key,)).fetchone() is not None
+            if not found:
+                self._negative_queries += 1
+                self._false_positives += 1
+            return found
+
+    def add_many(self, site_key: str, urls: Iterable[str]) -> None:
+        """记录一批 URL"""
+        with self._lock:
+            for url in urls:
+                key = self._key(site_key, url)
+                cursor = self._conn.execute("INSERT OR IGNORE INTO seen_urls (url) VALUES (?)", (key,))
+                if cursor.rowcount:
+                    self._bloom.add(key)
+
+            if self._bloom.count > self._bloom.capacity:
+                self._rebuild(self._bloom.capacity * 2)
+
+    def _rebuild(self, capacity: int) -> None:
+        """扩容：按精确存储中的全部 URL 重建 Bloom 过滤器"""
+        logger.info(f"URL索引超过容量 {self._bloom.capacity}，重建为 {capacity}")
+        self._conn.commit()
+        self._bloom.close()
+        tmp_file = self.bloom_file.with_suffix(".rebuild")
+        if tmp_file.exists():
+            tmp_file.unlink()
+
+        bloom = BloomFilter(tmp_file, capacity, self.error_rate)
+        for (key,) in self._conn.execute("SELECT url FROM seen_urls"):
+            bloom.add(key)
+        bloom.close()
+        os.replace(tmp_file, self.bloom_file)
+
+        self._bloom = BloomFilter(self.bloom_file, capacity, self.error_rate)
+
+    def flush(self) -> None:
+        """持久化 Bloom 过滤器和精确存储"""
+        with self._lock:
+            self._bloom.flush()
+            self._conn.commit()
+
+    def stats(self) -> Dict:
+        """索引统计：数量、内存占用、估算误判率和本次运行的实际误判率"""
+        with self._lock:
+            observed = self._false_positives / self._negative_queries if self._negative_queries else 0.0
+            return {
+                "count": self._bloom.count,
+                "capacity": self._bloom.capacity,
+                "memory_bytes": self._bloom.memory_bytes,
+                "hashes": self._bloom.hashes,
+                "estimated_fp_rate": self._bloom.estimated_fp_rate,
+                "observed_fp_rate": observed,
+            }
@@ -0,0 +1,152 @@
+"""
+User-Agent 池模块 - 从项目自带的 user_agents.txt 按浏览器占比加权选择 User-Agent，同一次运行中每个域名固定使用一个
+
+user_agents.txt 每行为 "权重<TAB>User-Agent"，# 开头的行是注释；文件只保留占比最高的桌面浏览器，
+加载不需要网络，也不依赖 fake_useragent。用 python main.py --refresh-user-agents 从 fake-useragent 的
+browsers.jsonl 重新生成。
+"""
+import json
+import logging
+import os
+import random
+import re
+import threading
+from collections import Counter
+from datetime import datetime
+from itertools import accumulate
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import requests
+
+from config import USER_AGENTS_FILE, config
+from utils.lazy import LazyObject
+
+logger = logging.getLogger(__name__)
+
+# 文件头注释中的生成日期（按文件修改时间判断会被 git checkout 重置）
+GENERATED_AT_PATTERN = re.compile(r"生成于 (\d{4}-\d{2}-\d{2})")
+
+# user_agents.txt 缺失或为空时使用（与 Selenium 浏览器的 User-Agent 相同）
+DEFAULT_USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+)
+
+# 生成 user_agents.txt 时保留的浏览器（移动端页面结构不同，解析规则只针对桌面版）
+DESKTOP_BROWSERS = ("Chrome", "Edge", "Firefox", "Safari")
+
+
+class UserAgentPool:
+    """加权 User-Agent 池
+
+    for_host 第一次遇到某个域名时按权重抽取一个 User-Agent，之后对该域名一直返回同一个，
+    保证同一站点的 keep-alive 连接和 Cookie 对应同一个浏览器；reset 在每次运行开始时清空这一映射。
+    """
+
+    def __init__(self, user_agents: List[str], weights: List[float]):
+        if not user_agents:
+            user_agents, weights = [DEFAULT_USER_AGENT], [1.0]
+        self.user_agents = user_agents
+        self._cum_weights = list(accumulate(weights))
+        self._by_host: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: Path = USER_AGENTS_FILE) -> "UserAgentPool":
+        """读取 user_agents.txt，文件不存在或格式有误时退回默认 User-Agent"""
+        user_agents, weights = [], []
+        generated_at = None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if line.startswith("#"):
+                        match = GENERATED_AT_PATTERN.search(line)
+                        if match:
+                            generated_at = datetime.strptime(match.group(1), "%Y-%m-%d")
+                        continue
+                    if not line:
+                        continue
+                    weight, _, user_agent = line.partition("\t")
+                    if user_agent and float(weight) > 0:
+                        user_agents.append(user_agent)
+                        weights.append(float(weight))
+        except (OSError, ValueError) as e:
+            logger.warning(f"读取 User-Agent 列表失败 [{path}]，使用默认 User-Agent: {e}")
+            return cls([], [])
+
+        age_days = (datetime.now() - generated_at).days if generated_at else 0
+        if config.user_agent_max_age_days and age_days > config.user_agent_max_age_days:
+            logger.warning(
+                f"User-Agent 列表已有 {age_days:.0f} 天未更新，建议运行 python main.py --refresh-user-agents"
+            )
+        return cls(user_agents, weights)
+
+    def __len__(self) -> int:
+        return len(self.user_agents)
+
+    def random(self) -> str:
+        """按权重随机抽取一个 User-Agent"""
+        return random.choices(self.user_agents, cum_weights=self._cum_weights)[0]
+
+    def for_host(self, host: str) -> str:
+        """域名在本次运行中固定使用的 User-Agent"""
+        user_agent = self._by_host.get(host)
+        if user_agent is None:
+            with self._lock:
+                user_agent = self._by_host.setdefault(host, self.random())
+        return user_agent
+
+    def reset(self) -> None:
+        """清空域名与 User-Agent 的对应关系（下次运行重新抽取）"""
+        with self._lock:
+            self._by_host.clear()
+
+
+def _read_source(source: str) -> List[str]:
+    """读取 browsers.jsonl（URL 或本地路径）的全部行"""
+    if source.startswith(("http://", "https://")):
+        response = requests.get(source, timeout=config.request_timeout)
+        response.raise_for_status()
+        return response.text.splitlines()
+    with open(source, "r", encoding="utf-8") as f:
+        return f.read().splitlines()
+
+
+def refresh_user_agents(source: Optional[str] = None, path: Path = USER_AGENTS_FILE,
+                        limit: Optional[int] = None) -> int:
+    """从 fake-useragent 的 browsers.jsonl 重新生成 user_agents.txt，返回写入的 User-Agent 数
+
+    只保留桌面版 Chrome / Edge / Firefox / Safari，相同 User-Agent 的占比合并后取最高的 limit 个。
+    """
+    source = source or config.user_agent_source
+    limit = limit or config.user_agent_limit
+    shares: Counter = Counter()
+    for line in _read_source(source):
+        if not line.strip():
+            continue
+        entry = json.loads(line)
+        if entry.get("type") == "desktop" and entry.get("browser") in DESKTOP_BROWSERS and entry.get("useragent"):
+            shares[entry["useragent"]] += float(entry.get("percent") or 0) or 0.001
+    if not shares:
+        raise ValueError(f"数据源中没有可用的桌面浏览器 User-Agent: {source}")
+
+    top = shares.most_common(limit)
+    lines = [
+        f"# 桌面浏览器 User-Agent 及权重（浏览器占比 %），共 {len(top)} 个",
+        f"# 由 python main.py --refresh-user-agents 生成于 {datetime.now().strftime('%Y-%m-%d')}，来源: {source}",
+    ]
+    lines.extend(f"{share:.4f}\t{user_agent}" for user_agent, share in top)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(tmp_path, path)
+    logger.info(f"已更新 User-Agent 列表: {len(top)} 个 -> {path}")
+    return len(top)
+
+
+# 全局 User-Agent 池（第一次发请求时加载）
+user_agents = LazyObject(UserAgentPool.load)